@@ -0,0 +1 @@
+# Benchmarks de la API (ver benchmarks/run.py)
@@ -0,0 +1,78 @@
+"""
+Compara dos corridas de `benchmarks.run` (antes → después).
+
+    python -m benchmarks.compare antes.json despues.json
+    python -m benchmarks.compare antes.json despues.json --threshold 0.05
+
+Cada fila muestra la métrica de ambas corridas y el cambio relativo. Las
+diferencias menores a `--threshold` se consideran ruido (=).
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+# Sección → (campos que identifican la fila, métrica, True si más alto es mejor)
+METRICAS = {
+    "load": (("pipeline", "stage"), "seconds", False),
+    "micro": (("pipeline", "stage", "rows"), "per_call_us", False),
+    "http": (("transport", "endpoint", "concurrency"), "rps", True),
+    "http_p99": (("transport", "endpoint", "concurrency"), "p99", False),
+}
+
+
+def _filas(resultados: dict, seccion: str) -> Dict[Tuple, float]:
+    campos, metrica, _ = METRICAS[seccion]
+    filas = {}
+    for r in resultados.get(seccion.split("_")[0], []):
+        valor = r["latency_ms"][metrica] if seccion == "http_p99" else r[metrica]
+        filas[tuple(r[c] for c in campos)] = valor
+    return filas
+
+
+def comparar(antes: dict, despues: dict, threshold: float) -> int:
+    """Imprime la tabla y regresa cuántas métricas empeoraron más que `threshold`."""
+    peores = 0
+    for seccion, (_, metrica, mayor_mejor) in METRICAS.items():
+        a, d = _filas(antes, seccion), _filas(despues, seccion)
+        comunes = [k for k in a if k in d]
+        if not comunes:
+            continue
+        print(f"\n{seccion} ({metrica}, {'más alto' if mayor_mejor else 'más bajo'} es mejor)")
+        for key in comunes:
+            cambio = (d[key] - a[key]) / a[key] if a[key] else 0.0
+            mejora = cambio > 0 if mayor_mejor else cambio < 0
+            if abs(cambio) < threshold:
+                marca = "="
+            elif mejora:
+                marca = "✓"
+            else:
+                marca = "✗"
+                peores += 1
+            nombre = " ".join(str(k) for k in key)
+            print(f"  {marca} {nombre:56} {a[key]:12.4g} → {d[key]:12.4g}  {cambio:+7.1%}")
+    return peores
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compara dos resultados de benchmarks.")
+    parser.add_argument("antes", type=Path)
+    parser.add_argument("despues", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10, help="Cambio relativo que se ignora (default 0.10)")
+    args = parser.parse_args(argv)
+    
+    antes = json.loads(args.antes.read_text())
+    despues = json.loads(args.despues.read_text())
+    for nombre, r in (("antes", antes), ("después", despues)):
+        meta = r.get("meta", {})
+        print(f"{nombre:8} {meta.get('timestamp')}  commit {meta.get('git_commit')}  cpus={meta.get('cpu_count')}")
+    
+    peores = comparar(antes, despues, args.threshold)
+    print(f"\n{peores} métricas empeoraron más de {args.threshold:.0%}")
+    return 1 if peores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
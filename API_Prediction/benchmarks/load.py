@@ -0,0 +1,174 @@
+"""
+Prueba de carga HTTP: N peticiones con C clientes concurrentes.
+
+Dos transportes:
+- `inprocess`: la app de FastAPI dentro del mismo proceso (httpx + ASGI),
+  mide el costo de la app sin red ni servidor.
+- `uvicorn`: un servidor real en un puerto local (subproceso), mide lo que
+  vería un cliente.
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from benchmarks.payloads import clientes
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+# Endpoint → pipeline de los payloads (None = GET sin cuerpo)
+ENDPOINTS = {
+    "/predict/clasificacion": "clasificacion",
+    "/predict/segmento": "segmentacion",
+    "/health": None,
+}
+
+
+def resumen_latencias(latencias: List[float]) -> Dict[str, float]:
+    ms = np.asarray(latencias) * 1000
+    return {
+        "mean": float(ms.mean()),
+        "p50": float(np.percentile(ms, 50)),
+        "p95": float(np.percentile(ms, 95)),
+        "p99": float(np.percentile(ms, 99)),
+        "max": float(ms.max()),
+    }
+
+
+async def correr_carga(
+    client: httpx.AsyncClient, endpoint: str, payloads: Optional[List[dict]], requests: int, concurrency: int
+) -> dict:
+    """Lanza `requests` peticiones repartidas entre `concurrency` tareas."""
+    latencias: List[float] = []
+    errores: Dict[str, int] = {}
+    siguiente = iter(range(requests))
+    
+    async def trabajador():
+        for i in siguiente:
+            inicio = time.perf_counter()
+            try:
+                if payloads is None:
+                    r = await client.get(endpoint)
+                else:
+                    r = await client.post(endpoint, json=payloads[i % len(payloads)])
+                estado = str(r.status_code)
+            except httpx.HTTPError as e:
+                estado = type(e).__name__
+            latencias.append(time.perf_counter() - inicio)
+            if estado != "200":
+                errores[estado] = errores.get(estado, 0) + 1
+    
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrency)))
+    duracion = time.perf_counter() - inicio
+    
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errores,
+        "seconds": duracion,
+        "rps": requests / duracion,
+        "latency_ms": resumen_latencias(latencias),
+    }
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@asynccontextmanager
+async def cliente_inprocess(max_connections: int) -> AsyncIterator[httpx.AsyncClient]:
+    from main import app
+    
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        yield client
+
+
+@asynccontextmanager
+async def cliente_uvicorn(max_connections: int, env: Optional[dict] = None) -> AsyncIterator[httpx.AsyncClient]:
+    """Levanta `uvicorn main:app` en un puerto libre y espera a que responda /health."""
+    port = _puerto_libre()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=API_DIR,
+        env={**os.environ, **(env or {})},
+    )
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            limite = time.monotonic() + 60
+            while True:
+                if proceso.poll() is not None:
+                    raise RuntimeError(f"uvicorn terminó al arrancar (código {proceso.returncode})")
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > limite:
+                    raise RuntimeError("uvicorn no respondió en 60 s")
+                await asyncio.sleep(0.1)
+            yield client
+    finally:
+        proceso.terminate()
+        try:
+            proceso.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+
+
+async def benchmark_http(
+    transporte: str,
+    endpoints: List[str],
+    concurrencias: List[int],
+    requests: int,
+    warmup: int = 50,
+    seed: int = 0,
+    env: Optional[dict] = None,
+) -> List[dict]:
+    """
+    Corre cada endpoint a cada nivel de concurrencia.
+    
+    Cada combinación usa payloads distintos (la semilla incluye endpoint y
+    concurrencia) para que el cache de respuestas no sesgue los niveles
+    siguientes. El calentamiento carga los modelos antes de medir.
+    """
+    if transporte == "inprocess":
+        contexto = cliente_inprocess(max(concurrencias))
+    else:
+        contexto = cliente_uvicorn(max(concurrencias), env)
+    
+    resultados = []
+    async with contexto as client:
+        for endpoint in endpoints:
+            pipeline = ENDPOINTS[endpoint]
+            calentamiento = None if pipeline is None else clientes(pipeline, warmup, f"{seed}-warmup")
+            await correr_carga(client, endpoint, calentamiento, warmup, 1)
+            
+            for concurrencia in concurrencias:
+                payloads = None if pipeline is None else clientes(pipeline, requests, f"{seed}-{concurrencia}")
+                resultado = await correr_carga(client, endpoint, payloads, requests, concurrencia)
+                resultado["transport"] = transporte
+                resultados.append(resultado)
+                lat = resultado["latency_ms"]
+                print(
+                    f"  {transporte:9} {endpoint:24} c={concurrencia:<4} "
+                    f"{resultado['rps']:8.0f} req/s  p50={lat['p50']:.2f} ms  "
+                    f"p95={lat['p95']:.2f} ms  p99={lat['p99']:.2f} ms"
+                    + (f"  errores={resultado['errors']}" if resultado["errors"] else "")
+                )
+    return resultados
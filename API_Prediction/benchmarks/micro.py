@@ -0,0 +1,127 @@
+"""
+Microbenchmarks: cada etapa del pipeline por separado, sin HTTP.
+
+Compara el camino de los notebooks (pandas + sklearn) con el que usa la API
+(FeatureEncoder + motores compilados) para 1 fila y para lotes.
+"""
+
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+from pydantic import TypeAdapter
+
+import utils
+from benchmarks.payloads import clientes
+from schemas import ClienteClasificacion, ClienteSegmentacion
+
+ESQUEMAS = {
+    "clasificacion": ClienteClasificacion,
+    "segmentacion": ClienteSegmentacion,
+}
+
+
+def medir(fn: Callable[[], object], min_time: float = 0.2, repeat: int = 5) -> Dict[str, float]:
+    """
+    Segundos por llamada, como `timeit`: calibra cuántas llamadas caben en
+    `min_time` y repite la medición `repeat` veces.
+    """
+    fn()  # calentar (imports perezosos, caches de numpy)
+    number = 1
+    while True:
+        inicio = time.perf_counter()
+        for _ in range(number):
+            fn()
+        transcurrido = time.perf_counter() - inicio
+        if transcurrido >= min_time / repeat or number >= 1_000_000:
+            break
+        number *= 10 if transcurrido < min_time / (repeat * 10) else 2
+    
+    tiempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        for _ in range(number):
+            fn()
+        tiempos.append((time.perf_counter() - inicio) / number)
+    return {"median_s": float(np.median(tiempos)), "min_s": float(min(tiempos)), "number": number}
+
+
+def _etapas_clasificacion(m: dict, registros: List[dict]) -> Dict[str, Callable[[], object]]:
+    df = utils.encode_categorical(registros, m["encoders"], m["features"])
+    X = m["encoder"].transform(registros)
+    X_scaled = m["scaler"].transform(df)
+    engine = m["engine"]
+    return {
+        "encode_categorical": lambda: utils.encode_categorical(registros, m["encoders"], m["features"]),
+        "feature_encoder": lambda: m["encoder"].transform(registros),
+        "sklearn.scaler": lambda: m["scaler"].transform(df),
+        "sklearn.random_forest": lambda: m["modelo"].predict_proba(X_scaled),
+        "compiled.scale": lambda: engine.scale(X),
+        "compiled.forest": lambda: engine.predict_proba(X),
+        "compiled.score": lambda: engine.score(X),
+    }
+
+
+def _etapas_segmentacion(m: dict, registros: List[dict]) -> Dict[str, Callable[[], object]]:
+    df = utils.encode_categorical(registros, m["encoders"], m["features"])
+    X = m["encoder"].transform(registros)
+    X_scaled = m["scaler"].transform(df)
+    X_pca = m["pca"].transform(X_scaled)
+    return {
+        "encode_categorical": lambda: utils.encode_categorical(registros, m["encoders"], m["features"]),
+        "feature_encoder": lambda: m["encoder"].transform(registros),
+        "sklearn.scaler": lambda: m["scaler"].transform(df),
+        "sklearn.pca": lambda: m["pca"].transform(X_scaled),
+        "sklearn.kmeans": lambda: m["kmeans"].predict(X_pca),
+        "fused.score": lambda: m["engine"].score(X),
+    }
+
+
+ETAPAS = {
+    "clasificacion": _etapas_clasificacion,
+    "segmentacion": _etapas_segmentacion,
+}
+
+
+def benchmark_carga(pipelines: List[str]) -> List[dict]:
+    """Tiempo de carga de cada pipeline: .pkl (con compilación y paridad) vs .bundle."""
+    resultados = []
+    for pipeline in pipelines:
+        inicio = time.perf_counter()
+        utils.load_pipeline_from_pickles(pipeline)
+        resultados.append({"pipeline": pipeline, "stage": "load.pickles", "seconds": time.perf_counter() - inicio})
+        
+        bundle = utils.MODELS_PATH / f"{pipeline}{utils.BUNDLE_SUFFIX}"
+        if (bundle / "manifest.json").exists():
+            inicio = time.perf_counter()
+            utils.load_bundle(bundle)
+            resultados.append({"pipeline": pipeline, "stage": "load.bundle", "seconds": time.perf_counter() - inicio})
+    return resultados
+
+
+def benchmark_etapas(
+    pipelines: List[str], batch_sizes: List[int], seed: int = 0, min_time: float = 0.2
+) -> List[dict]:
+    """Tiempo por llamada y por fila de cada etapa, para cada tamaño de lote."""
+    resultados = []
+    for pipeline in pipelines:
+        m = utils.load_pipeline_from_pickles(pipeline)
+        adapter = TypeAdapter(List[ESQUEMAS[pipeline]])
+        
+        for n in batch_sizes:
+            registros = clientes(pipeline, n, seed)
+            etapas = {"validate": lambda: adapter.validate_python(registros)}
+            etapas.update(ETAPAS[pipeline](m, registros))
+            
+            for etapa, fn in etapas.items():
+                tiempo = medir(fn, min_time=min_time)
+                resultados.append({
+                    "pipeline": pipeline,
+                    "stage": etapa,
+                    "rows": n,
+                    "per_call_us": tiempo["median_s"] * 1e6,
+                    "per_row_us": tiempo["median_s"] * 1e6 / n,
+                    "min_per_call_us": tiempo["min_s"] * 1e6,
+                    "calls": tiempo["number"],
+                })
+    return resultados
@@ -0,0 +1,58 @@
+"""
+Clientes sintéticos reproducibles para los benchmarks (misma semilla → mismos datos).
+"""
+
+import random
+from typing import List
+
+JOBS = [
+    "admin.", "technician", "services", "management", "retired", "blue-collar",
+    "unemployed", "entrepreneur", "housemaid", "self-employed", "student", "unknown",
+]
+MARITAL = ["married", "single", "divorced"]
+EDUCATION = ["primary", "secondary", "tertiary", "unknown"]
+YES_NO = ["yes", "no"]
+MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+
+
+def cliente_clasificacion(rng: random.Random) -> dict:
+    """Un cliente válido para /predict/clasificacion."""
+    return {
+        "age": rng.randint(18, 95),
+        "job": rng.choice(JOBS),
+        "marital": rng.choice(MARITAL),
+        "education": rng.choice(EDUCATION),
+        "default": rng.choice(YES_NO),
+        "balance": rng.randint(-3000, 60000),
+        "housing": rng.choice(YES_NO),
+        "loan": rng.choice(YES_NO),
+        "day": rng.randint(1, 31),
+        "month": rng.choice(MONTHS),
+        "duration": rng.randint(0, 3000),
+        "campaign": rng.randint(1, 40),
+        "pdays": rng.choice([-1, -1, -1, rng.randint(1, 800)]),
+        "previous": rng.randint(0, 20),
+    }
+
+
+def cliente_segmentacion(rng: random.Random) -> dict:
+    """Un cliente válido para /predict/segmento (sin day ni month)."""
+    cliente = cliente_clasificacion(rng)
+    del cliente["day"], cliente["month"]
+    return cliente
+
+
+GENERADORES = {
+    "clasificacion": cliente_clasificacion,
+    "segmentacion": cliente_segmentacion,
+}
+
+
+def clientes(pipeline: str, n: int, seed) -> List[dict]:
+    """
+    `n` clientes del pipeline. Los saldos y duraciones hacen que casi todos
+    sean distintos, así que no se mide el cache salvo que se repitan a propósito.
+    """
+    rng = random.Random(f"{pipeline}-{seed}")
+    generar = GENERADORES[pipeline]
+    return [generar(rng) for _ in range(n)]
@@ -0,0 +1,157 @@
+"""
+Suite de benchmarks de la API. Guarda los resultados en JSON para comparar corridas.
+
+Uso desde la carpeta API_Prediction:
+    python -m benchmarks.run                                  # todo, con los defaults
+    python -m benchmarks.run --quick                          # corrida corta (humo)
+    python -m benchmarks.run --only http --transports uvicorn --concurrency 1 16 64
+    python -m benchmarks.compare benchmarks/results/antes.json benchmarks/results/despues.json
+
+Los modelos salen de `benchmarks/artifacts/models` (ver `benchmarks/stub.py`),
+así que corre sin el `clasificacion_modelo_banco.pkl` real. Con
+`--models-path models` se usan los modelos de la API.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+RESULTS_PATH = Path(__file__).resolve().parent / "results"
+SECCIONES = ("load", "micro", "http")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def metadatos(args: argparse.Namespace) -> dict:
+    import fastapi
+    import numpy
+    import pandas
+    import pydantic
+    import sklearn
+    
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": {
+            "fastapi": fastapi.__version__,
+            "pydantic": pydantic.__version__,
+            "numpy": numpy.__version__,
+            "pandas": pandas.__version__,
+            "sklearn": sklearn.__version__,
+        },
+        "config": {
+            "models_path": str(args.models_path),
+            "seed": args.seed,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "batch_sizes": args.batch_sizes,
+            "transports": args.transports,
+            # Variables de entorno que cambian el comportamiento de la API
+            "env": {
+                key: os.environ[key]
+                for key in ("BATCH_MAX_SIZE", "BATCH_WAIT_MS", "CACHE_MAX_SIZE", "CACHE_TTL_S", "INFERENCE_WORKERS")
+                if key in os.environ
+            },
+        },
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de latencia y throughput de la API.")
+    parser.add_argument("--only", nargs="+", default=list(SECCIONES), metavar="SECCION",
+                        help=f"Secciones a correr: {', '.join(SECCIONES)} (default: todas)")
+    parser.add_argument("--transports", nargs="+", default=["inprocess", "uvicorn"], metavar="T",
+                        help="inprocess y/o uvicorn")
+    parser.add_argument("--endpoints", nargs="+", default=None, metavar="E",
+                        help="Endpoints HTTP (default: /predict/clasificacion /predict/segmento /health)")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=2000, help="Peticiones por endpoint y nivel")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 100, 1000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--models-path", type=Path, default=None,
+                        help="Carpeta de modelos (default: modelos de juguete en benchmarks/artifacts)")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Archivo JSON (default: benchmarks/results/<fecha>-<commit>.json)")
+    parser.add_argument("--quick", action="store_true", help="Pocas peticiones y lotes chicos")
+    args = parser.parse_args(argv)
+    
+    from benchmarks.load import ENDPOINTS
+    desconocidos = (set(args.only) - set(SECCIONES)) | (set(args.transports) - {"inprocess", "uvicorn"})
+    desconocidos |= set(args.endpoints or []) - set(ENDPOINTS)
+    if desconocidos:
+        parser.error(f"Opciones desconocidas: {', '.join(sorted(desconocidos))}")
+    if args.quick:
+        args.requests = min(args.requests, 200)
+        args.batch_sizes = [n for n in args.batch_sizes if n <= 100] or [1]
+    
+    # La API y el subproceso de uvicorn leen los modelos de la misma carpeta
+    from benchmarks.stub import ensure_stub_models
+    args.models_path = (args.models_path or ensure_stub_models()).resolve()
+    os.environ["MODELS_PATH"] = str(args.models_path)
+    import utils
+    utils.MODELS_PATH = args.models_path
+    
+    from benchmarks.load import benchmark_http
+    from benchmarks.micro import benchmark_carga, benchmark_etapas
+    
+    resultados = {"meta": metadatos(args)}
+    inicio = time.perf_counter()
+    
+    if "load" in args.only:
+        print("▶ Carga de modelos")
+        resultados["load"] = benchmark_carga(list(utils.PIPELINES))
+        for r in resultados["load"]:
+            print(f"  {r['pipeline']:14} {r['stage']:14} {r['seconds'] * 1000:8.1f} ms")
+    
+    if "micro" in args.only:
+        print("▶ Etapas del pipeline")
+        resultados["micro"] = benchmark_etapas(
+            list(utils.PIPELINES), args.batch_sizes, seed=args.seed, min_time=0.05 if args.quick else 0.2
+        )
+        for r in resultados["micro"]:
+            print(f"  {r['pipeline']:14} {r['stage']:22} n={r['rows']:<5} "
+                  f"{r['per_call_us']:10.1f} µs/llamada {r['per_row_us']:9.2f} µs/fila")
+    
+    if "http" in args.only:
+        print("▶ HTTP")
+        resultados["http"] = []
+        for transporte in args.transports:
+            resultados["http"] += asyncio.run(benchmark_http(
+                transporte,
+                args.endpoints or list(ENDPOINTS),
+                args.concurrency,
+                args.requests,
+                warmup=20 if args.quick else 50,
+                seed=args.seed,
+            ))
+    
+    resultados["meta"]["duration_s"] = time.perf_counter() - inicio
+    output = args.output or RESULTS_PATH / (
+        f"{datetime.now():%Y%m%d-%H%M%S}-{resultados['meta']['git_commit']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+    print(f"✓ Resultados en {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Modelos para correr los benchmarks sin el Random Forest real.
+
+`clasificacion_modelo_banco.pkl` no está en el repo, así que se entrena un
+Random Forest "de juguete" con los mismos hiperparámetros que el notebook
+(`RandomForestClassifier(random_state=42)`, 100 árboles sin límite de
+profundidad) sobre datos sintéticos con el mismo número de features y
+etiquetas ruidosas. Los árboles quedan profundos, como los del modelo real,
+así que el costo de inferencia es comparable; las predicciones no significan
+nada.
+
+El resto de los .pkl (scaler, encoders, features, segmentación) y los
+bundles se copian tal cual de `models/`.
+
+    python -m benchmarks.stub                       # genera benchmarks/artifacts/models
+    python -m benchmarks.stub --output /tmp/models --rebuild
+"""
+
+import argparse
+import pickle
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+REPO_MODELS_PATH = Path(__file__).resolve().parent.parent / "models"
+STUB_MODELS_PATH = Path(__file__).resolve().parent / "artifacts" / "models"
+STUB_ROWS = 20000
+STUB_SEED = 42
+
+
+def build_stub_classifier(n_features: int, rows: int = STUB_ROWS, seed: int = STUB_SEED) -> RandomForestClassifier:
+    """Random Forest entrenado sobre features ya escaladas a [0, 1] (como el MinMaxScaler)."""
+    rng = np.random.default_rng(seed)
+    X = rng.random((rows, n_features))
+    # Regla arbitraria + ruido: ~40% positivos y árboles profundos
+    weights = rng.normal(size=n_features)
+    logits = 6 * (X - 0.5) @ weights / np.sqrt(n_features)
+    y = (rng.random(rows) < 1 / (1 + np.exp(-logits + 0.4))).astype(np.int64)
+    
+    model = RandomForestClassifier(random_state=seed)
+    model.fit(X, y)
+    return model
+
+
+def ensure_stub_models(
+    output: Path = STUB_MODELS_PATH,
+    source: Path = REPO_MODELS_PATH,
+    rebuild: bool = False,
+) -> Path:
+    """
+    Prepara una carpeta de modelos con el clasificador de juguete.
+    
+    Si ya existe se reutiliza (el entrenamiento tarda unos segundos), salvo
+    con `rebuild=True`.
+    """
+    import utils
+    
+    output = Path(output)
+    modelo = output / utils.PICKLES["clasificacion"]["modelo"]
+    if modelo.exists() and not rebuild:
+        return output
+    
+    if output.exists():
+        shutil.rmtree(output)
+    shutil.copytree(source, output, ignore=shutil.ignore_patterns("*.old"))
+    
+    with open(output / utils.PICKLES["clasificacion"]["features"], "rb") as f:
+        features = pickle.load(f)
+    print(f"Entrenando clasificador de juguete ({len(features)} features, {STUB_ROWS} filas)...")
+    with open(modelo, "wb") as f:
+        pickle.dump(build_stub_classifier(len(features)), f)
+    return output
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Genera los modelos de juguete para los benchmarks.")
+    parser.add_argument("--output", type=Path, default=STUB_MODELS_PATH)
+    parser.add_argument("--rebuild", action="store_true", help="Regenera aunque ya exista")
+    args = parser.parse_args(argv)
+    
+    print(f"✓ {ensure_stub_models(args.output, rebuild=args.rebuild)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+"""
+Calificación masiva sin HTTP: lee la tabla de clientes de disco por bloques,
+la reparte entre varios procesos y escribe predicción y segmento por fila.
+
+Uso desde la carpeta API_Prediction:
+    python calificar.py --data ../bank.csv --output predicciones.csv
+    python calificar.py --data clientes.parquet --output predicciones.parquet --workers 8
+    python calificar.py --data clientes.csv --output seg.csv --pipelines segmentacion --keep id_cliente
+
+- Carga los modelos igual que la API (`utils.load_pipeline`: bundle o .pkl) y
+  codifica con los mismos encoders (`utils.encode_frame`).
+- Los pesos se exportan una vez a `.npy` (como `InferencePool`); cada proceso
+  los abre con mmap, así que no se duplican por proceso.
+- Cada proceso lee su propio bloque del archivo: un rango de bytes del CSV
+  (alineado a fin de línea) o unos row groups del Parquet. El proceso
+  principal solo escribe los resultados, en el orden del archivo.
+- Las filas con valores faltantes salen con la predicción vacía.
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import utils
+from inference.encoder import FeatureEncoder
+from inference.pool import default_shared_path, export_engine, load_engine
+from utils import encode_frame
+
+PARQUET = (".parquet", ".pq")
+
+# Filas por llamada al motor dentro de un bloque: los intermedios del bosque
+# (filas × árboles) caben en cache y la memoria no crece con --chunk-rows
+LOTE_MOTOR = 8192
+
+
+# =============================================================================
+# BLOQUES DE ENTRADA
+# =============================================================================
+
+def separador(encabezado: bytes) -> str:
+    """`;` como bank.csv, o `,`."""
+    return ";" if encabezado.count(b";") >= encabezado.count(b",") else ","
+
+
+def bloques_csv(ruta: Path, filas: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """
+    Encabezado y rangos de bytes `(inicio, fin)` de ~`filas` filas cada uno.
+    Cada rango termina en un fin de línea (no se admiten saltos de línea dentro
+    de un campo entre comillas, como en bank.csv).
+    """
+    tamano = os.path.getsize(ruta)
+    with open(ruta, "rb") as f:
+        encabezado = f.readline()
+        inicio = f.tell()
+        muestra = f.read(1 << 20)
+        bytes_por_fila = len(muestra) / max(muestra.count(b"\n"), 1)
+        paso = max(int(bytes_por_fila * filas), 1 << 16)
+        
+        rangos = []
+        while inicio < tamano:
+            fin = inicio + paso
+            if fin < tamano:
+                f.seek(fin)
+                f.readline()  # hasta el final de la línea
+                fin = f.tell()
+            fin = min(fin, tamano)
+            rangos.append((inicio, fin))
+            inicio = fin
+    return encabezado, rangos
+
+
+def bloques_parquet(ruta: Path, filas: int) -> List[List[int]]:
+    """Row groups agrupados en bloques de ~`filas` filas."""
+    import pyarrow.parquet as pq
+    
+    metadata = pq.ParquetFile(ruta).metadata
+    bloques, actual, n = [], [], 0
+    for i in range(metadata.num_row_groups):
+        actual.append(i)
+        n += metadata.row_group(i).num_rows
+        if n >= filas:
+            bloques.append(actual)
+            actual, n = [], 0
+    if actual:
+        bloques.append(actual)
+    return bloques
+
+
+# =============================================================================
+# PROCESOS (cada uno lee, codifica y evalúa sus bloques)
+# =============================================================================
+
+# Estado de cada proceso, lo llena `_iniciar`
+_trabajo: Dict[str, object] = {}
+
+
+def _iniciar(config: dict) -> None:
+    _trabajo.update(config)
+    _trabajo["encoders"] = {
+        pipeline: FeatureEncoder(features, categories)
+        for pipeline, (features, categories) in config["encoders"].items()
+    }
+    _trabajo["engines"] = {
+        pipeline: load_engine(Path(directory)) for pipeline, directory in config["directories"].items()
+    }
+    # Como /predict/perfil: si los encoders coinciden, segmentación toma sus columnas de la matriz de clasificación
+    encoders = _trabajo["encoders"]
+    _trabajo["proyeccion"] = (
+        encoders["clasificacion"].projection(encoders["segmentacion"]) if len(encoders) == 2 else None
+    )
+
+
+def _leer(bloque) -> pd.DataFrame:
+    ruta, columnas = _trabajo["ruta"], _trabajo["columnas"]
+    if Path(ruta).suffix.lower() in PARQUET:
+        import pyarrow.parquet as pq
+        
+        return pq.ParquetFile(ruta).read_row_groups(bloque, columns=columnas).to_pandas()
+    inicio, fin = bloque
+    with open(ruta, "rb") as f:
+        f.seek(inicio)
+        datos = f.read(fin - inicio)
+    return pd.read_csv(io.BytesIO(_trabajo["encabezado"] + datos), sep=_trabajo["sep"], usecols=columnas)
+
+
+def _score(engine, X: np.ndarray) -> np.ndarray:
+    return np.concatenate([engine.score(X[i:i + LOTE_MOTOR]) for i in range(0, len(X), LOTE_MOTOR)])
+
+
+def calificar_bloque(bloque) -> Tuple[pd.DataFrame, int, Dict[str, int]]:
+    """Resultados de un bloque, filas inválidas y categorías desconocidas por columna."""
+    df = _leer(bloque)
+    salida = df[_trabajo["keep"]].reset_index(drop=True)
+    encoders, engines = _trabajo["encoders"], _trabajo["engines"]
+    
+    validas = df[_trabajo["requeridas"]].notna().all(axis=1).to_numpy()
+    completas = df[validas]
+    for encoder in encoders.values():
+        for col in encoder.unknown:
+            encoder.unknown[col] = 0
+    
+    X_clf = None
+    if "clasificacion" in engines:
+        contratara = pd.array([pd.NA] * len(df), dtype="boolean")
+        probabilidad = np.full(len(df), np.nan)
+        if len(completas):
+            X_clf = encode_frame(completas, encoders["clasificacion"])
+            resultado = _score(engines["clasificacion"], X_clf)
+            contratara[validas] = resultado[:, 0].astype(bool)
+            probabilidad[validas] = np.round(resultado[:, 1], 4)
+        salida["contratara"] = contratara
+        salida["probabilidad"] = probabilidad
+    
+    if "segmentacion" in engines:
+        cluster = pd.array([pd.NA] * len(df), dtype="Int32")
+        if len(completas):
+            if X_clf is not None and _trabajo["proyeccion"] is not None:
+                X_seg = X_clf[:, _trabajo["proyeccion"]]
+            else:
+                X_seg = encode_frame(completas, encoders["segmentacion"])
+            cluster[validas] = _score(engines["segmentacion"], X_seg)
+        nombres = _trabajo["names"]
+        salida["cluster"] = cluster
+        salida["segmento"] = pd.Categorical.from_codes(
+            np.where(validas, cluster.fillna(0).to_numpy(dtype=np.int64), -1),
+            categories=[nombres[c] for c in range(len(nombres))],
+        )
+    
+    desconocidas = {
+        col: n for encoder in encoders.values() for col, n in encoder.unknown.items() if n
+    }
+    return salida, int(len(df) - validas.sum()), desconocidas
+
+
+# =============================================================================
+# SALIDA (en orden, desde el proceso principal)
+# =============================================================================
+
+class Escritor:
+    """Agrega bloques a un CSV (`;`) o a un Parquet (con pyarrow)."""
+    
+    def __init__(self, ruta: Path):
+        self.ruta = Path(ruta)
+        self.parquet = self.ruta.suffix.lower() in PARQUET
+        self._writer = None
+        self._archivo = None
+        self.filas = 0
+    
+    def escribir(self, bloque: pd.DataFrame) -> None:
+        bloque.insert(0, "fila", np.arange(self.filas, self.filas + len(bloque)))
+        self.filas += len(bloque)
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            
+            tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.ruta, tabla.schema)
+            self._writer.write_table(tabla)
+        else:
+            if self._archivo is None:
+                self._archivo = open(self.ruta, "w", encoding="utf-8", newline="")
+                bloque.to_csv(self._archivo, sep=";", index=False)
+            else:
+                bloque.to_csv(self._archivo, sep=";", index=False, header=False)
+    
+    def cerrar(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._archivo is not None:
+            self._archivo.close()
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def _memoria_mb(quien: int) -> float:
+    """Pico de memoria residente (ru_maxrss está en KB en Linux)."""
+    return resource.getrusage(quien).ru_maxrss / 1024
+
+
+def calificar(args) -> dict:
+    inicio = time.perf_counter()
+    ruta = Path(args.data)
+    es_parquet = ruta.suffix.lower() in PARQUET
+    
+    modelos = {}
+    for pipeline in args.pipelines:
+        modelos[pipeline] = utils.load_pipeline(pipeline)
+        print(f"✅ {pipeline}: versión {modelos[pipeline]['version']}")
+    
+    requeridas = list(dict.fromkeys(f for m in modelos.values() for f in m["encoder"].features))
+    config = {
+        "ruta": str(ruta),
+        "encoders": {p: (m["encoder"].features, m["encoder"].categories) for p, m in modelos.items()},
+        "names": modelos["segmentacion"]["names"] if "segmentacion" in modelos else None,
+        "requeridas": requeridas,
+        "keep": list(args.keep),
+        "columnas": list(dict.fromkeys(args.keep + requeridas)),
+    }
+    if es_parquet:
+        bloques = bloques_parquet(ruta, args.chunk_rows)
+    else:
+        config["encabezado"], bloques = bloques_csv(ruta, args.chunk_rows)
+        config["sep"] = args.sep or separador(config["encabezado"])
+    print(f"▶ {len(bloques)} bloques, {args.workers} proceso(s) de cálculo" if args.workers > 0
+          else f"▶ {len(bloques)} bloques, en este proceso")
+    
+    escritor = Escritor(args.output)
+    invalidas, desconocidas = 0, Counter()
+    
+    # Carpeta propia de esta corrida (no la del servidor): se borra al terminar
+    default_shared_path().mkdir(parents=True, exist_ok=True)
+    directorio = Path(tempfile.mkdtemp(prefix="calificar-", dir=default_shared_path()))
+    
+    def guardar(resultado) -> None:
+        nonlocal invalidas
+        salida, n_invalidas, n_desconocidas = resultado
+        escritor.escribir(salida)
+        invalidas += n_invalidas
+        desconocidas.update(n_desconocidas)
+        if args.progress:
+            print(f"  {escritor.filas:,} filas ({escritor.filas / (time.perf_counter() - inicio):,.0f} filas/s)")
+    
+    try:
+        config["directories"] = {p: str(export_engine(m["engine"], directorio, p)) for p, m in modelos.items()}
+        if args.workers <= 0:
+            _iniciar(config)
+            for bloque in bloques:
+                guardar(calificar_bloque(bloque))
+        else:
+            # spawn: los procesos no heredan los pickles de sklearn del proceso principal
+            with ProcessPoolExecutor(
+                max_workers=args.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_iniciar,
+                initargs=(config,),
+            ) as executor:
+                # A lo más 2 bloques en vuelo por proceso: la memoria no crece con el archivo
+                pendientes = deque()
+                for bloque in bloques:
+                    pendientes.append(executor.submit(calificar_bloque, bloque))
+                    if len(pendientes) >= 2 * args.workers:
+                        guardar(pendientes.popleft().result())
+                while pendientes:
+                    guardar(pendientes.popleft().result())
+    finally:
+        escritor.cerrar()
+        shutil.rmtree(directorio, ignore_errors=True)
+    
+    segundos = time.perf_counter() - inicio
+    return {
+        "filas": escritor.filas,
+        "filas_invalidas": invalidas,
+        "categorias_desconocidas": dict(desconocidas),
+        "segundos": round(segundos, 2),
+        "filas_s": round(escritor.filas / segundos) if segundos else None,
+        "memoria_pico_mb": {
+            "principal": round(_memoria_mb(resource.RUSAGE_SELF), 1),
+            "proceso_mas_grande": round(_memoria_mb(resource.RUSAGE_CHILDREN), 1),
+        },
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Califica un CSV o Parquet de clientes sin pasar por HTTP.")
+    parser.add_argument("--data", type=Path, required=True, help="CSV (`;` como bank.csv, o `,`) o Parquet")
+    parser.add_argument("--output", type=Path, required=True, help="Salida .csv (`;`) o .parquet")
+    parser.add_argument("--pipelines", type=lambda s: s.split(","), default=list(utils.PIPELINES),
+                        help="clasificacion,segmentacion (default: los dos)")
+    parser.add_argument("--keep", nargs="*", default=[], help="Columnas de entrada que se copian a la salida (p. ej. un id)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Procesos (0 = en este proceso)")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="Filas aproximadas por bloque")
+    parser.add_argument("--sep", default=None, help="Separador del CSV de entrada (default: se detecta)")
+    parser.add_argument("--models-path", type=Path, default=utils.MODELS_PATH)
+    parser.add_argument("--progress", action="store_true", help="Imprimir el avance por bloque")
+    args = parser.parse_args(argv)
+    
+    desconocidos = set(args.pipelines) - set(utils.PIPELINES)
+    if desconocidos:
+        parser.error(f"Pipelines desconocidos: {', '.join(sorted(desconocidos))}")
+    if Path(args.data).suffix.lower() in PARQUET or Path(args.output).suffix.lower() in PARQUET:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("Leer o escribir Parquet requiere pyarrow (pip install pyarrow)")
+    utils.MODELS_PATH = args.models_path
+    
+    reporte = calificar(args)
+    memoria = reporte["memoria_pico_mb"]
+    print(f"\n✅ {reporte['filas']:,} filas en {reporte['segundos']:.1f} s → {reporte['filas_s']:,} filas/s · {args.output}")
+    if args.workers > 0:
+        print(f"   Memoria pico: {memoria['principal']:,.0f} MB proceso principal, "
+              f"{memoria['proceso_mas_grande']:,.0f} MB el proceso de cálculo más grande")
+    else:
+        print(f"   Memoria pico: {memoria['principal']:,.0f} MB")
+    if reporte["filas_invalidas"]:
+        print(f"⚠️ {reporte['filas_invalidas']:,} filas con valores faltantes (predicción vacía)")
+    if reporte["categorias_desconocidas"]:
+        detalle = ", ".join(f"{col}: {n:,}" for col, n in reporte["categorias_desconocidas"].items())
+        print(f"⚠️ Categorías desconocidas codificadas como 0 → {detalle}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+"""
+Control de admisión de los endpoints de predicción.
+
+Con más tráfico del que cabe, las peticiones se acumulan detrás del motor y
+la latencia crece sin límite: los clientes vencen su timeout, reintentan y
+alargan la cola con trabajo que nadie va a leer. Aquí cada endpoint tiene un
+máximo de peticiones en curso y una cola acotada, y lo que no alcanzaría a
+atenderse a tiempo se rechaza de inmediato, sin ocupar el motor.
+
+- Deadline: `X-Deadline-Ms` (milisegundos que el cliente está dispuesto a
+  esperar; sin el header, ADMISSION_DEADLINE_MS). Si la espera estimada en
+  la cola lo rebasa: 503 sin hacer fila. Si vence mientras espera: 503 sin evaluar.
+- Cola llena: 429.
+- Carriles: `interactivo` y `masivo` (los endpoints /batch, /stream y
+  /columnar, o `X-Priority: bulk`). Al liberarse un lugar pasa primero la
+  cola interactiva. Los endpoints masivos además tienen menos lugares en curso.
+
+Los rechazos llevan `Retry-After` (segundos para vaciar la cola actual), que
+el SDK respeta al reintentar.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from starlette.responses import JSONResponse
+
+from inference.metrics import METRICS, etapa, marcar_admitida
+
+# ADMISSION_ENABLED=0 lo desactiva (sin límites, como antes)
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") != "0"
+
+# Peticiones en curso por endpoint (individuales y masivos)
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "64"))
+ADMISSION_BULK_INFLIGHT = int(os.getenv("ADMISSION_BULK_INFLIGHT", "2"))
+
+# Peticiones esperando por endpoint, en cada carril
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "256"))
+ADMISSION_BULK_QUEUE = int(os.getenv("ADMISSION_BULK_QUEUE", "16"))
+
+# Deadline de las peticiones sin `X-Deadline-Ms` (0 = sin deadline)
+ADMISSION_DEADLINE_MS = float(os.getenv("ADMISSION_DEADLINE_MS", "10000"))
+
+INTERACTIVO = "interactivo"
+MASIVO = "masivo"
+CARRILES = (INTERACTIVO, MASIVO)  # en orden de prioridad
+
+SUFIJOS_MASIVOS = ("/batch", "/stream", "/columnar")
+PRIORIDADES = {
+    "interactive": INTERACTIVO,
+    "interactivo": INTERACTIVO,
+    "bulk": MASIVO,
+    "masivo": MASIVO,
+}
+
+# Peso de cada muestra nueva en el tiempo de servicio promedio (EWMA)
+SUAVIZADO = 0.2
+MAX_RETRY_AFTER_S = 30
+
+MOTIVOS = ("cola_llena", "deadline", "vencida")
+
+
+class Rechazo(Exception):
+    """La petición no se admite; se responde `status` con Retry-After."""
+    
+    def __init__(self, status: int, motivo: str, detalle: str, retry_after: int):
+        super().__init__(detalle)
+        self.status = status
+        self.motivo = motivo
+        self.detalle = detalle
+        self.retry_after = retry_after
+    
+    def respuesta(self) -> JSONResponse:
+        return JSONResponse(
+            {"detail": self.detalle},
+            status_code=self.status,
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+
+# =============================================================================
+# LÍMITES DE UN ENDPOINT
+# =============================================================================
+
+class Limitador:
+    """
+    Lugares en curso y colas por carril de un endpoint. Solo se usa desde el
+    event loop, así que no necesita locks: un lugar que se libera pasa
+    directo a la siguiente petición en cola.
+    """
+    
+    def __init__(self, max_en_curso: int, max_cola: Dict[str, int]):
+        self.max_en_curso = max(1, max_en_curso)
+        self.max_cola = max_cola
+        self.en_curso = 0
+        self.colas: Dict[str, Deque[asyncio.Future]] = {carril: deque() for carril in CARRILES}
+        self.servicio = 0.0  # segundos por petición (EWMA); 0 = aún sin muestras
+        self.atendidas = 0
+        self.rechazadas = dict.fromkeys(MOTIVOS, 0)
+    
+    def _delante(self, carril: str) -> int:
+        """Peticiones que pasarían antes que una nueva de `carril`."""
+        delante = 0
+        for otro in CARRILES:
+            delante += len(self.colas[otro])
+            if otro == carril:
+                return delante
+        return delante
+    
+    def espera_estimada(self, delante: int) -> float:
+        """Segundos hasta tener lugar con `delante` peticiones antes (todos los lugares ocupados)."""
+        return (delante + 1) * self.servicio / self.max_en_curso
+    
+    def _rechazo(self, status: int, motivo: str, detalle: str) -> Rechazo:
+        self.rechazadas[motivo] += 1
+        vaciar = self.espera_estimada(sum(len(cola) for cola in self.colas.values()))
+        return Rechazo(status, motivo, detalle, min(MAX_RETRY_AFTER_S, max(1, math.ceil(vaciar))))
+    
+    async def entrar(self, carril: str, deadline: Optional[float]) -> None:
+        """Espera un lugar o lanza `Rechazo`. `deadline` en segundos de `time.monotonic()`."""
+        if self.en_curso < self.max_en_curso:
+            self.en_curso += 1
+            return
+        
+        cola = self.colas[carril]
+        if len(cola) >= self.max_cola[carril]:
+            raise self._rechazo(429, "cola_llena", "Demasiadas peticiones en espera, intente más tarde")
+        
+        limite = None
+        if deadline is not None:
+            # Llegar al motor con menos tiempo del que tarda sería trabajo perdido
+            limite = deadline - time.monotonic() - self.servicio
+            if self.espera_estimada(self._delante(carril)) > limite:
+                raise self._rechazo(503, "deadline", "La API está saturada: no alcanzaría a responder a tiempo")
+        
+        lugar = asyncio.get_running_loop().create_future()
+        cola.append(lugar)
+        try:
+            await asyncio.wait((lugar,), timeout=max(0.0, limite) if limite is not None else None)
+        except asyncio.CancelledError:
+            self._abandonar(cola, lugar)
+            raise
+        if not lugar.done():
+            self._abandonar(cola, lugar)
+            raise self._rechazo(503, "vencida", "La petición venció su deadline en la cola")
+    
+    def _abandonar(self, cola: Deque[asyncio.Future], lugar: asyncio.Future) -> None:
+        """Una petición deja la cola; si ya le habían pasado un lugar, lo devuelve."""
+        if lugar.done():
+            self._liberar()
+        else:
+            lugar.cancel()
+            cola.remove(lugar)
+    
+    def salir(self, segundos: Optional[float]) -> None:
+        """Libera el lugar; `segundos` (si la petición fue exitosa) actualiza el tiempo de servicio."""
+        if segundos is not None:
+            self.atendidas += 1
+            if self.servicio == 0.0:
+                self.servicio = segundos
+            else:
+                self.servicio += SUAVIZADO * (segundos - self.servicio)
+        self._liberar()
+    
+    def _liberar(self) -> None:
+        for carril in CARRILES:
+            cola = self.colas[carril]
+            while cola:
+                lugar = cola.popleft()
+                if not lugar.done():
+                    lugar.set_result(None)  # el lugar pasa tal cual: en_curso no cambia
+                    return
+        self.en_curso -= 1
+    
+    def estado(self) -> dict:
+        return {
+            "en_curso": self.en_curso,
+            "max_en_curso": self.max_en_curso,
+            "en_cola": {carril: len(cola) for carril, cola in self.colas.items()},
+            "servicio_ms": round(self.servicio * 1000, 3),
+            "atendidas": self.atendidas,
+            "rechazadas": dict(self.rechazadas),
+        }
+
+
+# =============================================================================
+# MIDDLEWARE
+# =============================================================================
+
+def _headers(scope) -> Dict[bytes, bytes]:
+    return {key: value for key, value in scope["headers"] if key in (b"x-deadline-ms", b"x-priority")}
+
+
+def _deadline(valor: Optional[bytes], inicio: float) -> Optional[float]:
+    """Instante límite a partir de `X-Deadline-Ms` (o el default); None = sin deadline."""
+    ms = ADMISSION_DEADLINE_MS
+    if valor is not None:
+        try:
+            ms = float(valor)
+        except ValueError:
+            pass
+    return inicio + ms / 1000 if ms > 0 else None
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI (como `MetricsMiddleware`) que aplica un `Limitador` por
+    cada ruta declarada bajo `prefix`. Va por dentro de las métricas, así que
+    los rechazos cuentan en `requests_total` y la espera en la etapa `cola`.
+    """
+    
+    def __init__(self, app, prefix: str = "/predict"):
+        self.app = app
+        self.prefix = prefix
+        self._rutas: Optional[frozenset] = None
+    
+    def _carril(self, path: str, prioridad: Optional[bytes]) -> str:
+        if prioridad is not None:
+            carril = PRIORIDADES.get(prioridad.decode("latin-1").strip().lower())
+            if carril is not None:
+                return carril
+        return MASIVO if path.endswith(SUFIJOS_MASIVOS) else INTERACTIVO
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        
+        if self._rutas is None:
+            self._rutas = frozenset(getattr(r, "path", None) for r in scope["app"].routes)
+        path = scope["path"]
+        if path not in self._rutas:
+            await self.app(scope, receive, send)
+            return
+        
+        inicio = time.monotonic()
+        headers = _headers(scope)
+        limitador = ADMISION.limitador(path)
+        try:
+            with etapa("cola"):
+                await limitador.entrar(
+                    self._carril(path, headers.get(b"x-priority")),
+                    _deadline(headers.get(b"x-deadline-ms"), inicio),
+                )
+        except Rechazo as rechazo:
+            METRICS.inc("requests_shed_total", (("endpoint", path), ("reason", rechazo.motivo)))
+            await rechazo.respuesta()(scope, receive, send)
+            return
+        marcar_admitida()
+        
+        status = 500
+        
+        async def enviar(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        admitida = time.monotonic()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            limitador.salir(time.monotonic() - admitida if status < 400 else None)
+
+
+class Admision:
+    """Limitadores por endpoint, creados al primer uso de cada ruta."""
+    
+    def __init__(self):
+        self._limitadores: Dict[str, Limitador] = {}
+    
+    def limitador(self, path: str) -> Limitador:
+        limitador = self._limitadores.get(path)
+        if limitador is None:
+            masivo = path.endswith(SUFIJOS_MASIVOS)
+            limitador = self._limitadores[path] = Limitador(
+                ADMISSION_BULK_INFLIGHT if masivo else ADMISSION_MAX_INFLIGHT,
+                {INTERACTIVO: ADMISSION_MAX_QUEUE, MASIVO: ADMISSION_BULK_QUEUE},
+            )
+        return limitador
+    
+    def estado(self) -> Dict[str, dict]:
+        """Para /health: en curso, en cola y rechazos de cada endpoint usado."""
+        return {path: limitador.estado() for path, limitador in sorted(self._limitadores.items())}
+
+
+ADMISION = Admision()
@@ -0,0 +1,90 @@
+"""
+Micro-batching de predicciones individuales.
+Agrupa las peticiones concurrentes en una sola matriz y la evalúa fuera del event loop.
+"""
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Junta filas que llegan casi al mismo tiempo y las evalúa en un solo lote.
+    
+    - La primera fila que llega abre una ventana de `max_wait_ms`. Si no hay
+      ningún lote en curso, la ventana dura solo hasta la siguiente vuelta del
+      event loop: con poco tráfico no se agrega latencia.
+    - El lote se envía al cerrar la ventana o al juntar `max_batch_size` filas.
+    - `fn` recibe la matriz completa en un hilo (o proceso) del `executor` y
+      debe regresar un resultado por fila, en el mismo orden.
+    - Cada llamador recibe únicamente el resultado de su fila.
+    """
+    
+    def __init__(
+        self,
+        fn: Callable[[np.ndarray], Sequence[Any]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+        executor: Optional[Executor] = None,
+    ):
+        self.fn = fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.executor = executor
+        
+        self._pending: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._inflight = 0
+    
+    async def submit(self, X: np.ndarray) -> Any:
+        """Encola una matriz de una fila y espera su resultado."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((X, future))
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            delay = self.max_wait if self._inflight else 0
+            self._timer = loop.call_later(delay, self._flush)
+        
+        return await future
+    
+    async def run(self, X: np.ndarray) -> Sequence[Any]:
+        """Evalúa una matriz completa en el executor, sin esperar a otras peticiones."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.fn, X)
+    
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        pending, self._pending = self._pending, []
+        if pending:
+            self._inflight += 1
+            task = asyncio.ensure_future(self._run_batch(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run_batch(self, pending: List[Tuple[np.ndarray, asyncio.Future]]) -> None:
+        try:
+            # Dentro del try: si las filas no se pueden juntar, fallan todas en vez de colgarse
+            X = np.concatenate([row for row, _ in pending])
+            results = await self.run(X)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._inflight -= 1
+        
+        # Si el cliente se desconectó, su future ya está cancelado
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
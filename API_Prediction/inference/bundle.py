@@ -0,0 +1,405 @@
+"""
+Formato de artefactos de la API ("bundle").
+Cada pipeline se guarda en una carpeta con un `manifest.json` y un `.npy` por arreglo.
+
+    models/segmentacion.bundle/
+    ├── manifest.json     # formato, versión, features, categorías, nombres, metadatos del motor
+    ├── projection.npy    # arreglos del motor (se abren con mmap, sin pickle)
+    └── ...
+
+Uso desde la carpeta API_Prediction:
+    python -m inference.bundle export                 # .pkl → .bundle (ambos pipelines)
+    python -m inference.bundle export segmentacion
+    python -m inference.bundle info models/segmentacion.bundle
+    python -m inference.bundle verify                 # compara bundle vs .pkl
+
+    # Bosque compacto (tipos mínimos, poda opcional), validado contra el original
+    python -m inference.bundle export clasificacion --compact --eval-data ../bank.csv
+    python -m inference.bundle export clasificacion --compact --max-trees 50 --max-depth 20 --tolerance 0.01
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+from inference.encoder import FeatureEncoder
+from inference.forest import CompactForest, CompiledForest
+from inference.segmentacion import FusedSegmenter
+
+BUNDLE_FORMAT = "banco-api-bundle"
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_SUFFIX = ".bundle"
+
+# Motores que se pueden guardar/cargar por nombre de clase
+ENGINES = {
+    "CompiledForest": CompiledForest,
+    "CompactForest": CompactForest,
+    "FusedSegmenter": FusedSegmenter,
+}
+
+
+# =============================================================================
+# ARREGLOS EN DISCO
+# =============================================================================
+
+def content_hash(arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> str:
+    """Hash del contenido: mismos arreglos y metadatos → misma versión."""
+    digest = hashlib.sha1(json.dumps(meta, sort_keys=True, ensure_ascii=False).encode())
+    for key in sorted(arrays):
+        array = np.ascontiguousarray(arrays[key])
+        digest.update(f"{key}:{array.dtype.str}:{array.shape}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()[:12]
+
+
+def write_arrays(directory: Path, arrays: Dict[str, np.ndarray]) -> None:
+    for key, array in arrays.items():
+        np.save(Path(directory) / f"{key}.npy", np.ascontiguousarray(array), allow_pickle=False)
+
+
+def read_arrays(directory: Path, keys: Iterable[str], mmap: bool = True) -> Dict[str, np.ndarray]:
+    return {
+        key: np.load(Path(directory) / f"{key}.npy", mmap_mode="r" if mmap else None, allow_pickle=False)
+        for key in keys
+    }
+
+
+def file_stat(path: Path) -> dict:
+    """Huella barata de un archivo (tamaño + mtime); al cargar evita hashear los .pkl sin cambios."""
+    stat = Path(path).stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def file_digest(path: Path, chunk: int = 1 << 20) -> dict:
+    """Huella completa: tamaño + mtime + sha1 (por bloques, sin leer el archivo entero a memoria)."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        while block := f.read(chunk):
+            digest.update(block)
+    return {**file_stat(path), "sha1": digest.hexdigest()}
+
+
+def write_atomic(target: Path, write) -> Path:
+    """
+    Escribe una carpeta en una ubicación temporal y la renombra a `target`.
+    Si `target` ya existe (otro proceso ganó la carrera) se conserva la existente.
+    """
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f".{target.name}-", dir=target.parent))
+    staging.chmod(0o755)
+    try:
+        write(staging)
+        os.rename(staging, target)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        if not target.exists():
+            raise
+    return target
+
+
+# =============================================================================
+# BUNDLES
+# =============================================================================
+
+def build_manifest(
+    pipeline: str,
+    encoder: FeatureEncoder,
+    engine,
+    names: Optional[Dict[int, str]] = None,
+    sources: Optional[Dict[str, dict]] = None,
+) -> tuple:
+    """
+    Arreglos y manifest de un pipeline.
+    
+    `manifest["version"]` es el hash del contenido (no depende de `sources`,
+    las huellas de los .pkl de los que se exportó).
+    """
+    arrays, engine_meta = engine.to_arrays()
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "pipeline": pipeline,
+        "features": encoder.features,
+        "categories": encoder.categories,
+        "engine": {
+            "type": type(engine).__name__,
+            "meta": engine_meta,
+            "arrays": sorted(arrays),
+        },
+    }
+    if names is not None:
+        manifest["names"] = {str(k): v for k, v in names.items()}
+    manifest["version"] = content_hash(arrays, manifest)
+    if sources is not None:
+        manifest["sources"] = sources
+    return arrays, manifest
+
+
+def save_bundle(directory: Path, pipeline: str, encoder, engine, names=None, sources=None) -> str:
+    """Guarda un pipeline como bundle (reemplaza el anterior). Regresa la versión."""
+    directory = Path(directory)
+    arrays, manifest = build_manifest(pipeline, encoder, engine, names, sources)
+    
+    def write(staging: Path) -> None:
+        write_arrays(staging, arrays)
+        (staging / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2))
+    
+    # Reemplazo atómico: se escribe al lado y se intercambia con rename
+    old = directory.with_name(directory.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if directory.exists():
+        os.rename(directory, old)
+    write_atomic(directory, write)
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest["version"]
+
+
+def load_bundle(directory: Path, mmap: bool = True) -> Dict[str, Any]:
+    """
+    Carga un bundle sin pickle ni sklearn.
+    
+    Returns:
+        Diccionario con `encoder`, `engine`, `features`, `version` y, para
+        segmentación, `names`.
+    """
+    directory = Path(directory)
+    manifest = json.loads((directory / "manifest.json").read_text())
+    if manifest.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"{directory} no es un bundle de la API")
+    if manifest["format_version"] > BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Versión de formato no soportada: {manifest['format_version']}")
+    
+    engine_info = manifest["engine"]
+    arrays = read_arrays(directory, engine_info["arrays"], mmap=mmap)
+    engine = ENGINES[engine_info["type"]].from_arrays(arrays, engine_info["meta"])
+    
+    models = {
+        "encoder": FeatureEncoder(manifest["features"], manifest["categories"]),
+        "engine": engine,
+        "features": manifest["features"],
+        "version": manifest["version"],
+        "sources": manifest.get("sources", {}),
+    }
+    if "names" in manifest:
+        models["names"] = {int(k): v for k, v in manifest["names"].items()}
+    return models
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def _eval_data(path: Path, encoder: FeatureEncoder) -> tuple:
+    """Matriz codificada y etiquetas (columna `y`, 'yes'/'no') de un CSV o Parquet."""
+    import pandas as pd
+    from utils import encode_frame
+    
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        df = pd.read_parquet(path)
+    else:
+        with open(path, encoding="utf-8") as f:
+            encabezado = f.readline()
+        df = pd.read_csv(path, sep=";" if encabezado.count(";") >= encabezado.count(",") else ",")
+    return encode_frame(df, encoder), (df["y"] == "yes").to_numpy()
+
+
+def compact_report(models: Dict[str, Any], compact: CompactForest, X_eval=None, y_eval=None) -> dict:
+    """
+    Tamaño y diferencias del bosque compacto contra el original (`models["engine"]`,
+    idéntico a sklearn): filas cuya clase cambia y máxima diferencia de
+    probabilidad sobre datos sintéticos dentro del rango del scaler y, si hay
+    `X_eval`/`y_eval`, accuracy y recall de ambos.
+    """
+    import pickle
+    
+    original = models["engine"]
+    report = {
+        "bytes": {
+            "sklearn_pickle": len(pickle.dumps(models["modelo"])) if "modelo" in models else None,
+            "compiled": sum(a.nbytes for a in original.to_arrays()[0].values()),
+            "compact": compact.nbytes,
+        },
+        "trees": {"original": original.n_trees, "compact": compact.n_trees},
+    }
+    conjuntos = {"sinteticos": original.sample_training_like(models["scaler"], n=20000)}
+    if X_eval is not None:
+        conjuntos["evaluacion"] = X_eval
+    for nombre, X in conjuntos.items():
+        clase_o, proba_o = original.predict_with_proba(X)
+        clase_c, proba_c = compact.predict_with_proba(X)
+        report[nombre] = {
+            "filas": int(len(X)),
+            "clase_distinta": float(np.mean(clase_o != clase_c)),
+            "max_diff_proba": float(np.abs(proba_o[:, 1] - proba_c[:, 1]).max()),
+        }
+    if y_eval is not None:
+        from sklearn.metrics import accuracy_score, recall_score
+        
+        for nombre, engine in (("original", original), ("compact", compact)):
+            pred = engine.predict_with_proba(X_eval)[0].astype(bool)
+            report["evaluacion"][nombre] = {
+                "accuracy": float(accuracy_score(y_eval, pred)),
+                "recall": float(recall_score(y_eval, pred)),
+            }
+    return report
+
+
+def _print_report(report: dict) -> None:
+    b = report["bytes"]
+    pickle_kb = f"{b['sklearn_pickle'] / 1024:,.0f} KB" if b["sklearn_pickle"] else "—"
+    print(f"   Tamaño: pickle {pickle_kb} · CompiledForest {b['compiled'] / 1024:,.0f} KB · "
+          f"compacto {b['compact'] / 1024:,.0f} KB ({b['compiled'] / b['compact']:.1f}× menos)")
+    print(f"   Árboles: {report['trees']['original']} → {report['trees']['compact']}")
+    for nombre in ("sinteticos", "evaluacion"):
+        if nombre not in report:
+            continue
+        r = report[nombre]
+        print(f"   {nombre}: {r['filas']:,} filas, clase distinta en {r['clase_distinta'] * 100:.3f}%, "
+              f"máx. diferencia de probabilidad {r['max_diff_proba']:.4f}")
+        if "original" in r:
+            o, c = r["original"], r["compact"]
+            print(f"     accuracy {o['accuracy']:.4f} → {c['accuracy']:.4f} ({c['accuracy'] - o['accuracy']:+.4f}) · "
+                  f"recall {o['recall']:.4f} → {c['recall']:.4f} ({c['recall'] - o['recall']:+.4f})")
+
+
+def _compactar(models: Dict[str, Any], args) -> Optional[CompactForest]:
+    """Bosque compacto si cumple la tolerancia (None si no)."""
+    compact = CompactForest.from_sklearn(
+        models["modelo"], scaler=models["scaler"], max_trees=args.max_trees, max_depth=args.max_depth
+    )
+    X_eval = y_eval = None
+    if args.eval_data is not None:
+        X_eval, y_eval = _eval_data(args.eval_data, models["encoder"])
+    report = compact_report(models, compact, X_eval, y_eval)
+    _print_report(report)
+    
+    distinta = report.get("evaluacion", report["sinteticos"])["clase_distinta"]
+    if distinta > args.tolerance:
+        print(f"❌ clasificacion: la clase cambia en {distinta * 100:.3f}% de las filas "
+              f"(tolerancia {args.tolerance * 100:.3f}%); menos poda o más --tolerance")
+        return None
+    compact.info["tolerance"] = args.tolerance
+    if args.report is not None:
+        args.report.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    return compact
+
+
+def _sources(pipeline: str, models_path: Path) -> Dict[str, dict]:
+    """Huellas completas (con sha1) de los .pkl del pipeline."""
+    from utils import PICKLES
+    
+    return {filename: file_digest(models_path / filename) for filename in PICKLES[pipeline].values()}
+
+
+def _export(pipelines, out: Path, args=None) -> int:
+    from utils import load_pipeline_from_pickles
+    
+    fallas = 0
+    for pipeline in pipelines:
+        try:
+            models = load_pipeline_from_pickles(pipeline)
+        except Exception as e:
+            print(f"❌ {pipeline}: {e}")
+            fallas += 1
+            continue
+        engine = models["engine"]
+        if args is not None and args.compact and pipeline == "clasificacion":
+            engine = _compactar(models, args)
+            if engine is None:
+                fallas += 1
+                continue
+        target = out / f"{pipeline}{BUNDLE_SUFFIX}"
+        version = save_bundle(
+            target, pipeline, models["encoder"], engine,
+            names=models.get("names"), sources=_sources(pipeline, out),
+        )
+        print(f"✅ {pipeline}: {target} (versión {version})")
+    return fallas
+
+
+def _verify(pipelines, out: Path) -> int:
+    from utils import load_pipeline_from_pickles
+    
+    fallas = 0
+    for pipeline in pipelines:
+        bundle = load_bundle(out / f"{pipeline}{BUNDLE_SUFFIX}")
+        reference = load_pipeline_from_pickles(pipeline)
+        # Al cargar solo se compara tamaño + mtime; aquí se compara el contenido
+        current = _sources(pipeline, out)
+        changed = [
+            filename for filename, digest in bundle["sources"].items()
+            if digest.get("sha1") != current.get(filename, {}).get("sha1")
+        ]
+        if changed:
+            print(f"❌ {pipeline}: los .pkl cambiaron desde la exportación ({', '.join(changed)})")
+            fallas += 1
+            continue
+        X = reference["engine"].sample_training_like(reference["scaler"])
+        if isinstance(bundle["engine"], CompactForest):
+            # Compacto: no es idéntico, se compara contra la tolerancia con la que se exportó
+            distinta = float(np.mean(bundle["engine"].score(X)[:, 0] != reference["engine"].score(X)[:, 0]))
+            ok = distinta <= bundle["engine"].info.get("tolerance", 0.0)
+            print(f"{'✅' if ok else '❌'} {pipeline}: bundle compacto {bundle['version']}, "
+                  f"clase distinta en {distinta * 100:.3f}% de las filas")
+            fallas += not ok
+            continue
+        ok = (
+            bundle["version"] == reference["version"]
+            and np.array_equal(bundle["engine"].score(X), reference["engine"].score(X))
+        )
+        fallas += not ok
+        print(f"{'✅' if ok else '❌'} {pipeline}: bundle {bundle['version']} / pkl {reference['version']}")
+    return fallas
+
+
+def main(argv=None) -> int:
+    import utils
+    
+    parser = argparse.ArgumentParser(description="Exporta/inspecciona los bundles de modelos.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for command in ("export", "verify"):
+        p = sub.add_parser(command)
+        p.add_argument("pipelines", nargs="*", help=f"Pipelines: {', '.join(utils.PIPELINES)} (default: todos)")
+        p.add_argument("--models-path", type=Path, default=utils.MODELS_PATH)
+        if command == "export":
+            p.add_argument("--compact", action="store_true",
+                           help="Clasificación: bosque compacto (tipos mínimos) en lugar del CompiledForest")
+            p.add_argument("--max-trees", type=int, default=None, help="Con --compact: conservar los primeros N árboles")
+            p.add_argument("--max-depth", type=int, default=None, help="Con --compact: cortar los árboles a esta profundidad")
+            p.add_argument("--tolerance", type=float, default=0.001,
+                           help="Con --compact: fracción máxima de filas cuya clase puede cambiar")
+            p.add_argument("--eval-data", type=Path, default=None,
+                           help="Con --compact: CSV/Parquet con `y` para comparar accuracy y recall")
+            p.add_argument("--report", type=Path, default=None, help="Con --compact: guardar la comparación en JSON")
+    p = sub.add_parser("info")
+    p.add_argument("bundle", type=Path)
+    args = parser.parse_args(argv)
+    
+    if args.command == "info":
+        print(json.dumps(json.loads((args.bundle / "manifest.json").read_text()), indent=2, ensure_ascii=False))
+        return 0
+    
+    pipelines = args.pipelines or list(utils.PIPELINES)
+    desconocidos = set(pipelines) - set(utils.PIPELINES)
+    if desconocidos:
+        parser.error(f"Pipelines desconocidos: {', '.join(sorted(desconocidos))}")
+    
+    # Los .pkl y los bundles se leen/escriben en la misma carpeta
+    utils.MODELS_PATH = args.models_path
+    if args.command == "export":
+        return 1 if _export(pipelines, args.models_path, args) else 0
+    return 1 if _verify(pipelines, args.models_path) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
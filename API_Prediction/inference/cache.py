@@ -0,0 +1,97 @@
+"""
+Cache de predicciones en memoria.
+LRU con expiración (TTL), indexado por el vector de features ya codificado.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    Cache LRU + TTL para respuestas de un pipeline.
+    
+    - La llave son los bytes de la fila codificada (misma fila → misma llave,
+      sin importar el orden de los campos en el JSON).
+    - Cada entrada guarda la versión del modelo; si cambia la versión cargada,
+      el cache se vacía completo en la siguiente consulta.
+    - Se usa desde el event loop (un solo hilo), así que no necesita locks.
+    """
+    
+    def __init__(self, max_size: int = 10_000, ttl_seconds: float = 300.0):
+        self.max_size = max(0, int(max_size))
+        self.ttl = ttl_seconds
+        self.version: Optional[str] = None
+        
+        self._data: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+    
+    @staticmethod
+    def key(X: np.ndarray) -> bytes:
+        return X.tobytes()
+    
+    def _check_version(self, version: str) -> None:
+        if version != self.version:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self.version = version
+    
+    def get(self, key: bytes, version: str) -> Optional[Any]:
+        """Respuesta guardada, o None si no está, expiró o es de otra versión del modelo."""
+        if not self.enabled:
+            return None
+        self._check_version(version)
+        
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        value, expires = entry
+        if expires < time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def put(self, key: bytes, version: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        self._check_version(version)
+        
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+    
+    def clear(self) -> None:
+        self._data.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "version": self.version,
+        }
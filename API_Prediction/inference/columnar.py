@@ -0,0 +1,184 @@
+"""
+Formato columnar binario para tráfico entre servicios.
+
+Un payload es un encabezado JSON seguido de un buffer NumPy por columna:
+
+    bytes 0-3    b"BNC1"
+    bytes 4-7    largo H del encabezado (uint32 little-endian)
+    bytes 8-     H bytes de encabezado JSON (UTF-8)
+    relleno      ceros hasta el siguiente múltiplo de 8: ahí empiezan los datos
+    datos        cada columna en `offset` bytes desde el inicio de los datos
+
+    {
+      "filas": 1000,
+      "columnas": {
+        "age": {"dtype": "<i8", "offset": 0},
+        "job": {"dtype": "|u1", "offset": 8000, "categorias": ["admin.", "management"]},
+        ...
+      }
+    }
+
+- Cada columna es un arreglo contiguo de `filas` elementos del `dtype` dado
+  en notación de NumPy (`<i4`, `<i8`, `<f8`, `|u1`, `|b1`, ...), little-endian.
+- Las columnas de texto van codificadas como diccionario: `categorias` tiene
+  los valores distintos y el buffer, el índice de cada fila (entero).
+- Los `offset` deberían estar alineados a 8 bytes; `encode` siempre lo hace.
+
+Al decodificar, cada columna es un `np.frombuffer` sobre el payload: no se
+copia nada hasta que el encoder arma la matriz del modelo.
+"""
+
+import json
+import struct
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"BNC1"
+MEDIA_TYPE = "application/vnd.banco.columnar"
+ALIGN = 8
+
+Columnas = Dict[str, np.ndarray]
+Categorias = Dict[str, List[str]]
+
+
+class ColumnarError(ValueError):
+    """Payload mal formado."""
+
+
+def _alinear(n: int) -> int:
+    return -(-n // ALIGN) * ALIGN
+
+
+# =============================================================================
+# DECODIFICAR / CODIFICAR
+# =============================================================================
+
+def decode(payload: bytes) -> Tuple[int, Columnas, Categorias]:
+    """Regresa `(filas, columnas, categorias)`; las columnas son vistas de solo lectura del payload."""
+    if len(payload) < 8 or payload[:4] != MAGIC:
+        raise ColumnarError("El payload no empieza con el prefijo BNC1")
+    (largo,) = struct.unpack_from("<I", payload, 4)
+    if 8 + largo > len(payload):
+        raise ColumnarError("El encabezado se sale del payload")
+    try:
+        header = json.loads(payload[8:8 + largo])
+        n = int(header["filas"])
+        specs = dict(header["columnas"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ColumnarError(f"Encabezado inválido: {e}")
+    if n < 0:
+        raise ColumnarError("`filas` no puede ser negativo")
+    
+    inicio = _alinear(8 + largo)
+    columnas: Columnas = {}
+    categorias: Categorias = {}
+    for name, spec in specs.items():
+        try:
+            dtype = np.dtype(spec["dtype"])
+            offset = inicio + int(spec["offset"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ColumnarError(f"{name}: especificación inválida ({e})")
+        if dtype.kind not in "biuf" or dtype.byteorder == ">":
+            raise ColumnarError(f"{name}: dtype no soportado {spec['dtype']} (números little-endian)")
+        if offset < inicio or offset + n * dtype.itemsize > len(payload):
+            raise ColumnarError(f"{name}: el buffer se sale del payload")
+        
+        columnas[name] = np.frombuffer(payload, dtype=dtype, count=n, offset=offset)
+        if "categorias" in spec:
+            categorias[name] = [str(c) for c in spec["categorias"]]
+    return n, columnas, categorias
+
+
+def encode(columnas: Mapping[str, np.ndarray], categorias: Optional[Mapping[str, Sequence[str]]] = None) -> bytes:
+    """
+    Arma un payload. Las columnas de texto (dtype `U`/`O`) se codifican como
+    diccionario automáticamente; también se pueden pasar ya codificadas con
+    su lista en `categorias`.
+    """
+    categorias = dict(categorias or {})
+    n: Optional[int] = None
+    specs = {}
+    buffers = []
+    offset = 0
+    for name, column in columnas.items():
+        column = np.asarray(column)
+        if column.dtype.kind in "UO":
+            valores, column = np.unique(column.astype(str), return_inverse=True)
+            categorias[name] = valores.tolist()
+            column = column.astype(np.uint8 if len(valores) <= 256 else np.int32)
+        column = np.ascontiguousarray(column, dtype=column.dtype.newbyteorder("<"))
+        if n is None:
+            n = len(column)
+        elif len(column) != n:
+            raise ColumnarError(f"{name}: {len(column)} filas, se esperaban {n}")
+        
+        spec = {"dtype": column.dtype.str, "offset": offset}
+        if name in categorias:
+            spec["categorias"] = [str(c) for c in categorias[name]]
+        specs[name] = spec
+        buffers.append((offset, column))
+        offset = _alinear(offset + column.nbytes)
+    
+    header = json.dumps({"filas": n or 0, "columnas": specs}, ensure_ascii=False).encode()
+    inicio = _alinear(8 + len(header))
+    payload = bytearray(inicio + offset)
+    payload[:4] = MAGIC
+    struct.pack_into("<I", payload, 4, len(header))
+    payload[8:8 + len(header)] = header
+    for offset, column in buffers:
+        payload[inicio + offset:inicio + offset + column.nbytes] = column.tobytes()
+    return bytes(payload)
+
+
+# =============================================================================
+# VALIDACIÓN CONTRA LOS ESQUEMAS
+# =============================================================================
+
+# Restricción de Pydantic → filas que la violan
+_RESTRICCIONES = (
+    ("ge", np.less),
+    ("gt", np.less_equal),
+    ("le", np.greater),
+    ("lt", np.greater_equal),
+)
+
+
+def check(esquema, columnas: Columnas, categorias: Categorias) -> List[str]:
+    """
+    Valida las columnas con los mismos campos y límites (`ge`, `le`, ...) que
+    el modelo Pydantic `esquema`, de forma vectorizada. Regresa los errores
+    (vacío si todo está bien); las columnas extra se ignoran.
+    """
+    errores = []
+    for name, field in esquema.model_fields.items():
+        column = columnas.get(name)
+        if column is None:
+            errores.append(f"{name}: falta la columna")
+            continue
+        
+        if field.annotation is str:
+            if name not in categorias or column.dtype.kind not in "iu":
+                errores.append(f"{name}: es texto, se espera un índice entero con `categorias`")
+                continue
+            fuera = (column < 0) | (column >= len(categorias[name]))
+            if fuera.any():
+                errores.append(f"{name}: índice fuera de `categorias` en la fila {int(np.argmax(fuera))}")
+            continue
+        
+        tipos = "biu" if field.annotation is int else "biuf"
+        if column.dtype.kind not in tipos:
+            errores.append(f"{name}: dtype {column.dtype.str} no es compatible con {field.annotation.__name__}")
+            continue
+        for restriccion in field.metadata:
+            for attr, viola in _RESTRICCIONES:
+                limite = getattr(restriccion, attr, None)
+                if limite is None:
+                    continue
+                fuera = viola(column, limite)
+                if fuera.any():
+                    errores.append(
+                        f"{name}: {int(np.count_nonzero(fuera))} filas no cumplen {attr}={limite} "
+                        f"(la primera es la fila {int(np.argmax(fuera))})"
+                    )
+    return errores
@@ -0,0 +1,127 @@
+"""
+Codificador de features precompilado.
+Convierte los datos validados de los clientes en una matriz NumPy sin pasar por pandas.
+"""
+
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+
+class FeatureEncoder:
+    """
+    Equivalente a `encode_categorical` pero compilado una sola vez al cargar los modelos.
+    
+    - Cada columna categórica se resuelve con un dict categoría → código.
+    - Las categorías desconocidas se codifican como 0 (igual que `encode_categorical`)
+      y se cuentan por columna en `unknown`.
+    - Las columnas se escriben directamente en una matriz float64 preasignada,
+      en el orden exacto de `features`.
+    """
+    
+    def __init__(self, features: Sequence[str], categories: Mapping[str, Sequence[str]]):
+        self.features: List[str] = list(features)
+        self.categories: Dict[str, List[str]] = {
+            col: list(classes) for col, classes in categories.items()
+        }
+        self.n_features = len(self.features)
+        
+        # (nombre, lookup) por columna; lookup=None para columnas numéricas
+        self._columns: List[tuple] = [
+            (name, self._lookup(self.categories.get(name)))
+            for name in self.features
+        ]
+        self.unknown: Dict[str, int] = {col: 0 for col in self.categories}
+    
+    @staticmethod
+    def _lookup(classes: Optional[List[str]]) -> Optional[Dict[str, int]]:
+        if classes is None:
+            return None
+        return {category: code for code, category in enumerate(classes)}
+    
+    @classmethod
+    def from_label_encoders(cls, encoders: dict, features: list) -> "FeatureEncoder":
+        """Construye el codificador a partir de los LabelEncoders pickleados."""
+        categories = {
+            col: [str(c) for c in encoder.classes_]
+            for col, encoder in encoders.items()
+        }
+        return cls(features, categories)
+    
+    def projection(self, other: "FeatureEncoder") -> Optional[np.ndarray]:
+        """
+        Columnas de la matriz de este encoder que forman la de `other`:
+        `X[:, idx]` es igual a lo que produciría `other` con los mismos
+        clientes. None si `other` usa una variable que este no tiene o
+        codifica alguna categórica con otras categorías.
+        """
+        posiciones = {name: j for j, name in enumerate(self.features)}
+        idx = []
+        for name in other.features:
+            if name not in posiciones or self.categories.get(name) != other.categories.get(name):
+                return None
+            idx.append(posiciones[name])
+        return np.asarray(idx, dtype=np.intp)
+    
+    def transform_one(self, data: Mapping) -> np.ndarray:
+        """Codifica un solo cliente. Regresa una matriz de forma (1, n_features)."""
+        X = np.empty((1, self.n_features), dtype=np.float64)
+        row = X[0]
+        for j, (name, lookup) in enumerate(self._columns):
+            value = data[name]
+            if lookup is None:
+                row[j] = value
+            else:
+                code = lookup.get(value)
+                if code is None:
+                    code = 0
+                    self.unknown[name] += 1
+                row[j] = code
+        return X
+    
+    def transform(self, rows: Sequence[Mapping]) -> np.ndarray:
+        """Codifica un lote de clientes. Regresa una matriz de forma (n, n_features)."""
+        X = np.empty((len(rows), self.n_features), dtype=np.float64)
+        for j, (name, lookup) in enumerate(self._columns):
+            if lookup is None:
+                X[:, j] = [row[name] for row in rows]
+            else:
+                get = lookup.get
+                column = X[:, j]
+                column[:] = [get(row[name], -1) for row in rows]
+                missing = column < 0
+                n_missing = int(np.count_nonzero(missing))
+                if n_missing:
+                    column[missing] = 0
+                    self.unknown[name] += n_missing
+        return X
+    
+    def transform_columns(
+        self,
+        columns: Mapping[str, np.ndarray],
+        categories: Mapping[str, Sequence[str]],
+    ) -> np.ndarray:
+        """
+        Codifica un lote que ya viene por columnas (formato columnar).
+        
+        Las columnas numéricas se copian directo a la matriz. Las categóricas
+        llegan como índices sobre `categories[name]` (el diccionario de quien
+        llama): se traduce una vez cada categoría y luego se indexa con NumPy.
+        El índice -1 (valor nulo, como en `pd.factorize`) cuenta como desconocido.
+        """
+        n = len(columns[self.features[0]]) if self.features else 0
+        X = np.empty((n, self.n_features), dtype=np.float64)
+        for j, (name, lookup) in enumerate(self._columns):
+            if lookup is None:
+                X[:, j] = columns[name]
+            else:
+                # El -1 del final es la entrada del índice -1: nulo → desconocido
+                table = np.array([lookup.get(c, -1) for c in categories[name]] + [-1], dtype=np.float64)
+                column = X[:, j]
+                column[:] = table[columns[name]]
+                missing = column < 0
+                n_missing = int(np.count_nonzero(missing))
+                if n_missing:
+                    column[missing] = 0
+                    self.unknown[name] += n_missing
+        return X
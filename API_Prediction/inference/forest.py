@@ -0,0 +1,491 @@
+"""
+Motor de inferencia para el Random Forest.
+Exporta el bosque una sola vez a arreglos NumPy contiguos y lo evalúa de forma vectorizada.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# Cada cuántos niveles se retiran del recorrido las filas que ya llegaron a una hoja
+COMPACT_EVERY = 4
+
+
+def _float32_floor(threshold: np.ndarray) -> np.ndarray:
+    """
+    Mayor float32 <= threshold.
+    
+    sklearn compara `float32(x) <= threshold` en float64. Como x ya es float32,
+    la comparación es equivalente a `x <= _float32_floor(threshold)`, lo que
+    permite evaluar todo el bosque en float32 sin perder paridad.
+    """
+    t32 = threshold.astype(np.float32)
+    over = t32.astype(np.float64) > threshold
+    t32[over] = np.nextafter(t32[over], np.float32(-np.inf))
+    return t32
+
+
+class CompiledForest:
+    """
+    Random Forest (o un solo árbol) aplanado en arreglos por nodo.
+    
+    Todos los árboles se concatenan en los mismos arreglos:
+    - `feature`, `threshold`: regla de decisión del nodo (`x[feature] <= threshold` → izquierda)
+    - `children`: forma (n_nodes, 2) con los índices globales de hijo izquierdo y derecho.
+      Las hojas apuntan a sí mismas, así que seguir avanzando desde una hoja no cambia nada.
+    - `value`: probabilidad de cada clase en el nodo (ya normalizada)
+    - `roots`: nodo raíz de cada árbol
+    
+    La evaluación avanza todas las filas en todos los árboles un nivel por
+    iteración y devuelve clase y probabilidad en la misma pasada.
+    El escalado MinMax de entrada se aplica dentro del motor.
+    """
+    
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        classes: np.ndarray,
+        max_depth: int,
+        input_scale: Optional[np.ndarray] = None,
+        input_offset: Optional[np.ndarray] = None,
+        input_clip: Optional[Tuple[float, float]] = None,
+    ):
+        self.feature = np.ascontiguousarray(feature)
+        self.threshold = np.ascontiguousarray(threshold)
+        self.children = np.ascontiguousarray(children)
+        self.value = np.ascontiguousarray(value)
+        self.roots = np.ascontiguousarray(roots)
+        self.classes = np.asarray(classes)
+        self.max_depth = int(max_depth)
+        self.input_scale = input_scale
+        self.input_offset = input_offset
+        self.input_clip = input_clip
+        
+        self.n_trees = len(self.roots)
+        self._children_flat = self.children.reshape(-1)
+        self._is_leaf = self.children[:, 0] == np.arange(len(self.children))
+    
+    @classmethod
+    def from_sklearn(cls, model, scaler=None) -> "CompiledForest":
+        """
+        Exporta un RandomForestClassifier (o DecisionTreeClassifier) entrenado.
+        
+        Args:
+            model: Clasificador de sklearn basado en árboles
+            scaler: MinMaxScaler opcional que se aplica antes del bosque
+        """
+        estimators = getattr(model, "estimators_", [model])
+        
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset, max_depth = 0, 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            if tree.n_outputs != 1:
+                raise ValueError("Solo se soportan bosques de una sola salida")
+            
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            children.append(np.stack([
+                np.where(is_leaf, nodes, tree.children_left),
+                np.where(is_leaf, nodes, tree.children_right),
+            ], axis=1) + offset)
+            
+            value = tree.value[:, 0, :]
+            values.append(value / value.sum(axis=1, keepdims=True))
+            
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+        
+        scale = offset_in = clip = None
+        if scaler is not None:
+            scale, offset_in = scaler.scale_, scaler.min_
+            if getattr(scaler, "clip", False):
+                clip = scaler.feature_range
+        
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=_float32_floor(np.concatenate(thresholds)),
+            children=np.concatenate(children).astype(np.int32),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=model.classes_,
+            max_depth=max_depth,
+            input_scale=scale,
+            input_offset=offset_in,
+            input_clip=clip,
+        )
+    
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """Arreglos del motor y metadatos (JSON) para guardarlo en disco."""
+        arrays = {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "children": self.children,
+            "value": self.value,
+            "roots": self.roots,
+            "classes": self.classes,
+        }
+        if self.input_scale is not None:
+            arrays["input_scale"] = self.input_scale
+            arrays["input_offset"] = self.input_offset
+        meta = {
+            "max_depth": self.max_depth,
+            "input_clip": list(self.input_clip) if self.input_clip is not None else None,
+        }
+        return arrays, meta
+    
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> "CompiledForest":
+        """Reconstruye el motor sin copiar los arreglos (sirven arreglos memory-mapped)."""
+        clip = meta.get("input_clip")
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            children=arrays["children"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            classes=arrays["classes"],
+            max_depth=meta["max_depth"],
+            input_scale=arrays.get("input_scale"),
+            input_offset=arrays.get("input_offset"),
+            input_clip=tuple(clip) if clip is not None else None,
+        )
+    
+    def scale(self, X: np.ndarray) -> np.ndarray:
+        """Aplica el MinMaxScaler exportado (mismas operaciones que sklearn)."""
+        if self.input_scale is None:
+            return X
+        X = X * self.input_scale
+        X += self.input_offset
+        if self.input_clip is not None:
+            np.clip(X, self.input_clip[0], self.input_clip[1], out=X)
+        return X
+    
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Hoja alcanzada por cada fila en cada árbol, forma (n, n_trees)."""
+        X = np.ascontiguousarray(self.scale(X), dtype=np.float32)
+        n, n_features = X.shape
+        X_flat = X.reshape(-1)
+        
+        # Un elemento por par (fila, árbol); `pending` son los que aún no llegan a hoja
+        leaves = np.tile(self.roots, n)
+        node = leaves.copy()
+        base = np.repeat(np.arange(n, dtype=np.intp) * n_features, self.n_trees)
+        pending = None
+        
+        for depth in range(1, self.max_depth + 1):
+            go_right = X_flat.take(base + self.feature.take(node)) > self.threshold.take(node)
+            node = self._children_flat.take(2 * node + go_right)
+            
+            # Compactar cada pocos niveles: las hojas se quedan fijas mientras tanto
+            if depth % COMPACT_EVERY == 0 or depth == self.max_depth:
+                done = self._is_leaf.take(node)
+                if pending is None:
+                    leaves[:] = node
+                    pending = np.flatnonzero(~done)
+                else:
+                    leaves[pending] = node
+                    pending = pending[~done]
+                node, base = node[~done], base[~done]
+                if node.size == 0:
+                    break
+        
+        return leaves.reshape(n, self.n_trees)
+    
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Probabilidad por clase, equivalente a `model.predict_proba(scaler.transform(X))`."""
+        return self.value.take(self.apply(X), axis=0).mean(axis=1)
+    
+    def predict_with_proba(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Clase predicha y probabilidades por clase en una sola pasada."""
+        probas = self.predict_proba(X)
+        return self.classes.take(probas.argmax(axis=1)), probas
+    
+    def score(self, X: np.ndarray) -> np.ndarray:
+        """Salida de la API por fila: [clase predicha, probabilidad de la clase positiva]."""
+        predicciones, probas = self.predict_with_proba(X)
+        return np.column_stack([predicciones, probas[:, 1]])
+    
+    @staticmethod
+    def sample_training_like(scaler, n: int = 2000, seed: int = 0) -> np.ndarray:
+        """Genera filas uniformes dentro del rango que el MinMaxScaler vio en entrenamiento."""
+        rng = np.random.default_rng(seed)
+        return scaler.data_min_ + rng.random((n, scaler.data_min_.shape[0])) * scaler.data_range_
+    
+    def parity(self, model, X: np.ndarray, scaler=None) -> float:
+        """
+        Máxima diferencia absoluta de probabilidad contra sklearn
+        (0.0 = paridad exacta). `X` va en el espacio original, sin escalar.
+        """
+        X_model = scaler.transform(X) if scaler is not None else X
+        esperado = model.predict_proba(X_model)
+        return float(np.abs(self.predict_proba(X) - esperado).max())
+
+
+# =============================================================================
+# BOSQUE COMPACTO
+# =============================================================================
+
+# Las probabilidades de hoja se guardan como enteros 0..VALUE_SCALE (uint8)
+VALUE_SCALE = 255
+
+# Máximo de umbrales distintos para guardarlos como índices uint16 sobre una tabla
+MAX_THRESHOLD_TABLE = 1 << 16
+
+
+def _preorden(tree) -> np.ndarray:
+    """
+    Orden de los nodos en preorden (cada hijo izquierdo justo después de su padre).
+    El constructor por profundidad de sklearn ya los numera así; el de
+    `max_leaf_nodes` no, y se recorre a mano.
+    """
+    left, right = tree.children_left, tree.children_right
+    internos = np.flatnonzero(left != -1)
+    if np.array_equal(left[internos], internos + 1):
+        return np.arange(tree.node_count)
+    orden, pila = [], [0]
+    while pila:
+        nodo = pila.pop()
+        orden.append(nodo)
+        if left[nodo] != -1:
+            pila.append(right[nodo])
+            pila.append(left[nodo])
+    return np.asarray(orden)
+
+
+def _profundidades(tree) -> np.ndarray:
+    depth = np.zeros(tree.node_count, dtype=np.int32)
+    frontera, d = np.array([0]), 0
+    while frontera.size:
+        frontera = frontera[tree.children_left[frontera] != -1]
+        d += 1
+        hijos = np.concatenate([tree.children_left[frontera], tree.children_right[frontera]])
+        depth[hijos] = d
+        frontera = hijos
+    return depth
+
+
+def _smallest_uint(maximo: int) -> type:
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if maximo <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+class CompactForest(CompiledForest):
+    """
+    Random Forest binario en arreglos de tipos mínimos, para que el modelo
+    residente ocupe varias veces menos que `CompiledForest` (y que sklearn).
+    
+    Los nodos de cada árbol van en preorden, así que el hijo izquierdo de un
+    nodo es el siguiente y solo se guarda el salto al derecho:
+    - `feature`: uint8/int16 (índice de la variable)
+    - `threshold`: índice uint16 sobre `threshold_table` (float32) si hay a lo
+      más 65,536 umbrales distintos; si no, el umbral float32 directamente
+    - `right`: salto al hijo derecho (uint16 si cabe); 0 = hoja
+    - `value`: probabilidad de la clase positiva × 255, en uint8
+    
+    Los umbrales no pierden precisión (son los mismos float32 de
+    `CompiledForest`); la única aproximación es la probabilidad de hoja
+    (±0.002 por árbol), más la poda opcional de árboles o profundidad.
+    """
+    
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        right: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        classes: np.ndarray,
+        max_depth: int,
+        threshold_table: Optional[np.ndarray] = None,
+        input_scale: Optional[np.ndarray] = None,
+        input_offset: Optional[np.ndarray] = None,
+        input_clip: Optional[Tuple[float, float]] = None,
+        info: Optional[Dict[str, Any]] = None,
+    ):
+        self.feature = np.ascontiguousarray(feature)
+        self.threshold = np.ascontiguousarray(threshold)
+        self.threshold_table = threshold_table
+        self.right = np.ascontiguousarray(right)
+        self.value = np.ascontiguousarray(value)
+        self.roots = np.ascontiguousarray(roots)
+        self.classes = np.asarray(classes)
+        self.max_depth = int(max_depth)
+        self.input_scale = input_scale
+        self.input_offset = input_offset
+        self.input_clip = input_clip
+        self.info = dict(info or {})
+        self.n_trees = len(self.roots)
+    
+    @classmethod
+    def from_sklearn(
+        cls,
+        model,
+        scaler=None,
+        max_trees: Optional[int] = None,
+        max_depth: Optional[int] = None,
+    ) -> "CompactForest":
+        """
+        Exporta un RandomForestClassifier (o DecisionTreeClassifier) binario.
+        
+        Args:
+            model: Clasificador de sklearn basado en árboles
+            scaler: MinMaxScaler opcional que se aplica antes del bosque
+            max_trees: Conservar solo los primeros N árboles
+            max_depth: Cortar cada árbol a esta profundidad (el nodo cortado
+                queda como hoja con la proporción de clases que vio al entrenar)
+        """
+        if len(model.classes_) != 2:
+            raise ValueError("El bosque compacto solo soporta clasificación binaria")
+        estimators = list(getattr(model, "estimators_", [model]))[:max_trees]
+        
+        features, thresholds, rights, values, roots = [], [], [], [], []
+        offset, profundidad = 0, 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            if tree.n_outputs != 1:
+                raise ValueError("Solo se soportan bosques de una sola salida")
+            
+            orden = _preorden(tree)
+            depth = _profundidades(tree)[orden]
+            keep = depth <= max_depth if max_depth is not None else np.ones(len(orden), dtype=bool)
+            orden, depth = orden[keep], depth[keep]
+            
+            # Posición de cada nodo original en el árbol compacto
+            posicion = np.full(tree.node_count, -1, dtype=np.int64)
+            posicion[orden] = np.arange(len(orden))
+            is_leaf = tree.children_left[orden] == -1
+            if max_depth is not None:
+                is_leaf |= depth >= max_depth
+            
+            salto = np.where(is_leaf, 0, posicion[tree.children_right[orden]] - np.arange(len(orden)))
+            value = tree.value[orden, 0, :]
+            
+            features.append(np.where(is_leaf, 0, tree.feature[orden]))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold[orden]))
+            rights.append(salto)
+            values.append(np.rint(value[:, 1] / value.sum(axis=1) * VALUE_SCALE))
+            roots.append(offset)
+            offset += len(orden)
+            profundidad = max(profundidad, int(depth.max()))
+        
+        feature = np.concatenate(features)
+        threshold = _float32_floor(np.concatenate(thresholds))
+        right = np.concatenate(rights)
+        
+        table = None
+        unicos, codigos = np.unique(threshold, return_inverse=True)
+        if len(unicos) <= MAX_THRESHOLD_TABLE:
+            table, threshold = unicos.astype(np.float32), codigos.astype(np.uint16)
+        
+        scale = offset_in = clip = None
+        if scaler is not None:
+            scale, offset_in = scaler.scale_, scaler.min_
+            if getattr(scaler, "clip", False):
+                clip = scaler.feature_range
+        
+        return cls(
+            feature=feature.astype(np.uint8 if feature.max(initial=0) < 256 else np.int16),
+            threshold=threshold,
+            right=right.astype(_smallest_uint(max(int(right.max(initial=0)), 1 << 8))),
+            value=np.concatenate(values).astype(np.uint8),
+            roots=np.asarray(roots, dtype=_smallest_uint(max(offset, 1 << 16))),
+            classes=model.classes_,
+            max_depth=profundidad,
+            threshold_table=table,
+            input_scale=scale,
+            input_offset=offset_in,
+            input_clip=clip,
+            info={"max_trees": max_trees, "max_depth": max_depth},
+        )
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.to_arrays()[0].values())
+    
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        arrays = {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "right": self.right,
+            "value": self.value,
+            "roots": self.roots,
+            "classes": self.classes,
+        }
+        if self.threshold_table is not None:
+            arrays["threshold_table"] = self.threshold_table
+        if self.input_scale is not None:
+            arrays["input_scale"] = self.input_scale
+            arrays["input_offset"] = self.input_offset
+        meta = {
+            "max_depth": self.max_depth,
+            "input_clip": list(self.input_clip) if self.input_clip is not None else None,
+            "info": self.info,
+        }
+        return arrays, meta
+    
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> "CompactForest":
+        clip = meta.get("input_clip")
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            right=arrays["right"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            classes=arrays["classes"],
+            max_depth=meta["max_depth"],
+            threshold_table=arrays.get("threshold_table"),
+            input_scale=arrays.get("input_scale"),
+            input_offset=arrays.get("input_offset"),
+            input_clip=tuple(clip) if clip is not None else None,
+            info=meta.get("info"),
+        )
+    
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Hoja alcanzada por cada fila en cada árbol, forma (n, n_trees)."""
+        X = np.ascontiguousarray(self.scale(X), dtype=np.float32)
+        n, n_features = X.shape
+        X_flat = X.reshape(-1)
+        
+        leaves = np.tile(self.roots.astype(np.intp), n)
+        node = leaves.copy()
+        base = np.repeat(np.arange(n, dtype=np.intp) * n_features, self.n_trees)
+        pending = None
+        
+        for depth in range(1, self.max_depth + 1):
+            threshold = self.threshold.take(node)
+            if self.threshold_table is not None:
+                threshold = self.threshold_table.take(threshold)
+            go_right = X_flat.take(base + self.feature.take(node)) > threshold
+            # Izquierda = siguiente nodo (+1), derecha = +salto; en una hoja el salto es 0
+            salto = self.right.take(node).astype(np.intp)
+            node += np.where(go_right, salto, np.minimum(salto, 1))
+            
+            if depth % COMPACT_EVERY == 0 or depth == self.max_depth:
+                done = self.right.take(node) == 0
+                if pending is None:
+                    leaves[:] = node
+                    pending = np.flatnonzero(~done)
+                else:
+                    leaves[pending] = node
+                    pending = pending[~done]
+                node, base = node[~done], base[~done]
+                if node.size == 0:
+                    break
+        
+        return leaves.reshape(n, self.n_trees)
+    
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        positiva = self.value.take(self.apply(X)).mean(axis=1, dtype=np.float64) / VALUE_SCALE
+        return np.column_stack([1.0 - positiva, positiva])
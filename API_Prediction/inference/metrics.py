@@ -0,0 +1,286 @@
+"""
+Métricas de latencia por etapa en formato Prometheus (texto).
+Sin dependencias: histogramas con buckets fijos y contadores en memoria.
+"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Segundos: de 50 µs (codificar una fila) a 10 s (un archivo en /stream)
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# Filas por lote evaluado en el motor
+ROWS_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+PREFIX = "banco_api_"
+
+DESCRIPCIONES = {
+    "request_duration_seconds": "Latencia por endpoint y etapa (stage=total es la petición completa)",
+    "requests_total": "Peticiones atendidas por endpoint y código HTTP",
+    "engine_duration_seconds": "Tiempo de evaluación del motor por lote (scaler incluido)",
+    "engine_batch_rows": "Filas por lote evaluado en el motor",
+    "unknown_categories_total": "Valores categóricos desconocidos codificados como 0",
+    "model_reloads_total": "Versiones de modelos activadas por recarga en caliente",
+    "requests_shed_total": "Peticiones rechazadas por el control de admisión, por motivo",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Histograma acumulable; `observe` cuesta una búsqueda binaria y un lock."""
+    
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+    
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # el último es +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+    
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Metrics:
+    """Registro de histogramas y contadores, identificados por nombre + etiquetas."""
+    
+    def __init__(self):
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._lock = threading.Lock()
+    
+    def histogram(self, name: str, labels: Labels, buckets=LATENCY_BUCKETS) -> Histogram:
+        series = self._histograms.get(name)
+        histogram = series.get(labels) if series is not None else None
+        if histogram is None:
+            with self._lock:
+                series = self._histograms.setdefault(name, {})
+                histogram = series.setdefault(labels, Histogram(buckets))
+        return histogram
+    
+    def observe(self, name: str, labels: Labels, value: float, buckets=LATENCY_BUCKETS) -> None:
+        self.histogram(name, labels, buckets).observe(value)
+    
+    def inc(self, name: str, labels: Labels, value: float = 1) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+    
+    def render(self, extra_counters: Optional[Dict[str, Dict[Labels, float]]] = None) -> str:
+        """
+        Texto en formato de exposición de Prometheus.
+        `extra_counters` agrega contadores que viven en otro lado (cache, encoders).
+        """
+        lineas: List[str] = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+        for name, series in (extra_counters or {}).items():
+            counters.setdefault(name, {}).update(series)
+        
+        for name in sorted(counters):
+            _encabezado(lineas, name, "counter")
+            for labels, value in sorted(counters[name].items()):
+                lineas.append(f"{PREFIX}{name}{_etiquetas(labels)} {_numero(value)}")
+        
+        for name in sorted(histograms):
+            _encabezado(lineas, name, "histogram")
+            for labels, histogram in sorted(histograms[name].items()):
+                counts, total, count = histogram.snapshot()
+                acumulado = 0
+                for le, n in zip(histogram.buckets + (float("inf"),), counts):
+                    acumulado += n
+                    lineas.append(
+                        f"{PREFIX}{name}_bucket{_etiquetas(labels + (('le', _numero(le)),))} {acumulado}"
+                    )
+                lineas.append(f"{PREFIX}{name}_sum{_etiquetas(labels)} {_numero(total)}")
+                lineas.append(f"{PREFIX}{name}_count{_etiquetas(labels)} {count}")
+        return "\n".join(lineas) + "\n"
+
+
+def _encabezado(lineas: List[str], name: str, tipo: str) -> None:
+    if name in DESCRIPCIONES:
+        lineas.append(f"# HELP {PREFIX}{name} {DESCRIPCIONES[name]}")
+    lineas.append(f"# TYPE {PREFIX}{name} {tipo}")
+
+
+def _etiquetas(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escapar(value)}"' for key, value in labels) + "}"
+
+
+def _escapar(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _numero(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+METRICS = Metrics()
+
+
+# =============================================================================
+# TIEMPOS POR PETICIÓN
+# =============================================================================
+
+class Tiempos:
+    """Marcas de una petición; las llena el middleware y `medir_endpoint`."""
+    
+    __slots__ = ("endpoint", "inicio", "admitida", "inicio_endpoint", "fin_endpoint")
+    
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.inicio = time.perf_counter()
+        self.admitida: Optional[float] = None  # salida de la cola de admisión
+        self.inicio_endpoint: Optional[float] = None
+        self.fin_endpoint: Optional[float] = None
+
+
+_peticion: ContextVar[Optional[Tiempos]] = ContextVar("peticion", default=None)
+
+
+class etapa:
+    """
+    Mide un bloque del endpoint y lo registra como una etapa de la petición actual:
+        
+        with etapa("codificacion"):
+            X = encoder.transform_one(...)
+    
+    Fuera de una petición medida (p. ej. con METRICS_ENABLED=0) no registra nada.
+    """
+    
+    __slots__ = ("nombre", "tiempos", "inicio")
+    
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+    
+    def __enter__(self):
+        self.tiempos = _peticion.get()
+        self.inicio = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        if self.tiempos is not None:
+            METRICS.observe(
+                "request_duration_seconds",
+                (("endpoint", self.tiempos.endpoint), ("stage", self.nombre)),
+                time.perf_counter() - self.inicio,
+            )
+        return False
+
+
+def medir_endpoint(fn: Callable) -> Callable:
+    """
+    Marca cuándo empieza y termina la función del endpoint. Lo anterior
+    (lectura del cuerpo + validación Pydantic, desde que la petición sale de
+    la cola de admisión) y lo posterior (validación del response_model +
+    JSON) se registran como etapas `validacion` y `serializacion`.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        tiempos = _peticion.get()
+        if tiempos is None:
+            return await fn(*args, **kwargs)
+        tiempos.inicio_endpoint = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            tiempos.fin_endpoint = time.perf_counter()
+    return wrapper
+
+
+def marcar_admitida() -> None:
+    """La petición actual salió de la cola de admisión (la espera ya cuenta en la etapa `cola`)."""
+    tiempos = _peticion.get()
+    if tiempos is not None:
+        tiempos.admitida = time.perf_counter()
+
+
+def registrar_motor(pipeline: str, rows: int, segundos: float) -> None:
+    """Tiempo de un lote en el motor (corre en el hilo del executor)."""
+    labels = (("pipeline", pipeline),)
+    METRICS.observe("engine_duration_seconds", labels, segundos)
+    METRICS.observe("engine_batch_rows", labels, rows, ROWS_BUCKETS)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI (sin BaseHTTPMiddleware, que agrega una tarea por petición).
+    Registra la latencia total por endpoint y las peticiones por código HTTP.
+    
+    Solo las rutas declaradas en la app tienen etiqueta propia; el resto va a
+    `endpoint="otros"` para no crear una serie por cada URL desconocida.
+    """
+    
+    def __init__(self, app, metrics: Metrics = METRICS):
+        self.app = app
+        self.metrics = metrics
+        self._rutas: Optional[frozenset] = None
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        if self._rutas is None:
+            self._rutas = frozenset(getattr(r, "path", None) for r in scope["app"].routes)
+        endpoint = scope["path"] if scope["path"] in self._rutas else "otros"
+        
+        tiempos = Tiempos(endpoint)
+        token = _peticion.set(tiempos)
+        status = "500"
+        
+        async def enviar(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _peticion.reset(token)
+            self._registrar(tiempos, time.perf_counter(), status)
+    
+    def _registrar(self, tiempos: Tiempos, fin: float, status: str) -> None:
+        endpoint = tiempos.endpoint
+        observe = self.metrics.observe
+        observe("request_duration_seconds", (("endpoint", endpoint), ("stage", "total")), fin - tiempos.inicio)
+        if tiempos.inicio_endpoint is not None:
+            observe(
+                "request_duration_seconds",
+                (("endpoint", endpoint), ("stage", "validacion")),
+                tiempos.inicio_endpoint - (tiempos.admitida or tiempos.inicio),
+            )
+        if tiempos.fin_endpoint is not None:
+            observe(
+                "request_duration_seconds",
+                (("endpoint", endpoint), ("stage", "serializacion")),
+                fin - tiempos.fin_endpoint,
+            )
+        self.metrics.inc("requests_total", (("endpoint", endpoint), ("status", status)))
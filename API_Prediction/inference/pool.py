@@ -0,0 +1,202 @@
+"""
+Pool de procesos de inferencia con pesos compartidos.
+Los arreglos de los motores se escriben una vez como `.npy` y cada proceso los abre con mmap.
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from inference.bundle import ENGINES, content_hash, read_arrays, write_arrays, write_atomic
+from inference.metrics import registrar_motor
+
+
+def default_shared_path() -> Path:
+    """`SHARED_MODELS_PATH`, o /dev/shm (memoria) si existe, o el directorio temporal."""
+    if os.getenv("SHARED_MODELS_PATH"):
+        return Path(os.environ["SHARED_MODELS_PATH"])
+    shm = Path("/dev/shm")
+    base = shm if shm.is_dir() else Path(tempfile.gettempdir())
+    return base / "banco-api-models"
+
+
+# =============================================================================
+# EXPORTAR / CARGAR MOTORES
+# =============================================================================
+
+def export_engine(engine, directory: Path, name: str) -> Path:
+    """
+    Escribe los arreglos del motor en `directory/<name>-<hash>/`.
+    
+    El nombre incluye un hash del contenido, así que varios procesos pueden
+    exportar el mismo modelo sin pisarse: si la carpeta ya existe se reutiliza.
+    """
+    arrays, meta = engine.to_arrays()
+    meta = {"engine": type(engine).__name__, **meta, "arrays": sorted(arrays)}
+    
+    target = Path(directory) / f"{name}-{content_hash(arrays, meta)}"
+    if target.exists():
+        return target
+    
+    def write(staging: Path) -> None:
+        write_arrays(staging, arrays)
+        (staging / "meta.json").write_text(json.dumps(meta))
+    
+    return write_atomic(target, write)
+
+
+def load_engine(directory: Path, mmap: bool = True):
+    """Carga un motor exportado; con `mmap=True` los arreglos no se copian a memoria privada."""
+    directory = Path(directory)
+    meta = json.loads((directory / "meta.json").read_text())
+    arrays = read_arrays(directory, meta["arrays"], mmap=mmap)
+    return ENGINES[meta["engine"]].from_arrays(arrays, meta)
+
+
+# =============================================================================
+# PROCESOS DE INFERENCIA
+# =============================================================================
+
+# Motores del proceso worker, por carpeta exportada (`<name>-<hash>`)
+_engines: Dict[str, object] = {}
+
+
+def _engine(directory: str):
+    """Motor de una carpeta; se abre la primera vez que se usa (p. ej. tras una recarga)."""
+    engine = _engines.get(directory)
+    if engine is None:
+        # Las versiones anteriores del mismo motor ya no se usan: se sueltan
+        name = Path(directory).name.rsplit("-", 1)[0]
+        for other in [d for d in _engines if Path(d).name.rsplit("-", 1)[0] == name]:
+            del _engines[other]
+        engine = _engines[directory] = load_engine(Path(directory))
+    return engine
+
+
+def _attach(directories: Iterable[str]) -> None:
+    for directory in directories:
+        _engine(directory)
+
+
+def _evaluate(directory: str, X: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Resultado y segundos del motor (se miden aquí: las métricas viven en el proceso de la API)."""
+    engine = _engine(directory)
+    inicio = time.perf_counter()
+    resultado = engine.score(X)
+    return resultado, time.perf_counter() - inicio
+
+
+def _ping(_: int) -> int:
+    return os.getpid()
+
+
+class InferencePool:
+    """
+    N procesos de inferencia que comparten los mismos pesos.
+    
+    - Los motores se exportan a `.npy` una sola vez (ver `export_engine`).
+    - Cada proceso los abre con `np.load(mmap_mode="r")`: las páginas viven en el
+      page cache del sistema y no se duplican por proceso.
+    - Los procesos se crean con "spawn" para que no hereden la memoria del
+      proceso de la API (pickles de sklearn, pandas, etc.).
+    - `evaluator(name)` se pasa como `fn` a `MicroBatcher` (en un hilo): manda
+      la matriz de entrada a un proceso, espera la salida de `engine.score()`
+      y registra el tiempo del motor en las métricas de la API.
+    - Cada evaluador apunta a una versión exportada; al publicar una versión
+      nueva (`publish`) los lotes en curso terminan con la anterior, y su
+      carpeta se borra cuando ya no queda ninguno.
+    - `shutdown()` borra las carpetas que creó el pool (no las que ya
+      existían, p. ej. de `calificar.py` con el mismo modelo).
+    """
+    
+    def __init__(self, engines: Dict[str, object], workers: int, directory: Optional[Path] = None):
+        self.directory = Path(directory) if directory is not None else default_shared_path()
+        self._lock = threading.Lock()  # los evaluadores corren en hilos
+        self._owned: set = set()       # carpetas creadas por este pool
+        self._retired: set = set()     # versiones reemplazadas, por borrar
+        self._inflight: Counter = Counter()  # lotes en curso por carpeta
+        self.directories = {
+            name: self._export(name, engine)
+            for name, engine in engines.items()
+        }
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_attach,
+            initargs=(list(self.directories.values()),),
+        )
+    
+    def evaluator(self, name: str) -> Callable[[np.ndarray], np.ndarray]:
+        """Función que evalúa la versión actual del motor `name` en un worker (bloquea; llamar en un hilo)."""
+        return partial(self._evaluate, name, self.directories[name])
+    
+    def _export(self, name: str, engine) -> str:
+        """Exporta el motor; si la carpeta no existía, queda a cargo del pool."""
+        existentes = {str(path) for path in self.directory.glob(f"{name}-*")}
+        directory = str(export_engine(engine, self.directory, name))
+        if directory not in existentes:
+            self._owned.add(directory)
+        return directory
+    
+    def _evaluate(self, name: str, directory: str, X: np.ndarray) -> np.ndarray:
+        with self._lock:
+            if directory in self._retired and not self._inflight[directory]:
+                # Evaluador viejo que llegó tarde: su versión puede estar borrada
+                directory = self.directories[name]
+            self._inflight[directory] += 1
+        try:
+            resultado, segundos = self.executor.submit(_evaluate, directory, X).result()
+        finally:
+            with self._lock:
+                self._inflight[directory] -= 1
+                if not self._inflight[directory]:
+                    del self._inflight[directory]
+                    if directory in self._retired:
+                        self._remove(directory)
+        registrar_motor(name, len(X), segundos)
+        return resultado
+    
+    def _remove(self, directory: str) -> None:
+        """Borra una versión reemplazada (con el lock). Los procesos que la tengan abierta con mmap no se afectan."""
+        self._retired.discard(directory)
+        if directory in self._owned:
+            self._owned.discard(directory)
+            shutil.rmtree(directory, ignore_errors=True)
+    
+    def publish(self, name: str, engine) -> Callable[[np.ndarray], np.ndarray]:
+        """Exporta una versión (nueva o no) del motor `name` y regresa su evaluador."""
+        directory = self._export(name, engine)
+        with self._lock:
+            anterior = self.directories.get(name)
+            self.directories[name] = directory
+            self._retired.discard(directory)
+            if anterior is not None and anterior != directory:
+                self._retired.add(anterior)
+                if not self._inflight[anterior]:
+                    self._remove(anterior)
+        return self.evaluator(name)
+    
+    def warmup(self) -> None:
+        """Arranca todos los procesos antes de recibir tráfico."""
+        list(self.executor.map(_ping, range(self.workers)))
+    
+    def shutdown(self) -> None:
+        """Detiene los procesos y borra las carpetas que creó el pool."""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            for directory in self._owned:
+                shutil.rmtree(directory, ignore_errors=True)
+            self._owned.clear()
+            self._retired.clear()
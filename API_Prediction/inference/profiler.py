@@ -0,0 +1,213 @@
+"""
+Perfilado bajo demanda de la API en ejecución.
+
+Dos modos:
+- `muestreo`: un hilo toma `sys._current_frames()` cada `interval` segundos y
+  cuenta las pilas de todos los hilos (event loop + executor de los motores).
+  Regresa "collapsed stacks" (una línea `marco;marco;... N`), el formato que
+  leen flamegraph.pl, speedscope o inferno. El costo depende del intervalo.
+- `cprofile`: cProfile en el hilo del event loop (validación, codificación,
+  serialización). No ve los hilos del executor. Regresa un archivo pstats.
+"""
+
+import asyncio
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional, Tuple
+
+MODES = ("muestreo", "cprofile")
+
+# Hojas de pila de un hilo que solo está esperando (se omiten en `muestreo`)
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),  # ThreadPoolExecutor esperando trabajo (SimpleQueue.get en C)
+}
+
+
+class ProfileSession:
+    """
+    Una sesión de perfilado. Termina al pasar `seconds` o al completarse
+    `requests` peticiones de predicción, lo que ocurra primero.
+    """
+    
+    def __init__(
+        self,
+        mode: str = "muestreo",
+        seconds: float = 10.0,
+        requests: Optional[int] = None,
+        interval: float = 0.01,
+        include_idle: bool = False,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Modo desconocido: {mode}")
+        self.mode = mode
+        self.seconds = seconds
+        self.requests = requests
+        self.interval = interval
+        self.include_idle = include_idle
+        
+        self.completed = 0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        
+        self._done = asyncio.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._profile: Optional[cProfile.Profile] = None
+    
+    # -------------------------------------------------------------------------
+    # Ciclo de vida (se llama desde el event loop)
+    # -------------------------------------------------------------------------
+    
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+            self._thread.start()
+    
+    async def wait(self) -> None:
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout=self.seconds)
+        except asyncio.TimeoutError:
+            pass
+    
+    def stop(self) -> None:
+        if self._profile is not None:
+            self._profile.disable()
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+    
+    def request_finished(self) -> None:
+        """Lo llama el middleware al terminar cada petición de predicción."""
+        self.completed += 1
+        if self.requests is not None and self.completed >= self.requests:
+            self._done.set()
+    
+    # -------------------------------------------------------------------------
+    # Muestreo
+    # -------------------------------------------------------------------------
+    
+    def _sample_loop(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if frames.keys() - names.keys():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                stack = self._collapse(frame)
+                if stack is not None:
+                    self.stacks[f"{names.get(ident, ident)};{stack}"] += 1
+            self.samples += 1
+    
+    def _collapse(self, frame) -> Optional[str]:
+        leaf = frame.f_code
+        if not self.include_idle and (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES:
+            return None
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(parts))
+    
+    # -------------------------------------------------------------------------
+    # Resultados
+    # -------------------------------------------------------------------------
+    
+    def summary(self) -> dict:
+        return {
+            "mode": self.mode,
+            "seconds": round(self.duration, 3),
+            "requests": self.completed,
+            "samples": self.samples,
+        }
+    
+    def collapsed(self) -> str:
+        """Pilas en formato collapsed, de la más frecuente a la menos."""
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+    
+    def pstats_bytes(self) -> bytes:
+        """Archivo pstats (se abre con `pstats.Stats(archivo)` o snakeviz)."""
+        self._profile.create_stats()
+        return marshal.dumps(self._profile.stats)
+    
+    def pstats_text(self, sort: str = "cumulative", limit: int = 60) -> str:
+        buffer = io.StringIO()
+        pstats.Stats(self._profile, stream=buffer).sort_stats(sort).print_stats(limit)
+        return buffer.getvalue()
+    
+    def artifact(self, fmt: str) -> Tuple[bytes, str, str]:
+        """(contenido, media type, extensión) según el modo y el formato pedido."""
+        if self.mode == "muestreo":
+            return self.collapsed().encode(), "text/plain; charset=utf-8", "collapsed.txt"
+        if fmt == "texto":
+            return self.pstats_text().encode(), "text/plain; charset=utf-8", "pstats.txt"
+        return self.pstats_bytes(), "application/octet-stream", "pstats"
+
+
+# =============================================================================
+# SESIÓN ACTIVA + MIDDLEWARE
+# =============================================================================
+
+_session: Optional[ProfileSession] = None
+
+
+def active_session() -> Optional[ProfileSession]:
+    return _session
+
+
+async def run_session(session: ProfileSession) -> ProfileSession:
+    """Corre una sesión completa. Solo puede haber una a la vez (RuntimeError si no)."""
+    global _session
+    if _session is not None:
+        raise RuntimeError("Ya hay una sesión de perfilado en curso")
+    _session = session
+    try:
+        session.start()
+        try:
+            await session.wait()
+        finally:
+            session.stop()
+    finally:
+        _session = None
+    return session
+
+
+class ProfilerMiddleware:
+    """
+    Cuenta las peticiones de predicción terminadas mientras hay una sesión
+    activa. Sin sesión solo revisa una variable global.
+    """
+    
+    def __init__(self, app, prefix: str = "/predict"):
+        self.app = app
+        self.prefix = prefix
+    
+    async def __call__(self, scope, receive, send):
+        if _session is None or scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        session = _session
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session.request_finished()
@@ -0,0 +1,180 @@
+"""
+Registro de modelos con recarga en caliente.
+Cada pipeline tiene una versión activa; una versión nueva se carga y valida aparte y se activa con un swap.
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+HISTORY_SIZE = 5
+
+
+class ModelRegistry:
+    """
+    Versión activa de cada pipeline.
+    
+    - `active[pipeline]` es el dict de la versión en uso. Una petición toma
+      la referencia una vez y la usa hasta terminar, así que una recarga no
+      la afecta: las peticiones en curso terminan con la versión anterior.
+    - `load()` carga un pipeline la primera vez (perezoso, thread-safe).
+    - `reload()` carga la versión que está en disco fuera del camino de las
+      peticiones, la valida con `activate` y solo entonces reemplaza la
+      activa (asignación de un dict: atómica). Si falla, la anterior sigue.
+    - `watch()` revisa `signature(pipeline)` cada cierto tiempo y recarga
+      cuando los archivos cambian y dejan de cambiar.
+    """
+    
+    def __init__(
+        self,
+        pipelines: Iterable[str],
+        loader: Callable[[str], Dict[str, Any]],
+        activate: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        signature: Optional[Callable[[str], Hashable]] = None,
+    ):
+        self.pipelines = tuple(pipelines)
+        self.loader = loader
+        self.activate = activate
+        self.signature = signature
+        
+        self.active: Dict[str, Dict[str, Any]] = {}
+        self.errors: Dict[str, str] = {}
+        self.history: Dict[str, List[dict]] = {p: [] for p in self.pipelines}
+        self.reloads: Dict[str, int] = {p: 0 for p in self.pipelines}
+        self.last_error: Dict[str, Optional[str]] = {p: None for p in self.pipelines}
+        
+        self._signatures: Dict[str, Hashable] = {}
+        self._locks = {p: threading.Lock() for p in self.pipelines}
+    
+    # -------------------------------------------------------------------------
+    # Carga
+    # -------------------------------------------------------------------------
+    
+    def _build(self, pipeline: str) -> Dict[str, Any]:
+        # La firma se toma antes de cargar: si los archivos cambian durante
+        # la carga, `watch` lo detecta y vuelve a recargar
+        if self.signature is not None:
+            self._signatures[pipeline] = self.signature(pipeline)
+        models = self.loader(pipeline)
+        if self.activate is not None:
+            self.activate(pipeline, models)
+        return models
+    
+    def _swap(self, pipeline: str, models: Dict[str, Any]) -> None:
+        self.active[pipeline] = models
+        self.errors.pop(pipeline, None)
+        self.last_error[pipeline] = None
+        history = self.history[pipeline]
+        history.insert(0, {
+            "version": models["version"],
+            "activo_desde": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        })
+        del history[HISTORY_SIZE:]
+    
+    def get(self, pipeline: str) -> Optional[Dict[str, Any]]:
+        return self.active.get(pipeline)
+    
+    def load(self, pipeline: str) -> Optional[Dict[str, Any]]:
+        """Carga un pipeline una sola vez. Regresa None si no está disponible."""
+        if pipeline in self.active or pipeline in self.errors:
+            return self.active.get(pipeline)
+        
+        with self._locks[pipeline]:
+            if pipeline not in self.active and pipeline not in self.errors:
+                try:
+                    self._swap(pipeline, self._build(pipeline))
+                except Exception as e:
+                    print(f"⚠️ Error cargando {pipeline}: {e}")
+                    self.errors[pipeline] = str(e)
+                    self.last_error[pipeline] = str(e)
+        return self.active.get(pipeline)
+    
+    def reload(self, pipeline: str, force: bool = False) -> Dict[str, Any]:
+        """
+        Carga la versión en disco y la activa si es distinta de la actual
+        (o siempre, con `force`). Regresa un resumen con `status`:
+        `actualizado`, `sin cambios` o `error`.
+        """
+        with self._locks[pipeline]:
+            anterior = self.active.get(pipeline)
+            version_anterior = anterior["version"] if anterior is not None else None
+            inicio = time.perf_counter()
+            try:
+                nuevo = self._build(pipeline)
+            except Exception as e:
+                print(f"⚠️ Error recargando {pipeline}: {e}")
+                self.last_error[pipeline] = str(e)
+                if anterior is None:
+                    self.errors[pipeline] = str(e)
+                return {"pipeline": pipeline, "status": "error", "version": version_anterior, "error": str(e)}
+            
+            resumen = {
+                "pipeline": pipeline,
+                "version": nuevo["version"],
+                "anterior": version_anterior,
+                "segundos": round(time.perf_counter() - inicio, 3),
+            }
+            if nuevo["version"] == version_anterior and not force:
+                self.last_error[pipeline] = None
+                return {**resumen, "status": "sin cambios"}
+            
+            self._swap(pipeline, nuevo)
+            self.reloads[pipeline] += 1
+            return {**resumen, "status": "actualizado"}
+    
+    # -------------------------------------------------------------------------
+    # Vigilancia de archivos
+    # -------------------------------------------------------------------------
+    
+    def changed(self) -> Dict[str, Hashable]:
+        """Firma actual de los pipelines ya cargados (o fallidos) cuyos archivos cambiaron."""
+        if self.signature is None:
+            return {}
+        cambios = {}
+        for pipeline in self.pipelines:
+            if pipeline not in self._signatures:
+                continue  # aún no se carga: la primera carga ya toma lo que haya en disco
+            firma = self.signature(pipeline)
+            if firma != self._signatures[pipeline]:
+                cambios[pipeline] = firma
+        return cambios
+    
+    async def watch(self, interval: float, on_reload: Optional[Callable[[dict], None]] = None) -> None:
+        """
+        Revisa los archivos cada `interval` segundos. Un cambio se recarga
+        cuando la firma se repite en dos revisiones seguidas, para no cargar
+        archivos que se están escribiendo.
+        """
+        loop = asyncio.get_running_loop()
+        pendientes: Dict[str, Hashable] = {}
+        while True:
+            await asyncio.sleep(interval)
+            cambios = await loop.run_in_executor(None, self.changed)
+            for pipeline in list(pendientes):
+                if pipeline not in cambios:
+                    del pendientes[pipeline]
+            for pipeline, firma in cambios.items():
+                if pendientes.get(pipeline) != firma:
+                    pendientes[pipeline] = firma
+                    continue
+                del pendientes[pipeline]
+                resumen = await loop.run_in_executor(None, self.reload, pipeline)
+                if on_reload is not None:
+                    on_reload(resumen)
+    
+    # -------------------------------------------------------------------------
+    # Estado
+    # -------------------------------------------------------------------------
+    
+    def describe(self) -> Dict[str, dict]:
+        return {
+            pipeline: {
+                "version": self.active[pipeline]["version"] if pipeline in self.active else None,
+                "recargas": self.reloads[pipeline],
+                "ultimo_error": self.last_error[pipeline],
+                "historial": list(self.history[pipeline]),
+            }
+            for pipeline in self.pipelines
+        }
@@ -0,0 +1,46 @@
+"""
+Respuestas JSON rápidas para los endpoints de predicción.
+
+Los endpoints arman dicts (o bytes ya codificados) y regresan una
+`RespuestaJSON`. Como es un `Response`, FastAPI no vuelve a validar el
+resultado contra el `response_model` ni lo pasa por `jsonable_encoder`; el
+`response_model` del decorador sigue documentando el esquema en OpenAPI.
+"""
+
+import json
+from typing import Any, Mapping
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson se usa el json de la biblioteca estándar
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """JSON compacto en UTF-8 (orjson si está instalado)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def lista(elementos) -> bytes:
+    """Une elementos ya codificados en un arreglo JSON."""
+    return b"[" + b",".join(elementos) + b"]"
+
+
+def objeto(campos: Mapping[str, bytes]) -> bytes:
+    """Arma un objeto JSON con valores ya codificados."""
+    return b"{" + b",".join(dumps(nombre) + b":" + valor for nombre, valor in campos.items()) + b"}"
+
+
+class RespuestaJSON(Response):
+    """Acepta bytes ya codificados (cache, segmentos) o cualquier objeto para `dumps`."""
+    
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
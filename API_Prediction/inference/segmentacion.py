@@ -0,0 +1,94 @@
+"""
+Motor de segmentación fusionado.
+StandardScaler → PCA → K-Means reducidos a una sola proyección lineal + argmin.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class FusedSegmenter:
+    """
+    Pipeline de segmentación precompilado.
+    
+    StandardScaler y PCA son transformaciones afines, así que se combinan en
+    `X @ projection + offset`. Para K-Means, el cluster más cercano es
+        argmin_k ||y - c_k||² = argmin_k (||c_k||² - 2 y·c_k)
+    que también es afín en X. Todo el pipeline queda en una multiplicación
+    de matrices (n × features) @ (features × k) seguida de un argmin.
+    """
+    
+    def __init__(
+        self,
+        projection: np.ndarray,
+        offset: np.ndarray,
+        centroids: np.ndarray,
+    ):
+        # Scaler + PCA: X → coordenadas PCA
+        self.projection = np.ascontiguousarray(projection, dtype=np.float64)
+        self.offset = np.ascontiguousarray(offset, dtype=np.float64)
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float64)
+        
+        # Scaler + PCA + distancias a centroides: X → score por cluster
+        self.weights = self.projection @ (-2.0 * self.centroids.T)
+        self.bias = self.offset @ (-2.0 * self.centroids.T) + (self.centroids ** 2).sum(axis=1)
+    
+    @classmethod
+    def from_sklearn(cls, scaler, pca, kmeans) -> "FusedSegmenter":
+        """Construye el motor a partir del StandardScaler, PCA y KMeans entrenados."""
+        n_features = pca.components_.shape[1]
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+        
+        components = pca.components_.T  # (features, componentes)
+        if pca.whiten:
+            components = components / np.sqrt(pca.explained_variance_)
+        
+        # ((x - mean) / scale - pca.mean_) @ components
+        projection = components / scale[:, None]
+        offset = -(mean / scale) @ components - pca.mean_ @ components
+        
+        return cls(projection, offset, kmeans.cluster_centers_)
+    
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """Arreglos del motor y metadatos (JSON) para guardarlo en disco."""
+        arrays = {
+            "projection": self.projection,
+            "offset": self.offset,
+            "centroids": self.centroids,
+        }
+        return arrays, {}
+    
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> "FusedSegmenter":
+        """Reconstruye el motor a partir de los arreglos guardados."""
+        return cls(arrays["projection"], arrays["offset"], arrays["centroids"])
+    
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Coordenadas PCA, equivalente a `pca.transform(scaler.transform(X))`."""
+        return X @ self.projection + self.offset
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Cluster de cada fila, equivalente a `kmeans.predict(...)` del pipeline."""
+        return (X @ self.weights + self.bias).argmin(axis=1)
+    
+    def score(self, X: np.ndarray) -> np.ndarray:
+        """Salida de la API por fila: el cluster asignado."""
+        return self.predict(X)
+    
+    @staticmethod
+    def sample_training_like(scaler, n: int = 5000, seed: int = 0) -> np.ndarray:
+        """Genera filas con la media y varianza que el scaler vio en entrenamiento."""
+        rng = np.random.default_rng(seed)
+        return scaler.mean_ + rng.standard_normal((n, scaler.mean_.shape[0])) * scaler.scale_
+    
+    def parity(self, scaler, pca, kmeans, X: Optional[np.ndarray] = None) -> float:
+        """
+        Fracción de filas donde el motor asigna el mismo cluster que el
+        pipeline de sklearn de tres pasos (1.0 = paridad exacta).
+        """
+        if X is None:
+            X = self.sample_training_like(scaler)
+        esperado = kmeans.predict(pca.transform(scaler.transform(X)))
+        return float((self.predict(X) == esperado).mean())
@@ -4,16 +4,55 @@ API de Predicción Bancaria
 Punto de entrada principal de la API.
 """
 
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from routers.predictions import router as predictions_router, get_models_status
+from inference.admision import ADMISION, ADMISSION_ENABLED, AdmissionMiddleware
+from inference.metrics import METRICS, MetricsMiddleware
+from inference.profiler import ProfilerMiddleware
+from routers.admin import router as admin_router
+from routers.bulk import router as bulk_router
+from routers.columnar import router as columnar_router
+from routers.perfil import router as perfil_router
+from routers.predictions import (
+    router as predictions_router,
+    detener_pool,
+    get_cache_stats,
+    get_metrics_counters,
+    get_models_status,
+    get_models_versions,
+    iniciar_calentamiento,
+    iniciar_vigilancia,
+    is_warming,
+)
 from schemas import HealthResponse
 
+# Latencia por endpoint y etapa en /metrics (METRICS_ENABLED=0 lo desactiva)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
 # =============================================================================
 # CONFIGURACIÓN DE LA APP
 # =============================================================================
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Arranque: los modelos se cargan y calientan en segundo plano, así que
+    uvicorn abre el puerto de inmediato y /health responde `warming` mientras tanto.
+    Después se vigilan los archivos de MODELS_PATH para recargarlos en caliente.
+    """
+    tareas = [iniciar_calentamiento(), iniciar_vigilancia()]
+    yield
+    for tarea in tareas:
+        if tarea is not None:
+            tarea.cancel()
+    detener_pool()
+
+
 app = FastAPI(
     title="🏦 API de Predicción Bancaria",
     description="""
@@ -28,14 +67,35 @@ Asigna a un cliente a un segmento de mercado.
 - **Modelo:** K-Means + PCA
 - **Segmentos:** Recurrentes, Nuevos Estándar, Jóvenes Profesionales, Premium Seniors
 
+### 3. Perfil (`/predict/perfil`)
+Clasificación y segmentación del mismo cliente en una sola petición (se valida y codifica una vez).
+
+### Lotes (`/predict/clasificacion/batch`, `/predict/segmento/batch`, `/predict/perfil/batch`)
+Reciben una lista de clientes y la procesan en una sola pasada del modelo.
+
+### Archivos (`/predict/clasificacion/stream`, `/predict/segmento/stream`)
+Reciben un CSV (`;`) o NDJSON y responden NDJSON o CSV por bloques, sin cargar el archivo completo.
+
+### Saturación
+Cada endpoint admite un número limitado de peticiones en curso y en cola. Con el header
+`X-Deadline-Ms` el cliente indica cuánto puede esperar; si no alcanzaría, la API responde
+503 (o 429 con la cola llena) con `Retry-After` en lugar de hacerlo esperar.
+`X-Priority: bulk` manda la petición al carril masivo, que cede el paso a las interactivas.
+
 ---
 Desarrollado para **Intro a APIs con Python y ML**
     """,
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
+# Límites de en curso y cola por endpoint (por dentro de CORS y de las
+# métricas: los 503/429 llevan sus headers y se cuentan)
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -45,11 +105,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilerMiddleware)
+
 # =============================================================================
 # ROUTERS
 # =============================================================================
 
 app.include_router(predictions_router)
+app.include_router(bulk_router)
+app.include_router(perfil_router)
+app.include_router(columnar_router)
+app.include_router(admin_router)
 
 # =============================================================================
 # ENDPOINTS BASE
@@ -57,12 +125,46 @@ app.include_router(predictions_router)
 
 @app.get("/health", response_model=HealthResponse, tags=["Sistema"])
 async def health_check():
-    """Verifica el estado de la API y los modelos."""
+    """
+    Verifica el estado de la API y los modelos.
+    
+    - `warming`: los modelos se están cargando y calentando (la API ya acepta peticiones).
+    - `ok` / `degraded`: terminó la carga; `degraded` si algún modelo falló.
+    
+    En `modelos_cargados`, `None` indica que el modelo aún no se ha cargado.
+    En `admision`: peticiones en curso, en cola (por carril) y rechazadas de cada endpoint.
+    """
     status = get_models_status()
+    if is_warming():
+        estado = "warming"
+    else:
+        estado = "degraded" if False in status.values() else "ok"
     return HealthResponse(
-        status="ok" if all(status.values()) else "degraded",
+        status=estado,
         modelos_cargados=status,
-        version="1.0.0"
+        version="1.0.0",
+        versiones_modelos=get_models_versions(),
+        cache=get_cache_stats(),
+        admision=ADMISION.estado(),
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Sistema"])
+async def metrics():
+    """
+    Métricas en formato de texto de Prometheus.
+    
+    - `banco_api_request_duration_seconds{endpoint, stage}`: histograma por etapa
+      (`validacion`, `codificacion`, `cache`, `modelo`, `respuesta`, `serializacion`, `total`)
+    - `banco_api_engine_duration_seconds` / `banco_api_engine_batch_rows`: lotes evaluados por el motor
+    - `banco_api_unknown_categories_total{pipeline, column}`: categorías desconocidas codificadas como 0
+    - `banco_api_cache_*_total`: contadores del cache de predicciones
+    - `banco_api_requests_shed_total{endpoint, reason}`: rechazos del control de admisión
+      (`cola_llena`, `deadline`, `vencida`); la espera en cola es la etapa `cola`
+    """
+    return PlainTextResponse(
+        METRICS.render(get_metrics_counters()),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
     )
 
 
@@ -0,0 +1,101 @@
+"""
+Router de Administración.
+Herramientas de operación protegidas con la variable de entorno ADMIN_TOKEN.
+"""
+
+import os
+import secrets
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+
+from inference.profiler import ProfileSession, run_session
+from routers.predictions import get_models_info, recargar_modelos
+from utils import PIPELINES
+
+# Sin ADMIN_TOKEN los endpoints de administración responden 403
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Límites del perfilado para que sea seguro con tráfico real
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "120"))
+PROFILE_MIN_INTERVAL_MS = 1.0
+
+
+def verificar_admin(x_admin_token: Optional[str] = Header(None, description="Valor de ADMIN_TOKEN")):
+    if not ADMIN_TOKEN:
+        raise HTTPException(403, "Endpoints de administración desactivados (define ADMIN_TOKEN)")
+    if not secrets.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(401, "Token de administración inválido")
+
+
+router = APIRouter(prefix="/admin", tags=["Administración"], dependencies=[Depends(verificar_admin)])
+
+
+@router.post(
+    "/profile",
+    response_class=Response,
+    responses={200: {"content": {"text/plain": {}, "application/octet-stream": {}}}},
+)
+async def perfilar(
+    modo: Literal["muestreo", "cprofile"] = Query("muestreo", description="muestreo: todos los hilos; cprofile: event loop"),
+    segundos: float = Query(10, gt=0, description="Duración máxima de la sesión"),
+    peticiones: Optional[int] = Query(None, ge=1, description="Terminar después de N peticiones /predict"),
+    intervalo_ms: float = Query(10, description="Intervalo de muestreo (modo muestreo)"),
+    incluir_inactivos: bool = Query(False, description="Incluir hilos que solo están esperando"),
+    salida: Literal["pstats", "texto"] = Query("pstats", description="Formato del modo cprofile"),
+):
+    """
+    🔬 Perfila la API en ejecución y regresa el resultado como archivo.
+    
+    - **muestreo** → collapsed stacks (`flamegraph.pl`, speedscope, inferno).
+      Un intervalo mayor reduce el costo con mucho tráfico.
+    - **cprofile** → archivo pstats (`python -m pstats`, snakeviz) o `salida=texto`.
+    
+    La respuesta llega al terminar la sesión (`segundos` o `peticiones`).
+    Los encabezados `X-Profile-*` resumen la sesión.
+    """
+    if segundos > PROFILE_MAX_SECONDS:
+        raise HTTPException(422, f"segundos no puede ser mayor a {PROFILE_MAX_SECONDS:g}")
+    
+    session = ProfileSession(
+        mode=modo,
+        seconds=segundos,
+        requests=peticiones,
+        interval=max(intervalo_ms, PROFILE_MIN_INTERVAL_MS) / 1000,
+        include_idle=incluir_inactivos,
+    )
+    try:
+        await run_session(session)
+    except RuntimeError as e:
+        raise HTTPException(409, str(e))
+    
+    contenido, media_type, extension = session.artifact(salida)
+    nombre = f"profile-{modo}-{datetime.now():%Y%m%d-%H%M%S}.{extension}"
+    headers = {"Content-Disposition": f'attachment; filename="{nombre}"'}
+    headers.update({f"X-Profile-{key.capitalize()}": str(value) for key, value in session.summary().items()})
+    return Response(contenido, media_type=media_type, headers=headers)
+
+
+@router.post("/reload")
+async def recargar(
+    pipeline: Optional[Literal["clasificacion", "segmentacion"]] = Query(None, description="Por defecto, todos"),
+    forzar: bool = Query(False, description="Activar aunque la versión en disco sea la misma"),
+):
+    """
+    🔄 Recarga los modelos desde MODELS_PATH sin reiniciar la API.
+    
+    La versión nueva se carga y se prueba aparte; solo si todo sale bien
+    reemplaza a la activa. Las peticiones en curso terminan con la versión
+    anterior y, si la carga falla, la anterior sigue atendiendo.
+    """
+    pipelines = [pipeline] if pipeline else list(PIPELINES)
+    return [await run_in_threadpool(recargar_modelos, p, forzar) for p in pipelines]
+
+
+@router.get("/models")
+async def modelos():
+    """📦 Versión activa, número de recargas, último error e historial por pipeline."""
+    return get_models_info()
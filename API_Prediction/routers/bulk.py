@@ -0,0 +1,286 @@
+"""
+Router de Predicción Masiva.
+Endpoints que reciben un CSV o NDJSON como stream y responden también como stream.
+"""
+
+import csv
+import io
+import json
+import os
+from functools import partial
+from typing import AsyncIterator, List, Literal, Optional, Tuple, Union
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+
+from schemas import ClienteClasificacion, ClienteSegmentacion
+from routers.predictions import (
+    _requerir_modelos,
+    _respuesta_clasificacion,
+    _respuesta_segmento,
+)
+
+router = APIRouter(prefix="/predict", tags=["Predicción masiva"])
+
+# Filas por bloque: la memoria usada depende de esto, no del tamaño del archivo
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "5000"))
+
+# Separador del CSV de entrada: un carácter, sin saltos de línea ni comillas
+SEP_PATTERN = r'^[^"\r\n]$'
+
+# Documentación del body para /docs (el body se lee a mano, no con un modelo)
+STREAM_BODY_DOC = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "text/csv": {
+                "schema": {"type": "string"},
+                "example": "age;job;marital;education;default;balance;housing;loan;day;month;duration;campaign;pdays;previous\n"
+                           "35;management;married;tertiary;no;1500;yes;no;15;may;300;2;-1;0\n",
+            },
+            "application/x-ndjson": {
+                "schema": {"type": "string"},
+            },
+        },
+    }
+}
+
+
+class _BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que sigue leyendo el body de la petición mientras responde.
+    
+    La versión de Starlette escucha `receive()` en paralelo para detectar
+    desconexiones, lo que le robaría los bloques del body al generador.
+    """
+    
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+# =============================================================================
+# LECTURA DEL BODY POR BLOQUES
+# =============================================================================
+
+async def _leer_lineas(request: Request) -> AsyncIterator[bytes]:
+    """Líneas completas del body, conforme van llegando."""
+    resto = b""
+    async for bloque in request.stream():
+        resto += bloque
+        *lineas, resto = resto.split(b"\n")
+        for linea in lineas:
+            yield linea
+    if resto:
+        yield resto
+
+
+def _decodificar(linea: bytes) -> Union[str, ValueError]:
+    try:
+        return linea.rstrip(b"\r").decode("utf-8")
+    except UnicodeDecodeError as e:
+        return ValueError(f"no es UTF-8 (byte {e.start})")
+
+
+async def _leer_encabezado(lineas: AsyncIterator[bytes], sep: str, esquema) -> Optional[List[str]]:
+    """
+    Primera línea no vacía de un CSV, antes de empezar a responder: un
+    encabezado que no es UTF-8 o al que le faltan campos (p. ej. por un
+    separador equivocado) es un 400, no un error en cada fila.
+    """
+    async for linea in lineas:
+        texto = _decodificar(linea)
+        if isinstance(texto, ValueError):
+            raise HTTPException(400, f"Encabezado del CSV inválido: {texto}")
+        if not texto.strip():
+            continue
+        columnas = next(csv.reader([texto], delimiter=sep))
+        faltantes = [
+            nombre for nombre, campo in esquema.model_fields.items()
+            if campo.is_required() and nombre not in columnas
+        ]
+        if faltantes:
+            raise HTTPException(
+                400,
+                f"Al encabezado del CSV le faltan columnas: {', '.join(faltantes)} "
+                f"(separador '{sep}')",
+            )
+        return columnas
+    return None
+
+
+async def _leer_registros(
+    lineas: AsyncIterator[bytes], es_csv: bool, columnas: Optional[List[str]], sep: str
+) -> AsyncIterator[List[Tuple[int, object]]]:
+    """
+    Bloques de hasta STREAM_CHUNK_ROWS registros `(fila, dict)`.
+    
+    - CSV (`Content-Type: text/csv`): `columnas` es el encabezado ya leído,
+      como el `bank.csv` de los notebooks (`sep=';'`, valores entre comillas opcionales).
+    - NDJSON (cualquier otro Content-Type): un objeto JSON por línea.
+    Las líneas que no se pueden leer (o que no son UTF-8) se regresan como `(fila, Exception)`.
+    """
+    fila = 0
+    lineas_bloque: List[Union[str, ValueError]] = []
+    
+    def parsear(lineas: List[Union[str, ValueError]]) -> List[Tuple[int, object]]:
+        nonlocal fila
+        textos = (linea for linea in lineas if isinstance(linea, str))
+        filas = csv.reader(textos, delimiter=sep) if es_csv else textos
+        registros = []
+        for linea in lineas:
+            try:
+                if isinstance(linea, ValueError):
+                    registro = linea
+                elif not es_csv:
+                    registro = json.loads(next(filas))
+                elif len(valores := next(filas)) == len(columnas):
+                    registro = dict(zip(columnas, valores))
+                else:
+                    registro = ValueError(f"{len(valores)} columnas, se esperaban {len(columnas)}")
+            except ValueError as e:
+                registro = e
+            registros.append((fila, registro))
+            fila += 1
+        return registros
+    
+    async for linea in lineas:
+        texto = _decodificar(linea)
+        if isinstance(texto, str) and not texto.strip():
+            continue
+        
+        lineas_bloque.append(texto)
+        if len(lineas_bloque) >= STREAM_CHUNK_ROWS:
+            yield parsear(lineas_bloque)
+            lineas_bloque = []
+    
+    if lineas_bloque:
+        yield parsear(lineas_bloque)
+
+
+def _validar(registros: List[Tuple[int, object]], esquema) -> Tuple[list, list, list]:
+    """
+    Valida un bloque con el mismo esquema Pydantic de los endpoints individuales.
+    
+    Returns:
+        (filas válidas, clientes validados, errores `(fila, mensaje)`)
+    """
+    adapter = TypeAdapter(List[esquema])
+    filas = [fila for fila, registro in registros if not isinstance(registro, Exception)]
+    datos = [registro for _, registro in registros if not isinstance(registro, Exception)]
+    errores = [
+        (fila, f"Línea inválida: {registro}")
+        for fila, registro in registros if isinstance(registro, Exception)
+    ]
+    
+    try:
+        return filas, adapter.validate_python(datos), errores
+    except ValidationError:
+        pass
+    
+    # Algún registro es inválido: validar uno por uno para reportar cuál
+    validas, clientes = [], []
+    for fila, dato in zip(filas, datos):
+        try:
+            clientes.append(esquema.model_validate(dato))
+            validas.append(fila)
+        except ValidationError as e:
+            error = e.errors()[0]
+            campo = ".".join(str(p) for p in error["loc"])
+            errores.append((fila, f"{campo}: {error['msg']}"))
+    return validas, clientes, errores
+
+
+# =============================================================================
+# ESCRITURA DE RESULTADOS
+# =============================================================================
+
+def _serializar(resultados: List[Tuple[int, dict]], columnas: List[str], salida: str, encabezado: bool) -> str:
+    """Convierte un bloque de resultados `(fila, dict)` a NDJSON o CSV (`;`)."""
+    if salida == "ndjson":
+        return "".join(
+            json.dumps({"fila": fila, **datos}, ensure_ascii=False) + "\n"
+            for fila, datos in resultados
+        )
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";", lineterminator="\n")
+    if encabezado:
+        writer.writerow(["fila", *columnas, "error"])
+    for fila, datos in resultados:
+        writer.writerow([fila, *(datos.get(c, "") for c in columnas), datos.get("error", "")])
+    return buffer.getvalue()
+
+
+async def _stream(request: Request, sep: str, salida: str, esquema, modelos, respuesta, columnas):
+    """Generador de la respuesta: lee un bloque, lo evalúa y lo escribe antes de leer el siguiente."""
+    lineas = _leer_lineas(request)
+    es_csv = "csv" in request.headers.get("content-type", "")
+    entrada = await _leer_encabezado(lineas, sep, esquema) if es_csv else None
+    
+    async def generar() -> AsyncIterator[str]:
+        encabezado = True
+        async for registros in _leer_registros(lineas, es_csv, entrada, sep):
+            filas, clientes, errores = _validar(registros, esquema)
+            
+            resultados = [(fila, {"error": mensaje}) for fila, mensaje in errores]
+            if clientes:
+                X = modelos["encoder"].transform([cliente.model_dump() for cliente in clientes])
+                salidas = await modelos["batcher"].run(X)
+                resultados += [
+                    (fila, respuesta(valor))
+                    for fila, valor in zip(filas, salidas)
+                ]
+            resultados.sort(key=lambda r: r[0])
+            
+            yield _serializar(resultados, columnas, salida, encabezado)
+            encabezado = False
+    
+    media_type = "application/x-ndjson" if salida == "ndjson" else "text/csv"
+    return _BodyStreamingResponse(generar(), media_type=media_type)
+
+
+# =============================================================================
+# ENDPOINTS
+# =============================================================================
+
+@router.post("/clasificacion/stream", openapi_extra=STREAM_BODY_DOC)
+async def predecir_clasificacion_stream(
+    request: Request,
+    salida: Literal["ndjson", "csv"] = Query("ndjson", description="Formato de la respuesta"),
+    sep: str = Query(";", min_length=1, max_length=1, pattern=SEP_PATTERN, description="Separador del CSV de entrada"),
+):
+    """
+    🎯 Clasificación masiva a partir de un CSV o NDJSON.
+    
+    El archivo se procesa por bloques mientras se sube y cada bloque se
+    responde en cuanto está listo, así que la memoria no depende del tamaño
+    del archivo. Cada resultado incluye `fila` (0 = primera fila de datos);
+    las filas inválidas llevan `error` en lugar de predicción.
+    """
+    clf = await _requerir_modelos("clasificacion", "Modelo de clasificación no disponible")
+    return await _stream(
+        request, sep, salida, ClienteClasificacion, clf,
+        _respuesta_clasificacion, ["contratara", "probabilidad", "etiqueta"],
+    )
+
+
+@router.post("/segmento/stream", openapi_extra=STREAM_BODY_DOC)
+async def predecir_segmento_stream(
+    request: Request,
+    salida: Literal["ndjson", "csv"] = Query("ndjson", description="Formato de la respuesta"),
+    sep: str = Query(";", min_length=1, max_length=1, pattern=SEP_PATTERN, description="Separador del CSV de entrada"),
+):
+    """
+    📊 Segmentación masiva a partir de un CSV o NDJSON.
+    
+    Mismo formato que `/predict/clasificacion/stream`; las columnas `day` y
+    `month` (y cualquier otra extra) se ignoran.
+    """
+    seg = await _requerir_modelos("segmentacion", "Modelo de segmentación no disponible")
+    return await _stream(
+        request, sep, salida, ClienteSegmentacion, seg,
+        partial(_respuesta_segmento, names=seg["names"]), ["cluster", "segmento", "descripcion"],
+    )
@@ -0,0 +1,126 @@
+"""
+Router de Predicción Columnar.
+Endpoints para servicios internos que ya tienen los datos por columnas:
+reciben y responden el formato binario de `inference/columnar.py`, sin JSON.
+"""
+
+from typing import Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+
+from schemas import ClienteClasificacion, ClienteSegmentacion
+from inference import columnar
+from inference.metrics import etapa, medir_endpoint
+from routers.predictions import ETIQUETAS, _requerir_modelos
+from utils import SEGMENT_DESCRIPTIONS
+
+router = APIRouter(prefix="/predict", tags=["Predicción columnar"])
+
+_BINARIO = {"schema": {"type": "string", "format": "binary"}}
+
+# Documentación del body para /docs (el body se lee a mano, no con un modelo)
+COLUMNAR_BODY_DOC = {
+    "requestBody": {
+        "required": True,
+        "content": {columnar.MEDIA_TYPE: _BINARIO},
+    }
+}
+
+
+def _respuestas_doc(columnas: str) -> dict:
+    return {
+        200: {"description": f"Payload columnar con {columnas}", "content": {columnar.MEDIA_TYPE: _BINARIO}},
+        400: {"description": "Payload mal formado"},
+        422: {"description": "Columnas faltantes, de tipo incorrecto o fuera de rango"},
+    }
+
+
+async def _leer(request: Request, esquema, modelos: dict) -> Tuple[int, np.ndarray]:
+    """Decodifica y valida el payload y lo pasa por el encoder del modelo."""
+    payload = await request.body()
+    with etapa("decodificacion"):
+        try:
+            n, columnas, categorias = columnar.decode(payload)
+        except columnar.ColumnarError as e:
+            raise HTTPException(400, str(e))
+        errores = columnar.check(esquema, columnas, categorias)
+        if errores:
+            raise HTTPException(422, errores)
+    with etapa("codificacion"):
+        return n, modelos["encoder"].transform_columns(columnas, categorias)
+
+
+def _respuesta(columnas: dict, categorias: dict) -> Response:
+    with etapa("respuesta"):
+        return Response(columnar.encode(columnas, categorias), media_type=columnar.MEDIA_TYPE)
+
+
+# =============================================================================
+# ENDPOINTS
+# =============================================================================
+
+@router.post(
+    "/clasificacion/columnar",
+    response_class=Response,
+    openapi_extra=COLUMNAR_BODY_DOC,
+    responses=_respuestas_doc("`contratara` (|b1), `probabilidad` (<f8) y `etiqueta` (categorías)"),
+)
+@medir_endpoint
+async def predecir_clasificacion_columnar(request: Request):
+    """
+    🎯 Clasificación de un lote en formato columnar (`application/vnd.banco.columnar`).
+    
+    Mismas columnas que `ClienteClasificacion`; los textos van como índices
+    sobre `categorias`. La respuesta usa el mismo formato, una fila por cliente
+    en el mismo orden.
+    """
+    clf = await _requerir_modelos("clasificacion", "Modelo de clasificación no disponible")
+    n, X = await _leer(request, ClienteClasificacion, clf)
+    
+    with etapa("modelo"):
+        resultados = await clf["batcher"].run(X) if n else np.empty((0, 2))
+    contratara = resultados[:, 0].astype(bool)
+    return _respuesta(
+        {
+            "contratara": contratara,
+            "probabilidad": np.round(resultados[:, 1], 4),
+            "etiqueta": contratara.astype(np.uint8),
+        },
+        {"etiqueta": [ETIQUETAS[False], ETIQUETAS[True]]},
+    )
+
+
+@router.post(
+    "/segmento/columnar",
+    response_class=Response,
+    openapi_extra=COLUMNAR_BODY_DOC,
+    responses=_respuestas_doc("`cluster` (<i4), `segmento` y `descripcion` (categorías)"),
+)
+@medir_endpoint
+async def predecir_segmento_columnar(request: Request):
+    """
+    📊 Segmentación de un lote en formato columnar (`application/vnd.banco.columnar`).
+    
+    Mismas columnas que `ClienteSegmentacion` (las extra, como `day` o `month`,
+    se ignoran). `segmento` y `descripcion` son índices sobre sus `categorias`.
+    """
+    seg = await _requerir_modelos("segmentacion", "Modelo de segmentación no disponible")
+    n, X = await _leer(request, ClienteSegmentacion, seg)
+    
+    with etapa("modelo"):
+        clusters = (await seg["batcher"].run(X) if n else np.empty(0)).astype(np.int32)
+    
+    # Índice de cada cluster dentro de las listas de categorías
+    ids = sorted(seg["names"])
+    posiciones = np.zeros(max(ids) + 1, dtype=np.uint8)
+    posiciones[ids] = np.arange(len(ids))
+    codigos = posiciones[clusters]
+    return _respuesta(
+        {"cluster": clusters, "segmento": codigos, "descripcion": codigos},
+        {
+            "segmento": [seg["names"][c] for c in ids],
+            "descripcion": [SEGMENT_DESCRIPTIONS[c] for c in ids],
+        },
+    )
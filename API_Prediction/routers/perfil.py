@@ -0,0 +1,146 @@
+"""
+Router de Perfil.
+Clasificación y segmentación del mismo cliente en una sola petición: se valida
+y se codifica una vez, y los dos modelos corren a la vez sobre la misma matriz.
+"""
+
+import asyncio
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException
+
+from schemas import ClienteClasificacion, PerfilCliente
+from inference.cache import PredictionCache
+from inference.metrics import etapa, medir_endpoint
+from inference.respuestas import RespuestaJSON, dumps, lista, objeto
+from routers.predictions import (
+    _modelos,
+    _requerir_modelos,
+    _respuesta_clasificacion,
+    clf_cache,
+    seg_cache,
+)
+
+router = APIRouter(prefix="/predict", tags=["Perfil"])
+
+# Columnas de la matriz de clasificación que forman la de segmentación, por
+# par de versiones activas (None si los encoders no son compatibles)
+_proyecciones: Dict[Tuple[str, str], Optional[np.ndarray]] = {}
+
+
+async def _pipelines() -> Tuple[dict, dict]:
+    return await asyncio.gather(
+        _requerir_modelos("clasificacion", "Modelo de clasificación no disponible"),
+        _requerir_modelos("segmentacion", "Modelo de segmentación no disponible"),
+    )
+
+
+def _proyeccion(clf: dict, seg: dict) -> Optional[np.ndarray]:
+    llave = (clf["version"], seg["version"])
+    if llave not in _proyecciones:
+        _proyecciones.clear()  # solo interesa el par activo
+        _proyecciones[llave] = clf["encoder"].projection(seg["encoder"])
+    return _proyecciones[llave]
+
+
+def _codificar(clf: dict, seg: dict, datos: List[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Matriz de clasificación (todas las variables) y, de ella, la de
+    segmentación: las variables comunes se codifican una sola vez.
+    Si los encoders de las dos versiones activas no coinciden, la de
+    segmentación se codifica aparte.
+    """
+    if len(datos) == 1:
+        X_clf = clf["encoder"].transform_one(datos[0])
+    else:
+        X_clf = clf["encoder"].transform(datos)
+    idx = _proyeccion(clf, seg)
+    if idx is None:
+        encoder = seg["encoder"]
+        return X_clf, encoder.transform_one(datos[0]) if len(datos) == 1 else encoder.transform(datos)
+    return X_clf, X_clf[:, idx]
+
+
+async def _con_cache(
+    pipeline: str,
+    modelos: dict,
+    cache: PredictionCache,
+    X: np.ndarray,
+    respuesta: Callable[[dict, object], bytes],
+) -> bytes:
+    """Lo mismo que hacen /predict/clasificacion y /predict/segmento (comparten su cache)."""
+    key = cache.key(X)
+    codificada = cache.get(key, modelos["version"])
+    if codificada is None:
+        codificada = respuesta(modelos, await modelos["batcher"].submit(X))
+        if _modelos.get(pipeline) is modelos:
+            cache.put(key, modelos["version"], codificada)
+    return codificada
+
+
+def _clasificacion(clf: dict, fila) -> bytes:
+    return dumps(_respuesta_clasificacion(fila))
+
+
+def _segmento(seg: dict, cluster) -> bytes:
+    return seg["respuestas"][int(cluster)]
+
+
+# =============================================================================
+# ENDPOINTS
+# =============================================================================
+
+@router.post("/perfil", response_model=PerfilCliente)
+@medir_endpoint
+async def predecir_perfil(cliente: ClienteClasificacion):
+    """
+    👤 Propensión a contratar y segmento del mismo cliente.
+    
+    Recibe los mismos datos que `/predict/clasificacion` (segmentación ignora
+    `day` y `month`) y responde las dos predicciones juntas.
+    """
+    clf, seg = await _pipelines()
+    
+    try:
+        with etapa("codificacion"):
+            X_clf, X_seg = _codificar(clf, seg, [cliente.model_dump()])
+        with etapa("modelo"):
+            r_clf, r_seg = await asyncio.gather(
+                _con_cache("clasificacion", clf, clf_cache, X_clf, _clasificacion),
+                _con_cache("segmentacion", seg, seg_cache, X_seg, _segmento),
+            )
+        with etapa("respuesta"):
+            return RespuestaJSON(objeto({"clasificacion": r_clf, "segmento": r_seg}))
+    
+    except Exception as e:
+        raise HTTPException(500, f"Error: {str(e)}")
+
+
+@router.post("/perfil/batch", response_model=List[PerfilCliente])
+@medir_endpoint
+async def predecir_perfil_batch(clientes: List[ClienteClasificacion]):
+    """
+    👤 Propensión y segmento para una lista de clientes, en el mismo orden.
+    
+    Cada modelo evalúa el lote completo en una sola pasada; los dos corren a la vez.
+    """
+    clf, seg = await _pipelines()
+    
+    if not clientes:
+        return RespuestaJSON(b"[]")
+    
+    try:
+        with etapa("codificacion"):
+            X_clf, X_seg = _codificar(clf, seg, [cliente.model_dump() for cliente in clientes])
+        with etapa("modelo"):
+            r_clf, r_seg = await asyncio.gather(clf["batcher"].run(X_clf), seg["batcher"].run(X_seg))
+        with etapa("respuesta"):
+            respuestas = seg["respuestas"]
+            return RespuestaJSON(lista(
+                objeto({"clasificacion": dumps(_respuesta_clasificacion(fila)), "segmento": respuestas[cluster]})
+                for fila, cluster in zip(r_clf.tolist(), r_seg.tolist())
+            ))
+    
+    except Exception as e:
+        raise HTTPException(500, f"Error: {str(e)}")
@@ -3,7 +3,15 @@ Router de Predicciones.
 Endpoints para clasificación y segmentación.
 """
 
+import asyncio
+import os
+import time
+from functools import partial
+from typing import Dict, List, Optional
+
+import numpy as np
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 
 from schemas import (
     ClienteClasificacion,
@@ -11,67 +19,341 @@ from schemas import (
     PrediccionClasificacion,
     PrediccionSegmento,
 )
+from inference.batcher import MicroBatcher
+from inference.cache import PredictionCache
+from inference.metrics import etapa, medir_endpoint, registrar_motor
+from inference.pool import InferencePool, load_engine
+from inference.registry import ModelRegistry
+from inference.respuestas import RespuestaJSON, dumps, lista
 from utils import (
-    encode_categorical,
-    load_clasificacion_models,
-    load_segmentacion_models,
+    load_pipeline,
+    pipeline_signature,
+    PIPELINES,
     SEGMENT_DESCRIPTIONS,
+    UNKNOWN_CATEGORIES,
 )
 
 router = APIRouter(prefix="/predict", tags=["Predicción"])
 
-# Cargar modelos al iniciar
-try:
-    clf = load_clasificacion_models()
-    CLASIFICACION_OK = True
-except Exception as e:
-    print(f"⚠️ Error cargando clasificación: {e}")
-    CLASIFICACION_OK = False
-    clf = {}
+# Micro-batching: peticiones individuales que llegan dentro de la misma
+# ventana se evalúan juntas (BATCH_MAX_SIZE=1 lo desactiva)
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "64"))
+BATCH_WAIT_MS = float(os.getenv("BATCH_WAIT_MS", "2"))
+
+# Cache de predicciones individuales (CACHE_MAX_SIZE=0 lo desactiva)
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", "10000"))
+CACHE_TTL_S = float(os.getenv("CACHE_TTL_S", "300"))
+
+# Procesos de inferencia con pesos compartidos (0 = hilos dentro de este proceso)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+
+# Al arrancar, cargar los modelos y hacer una predicción de prueba en segundo
+# plano (WARMUP=0 deja la carga perezosa, al primer uso de cada endpoint)
+WARMUP = os.getenv("WARMUP", "1") != "0"
+
+# Cada cuántos segundos revisar si cambiaron los archivos de MODELS_PATH
+# para recargarlos en caliente (0 = solo con POST /admin/reload)
+MODELS_WATCH_S = float(os.getenv("MODELS_WATCH_S", "5"))
+
+# =============================================================================
+# CARGA DE MODELOS (perezosa: la primera vez que se usa cada endpoint)
+# =============================================================================
+
+ESQUEMAS = {
+    "clasificacion": ClienteClasificacion,
+    "segmentacion": ClienteSegmentacion,
+}
+
+
+def _ejemplo(pipeline: str) -> dict:
+    """El ejemplo del esquema (el mismo de /docs), ya validado."""
+    esquema = ESQUEMAS[pipeline]
+    return esquema.model_validate(esquema.model_config["json_schema_extra"]["example"]).model_dump()
+
+
+def _activar(pipeline: str, modelos: dict) -> None:
+    """
+    Prepara una versión antes de que empiece a atender peticiones: la prueba
+    con el ejemplo del esquema y le crea su propio micro-batcher, que evalúa
+    siempre el motor de esa versión. Si falla, la versión no se activa.
+    """
+    salida = modelos["engine"].score(modelos["encoder"].transform_one(_ejemplo(pipeline)))
+    if len(salida) != 1:
+        raise ValueError(f"El motor regresó {len(salida)} resultados para 1 cliente")
+    
+    if pipeline == "segmentacion":
+        # Solo hay un puñado de clusters: sus respuestas se codifican una vez
+        modelos["respuestas"] = {
+            int(cluster): dumps(_respuesta_segmento(cluster, modelos["names"]))
+            for cluster in modelos["names"]
+        }
+    
+    if pool is not None:
+        fn = _publicar(pipeline, modelos)
+    else:
+        fn = partial(_evaluar, pipeline, modelos["engine"])
+    modelos["batcher"] = MicroBatcher(fn, BATCH_MAX_SIZE, BATCH_WAIT_MS)
+
+
+# Versión activa de cada pipeline. Las peticiones toman `_modelos[pipeline]`
+# una vez, así que una recarga no cambia los modelos de una petición en curso.
+registry = ModelRegistry(PIPELINES, load_pipeline, activate=_activar, signature=pipeline_signature)
+_modelos = registry.active
+_errores = registry.errors
+
+
+def cargar_modelos(pipeline: str) -> Optional[dict]:
+    """Carga un pipeline una sola vez (thread-safe). Regresa None si no está disponible."""
+    return registry.load(pipeline)
+
+
+def recargar_modelos(pipeline: str, forzar: bool = False) -> dict:
+    """Carga la versión en disco y la activa si cambió (bloquea; llamar en un hilo)."""
+    resumen = registry.reload(pipeline, force=forzar)
+    if resumen["status"] == "actualizado":
+        print(f"🔄 {pipeline}: {resumen['anterior']} → {resumen['version']}")
+    return resumen
+
+
+async def _requerir_modelos(pipeline: str, mensaje: str) -> dict:
+    """Modelos del pipeline, cargándolos fuera del event loop si hace falta (503 si fallan)."""
+    modelos = _modelos.get(pipeline)
+    if modelos is None:
+        modelos = await run_in_threadpool(cargar_modelos, pipeline)
+    if modelos is None:
+        raise HTTPException(503, mensaje)
+    return modelos
+
+
+# =============================================================================
+# PIPELINES (operan sobre una matriz completa: 1 fila o miles)
+# =============================================================================
+
+def _evaluar(pipeline: str, engine, X: np.ndarray) -> np.ndarray:
+    """
+    Evalúa el motor de una versión (en un hilo del executor).
+    
+    - clasificacion: Scaling → Random Forest (compilado). Por cliente: [clase, probabilidad]
+    - segmentacion: StandardScaler → PCA → K-Means (fusionados). Por cliente: el cluster
+    """
+    inicio = time.perf_counter()
+    resultado = engine.score(X)
+    registrar_motor(pipeline, len(X), time.perf_counter() - inicio)
+    return resultado
+
+
+# Las respuestas se arman como dicts con los campos de PrediccionClasificacion
+# y PrediccionSegmento (los esquemas que documenta /docs) y se regresan como
+# RespuestaJSON, sin volver a validarlas contra el response_model.
+
+ETIQUETAS = {True: "Sí contratará", False: "No contratará"}
+
+
+def _respuesta_clasificacion(fila) -> dict:
+    prediccion, probabilidad = fila
+    prediccion = bool(prediccion)
+    return {
+        "contratara": prediccion,
+        "probabilidad": round(float(probabilidad), 4),
+        "etiqueta": ETIQUETAS[prediccion],
+    }
+
+
+def _respuesta_segmento(cluster: int, names: dict) -> dict:
+    cluster = int(cluster)
+    return {
+        "cluster": cluster,
+        "segmento": names[cluster],
+        "descripcion": SEGMENT_DESCRIPTIONS[cluster],
+    }
+
+
+clf_cache = PredictionCache(CACHE_MAX_SIZE, CACHE_TTL_S)
+seg_cache = PredictionCache(CACHE_MAX_SIZE, CACHE_TTL_S)
+
+
+# =============================================================================
+# POOL DE PROCESOS (INFERENCE_WORKERS > 0)
+# =============================================================================
+
+pool = None
+
+
+def crear_pool() -> Optional[InferencePool]:
+    """Levanta los procesos de inferencia con los pesos de los pipelines cargados (bloquea)."""
+    # El pool necesita los pesos desde el inicio: aquí no hay carga perezosa
+    engines = {
+        pipeline: modelos["engine"]
+        for pipeline in PIPELINES
+        if (modelos := cargar_modelos(pipeline)) is not None
+    }
+    if not engines:
+        return None
+    
+    nuevo = InferencePool(engines, INFERENCE_WORKERS)
+    nuevo.warmup()
+    return nuevo
+
+
+# Objetos de sklearn que solo hacen falta para compilar el motor
+SKLEARN = ("modelo", "scaler", "pca", "kmeans")
+
+
+def _publicar(pipeline: str, modelos: dict):
+    """
+    Publica el motor de una versión en el pool y regresa su evaluador. Desde
+    aquí la API ya no evalúa: suelta los objetos de sklearn y los arreglos
+    privados del motor, y se queda con el motor abierto con mmap desde la
+    carpeta compartida (las mismas páginas que usan los procesos).
+    """
+    fn = pool.publish(pipeline, modelos["engine"])
+    modelos["engine"] = load_engine(pool.directories[pipeline])
+    for llave in SKLEARN:
+        modelos.pop(llave, None)
+    return fn
+
+
+def usar_pool(nuevo: InferencePool) -> None:
+    """Mueve la evaluación de los modelos a los procesos (desde el event loop)."""
+    global pool
+    pool = nuevo
+    for pipeline, modelos in list(_modelos.items()):
+        modelos["batcher"].fn = _publicar(pipeline, modelos)
+
 
-try:
-    seg = load_segmentacion_models()
-    SEGMENTACION_OK = True
-except Exception as e:
-    print(f"⚠️ Error cargando segmentación: {e}")
-    SEGMENTACION_OK = False
-    seg = {}
+def detener_pool():
+    if pool is not None:
+        pool.shutdown()
 
 
+# =============================================================================
+# CALENTAMIENTO (en segundo plano al arrancar)
+# =============================================================================
+
+_calentando = False
+
+
+async def _prediccion_sintetica(pipeline: str) -> None:
+    """Pasa el ejemplo del esquema por el mismo camino que una petición, sin tocar el cache."""
+    modelos = _modelos[pipeline]
+    resultado = await modelos["batcher"].submit(modelos["encoder"].transform_one(_ejemplo(pipeline)))
+    if pipeline == "segmentacion":
+        if int(resultado) not in modelos["respuestas"]:
+            raise ValueError(f"El motor de segmentación regresó un cluster sin respuesta: {int(resultado)}")
+    else:
+        dumps(_respuesta_clasificacion(resultado))
+
+
+async def calentar() -> None:
+    """
+    Carga cada pipeline en un hilo (el event loop sigue respondiendo /health),
+    levanta el pool si se pidió y hace una predicción sintética por pipeline
+    para inicializar el encoder, el micro-batcher, el executor y el motor.
+    """
+    global _calentando
+    _calentando = True
+    try:
+        for pipeline in PIPELINES:
+            await run_in_threadpool(cargar_modelos, pipeline)
+        
+        if INFERENCE_WORKERS > 0:
+            nuevo = await run_in_threadpool(crear_pool)
+            if nuevo is not None:
+                usar_pool(nuevo)
+        
+        for pipeline in PIPELINES:
+            if pipeline in _modelos:
+                await _prediccion_sintetica(pipeline)
+    except Exception as e:
+        print(f"⚠️ Error en el calentamiento: {e}")
+    finally:
+        _calentando = False
+
+
+def iniciar_calentamiento() -> Optional[asyncio.Task]:
+    """Lanza `calentar()` en segundo plano. Con INFERENCE_WORKERS > 0 siempre corre (el pool lo necesita)."""
+    global _calentando
+    if not (WARMUP or INFERENCE_WORKERS > 0):
+        return None
+    _calentando = True
+    return asyncio.ensure_future(calentar())
+
+
+def iniciar_vigilancia() -> Optional[asyncio.Task]:
+    """Revisa MODELS_PATH cada MODELS_WATCH_S segundos y recarga lo que cambie."""
+    if MODELS_WATCH_S <= 0:
+        return None
+    
+    def reportar(resumen: dict) -> None:
+        if resumen["status"] == "actualizado":
+            print(f"🔄 {resumen['pipeline']}: {resumen['anterior']} → {resumen['version']}")
+    
+    return asyncio.ensure_future(registry.watch(MODELS_WATCH_S, on_reload=reportar))
+
+
+# =============================================================================
+# ENDPOINTS
+# =============================================================================
+
 @router.post("/clasificacion", response_model=PrediccionClasificacion)
+@medir_endpoint
 async def predecir_clasificacion(cliente: ClienteClasificacion):
     """
     🎯 Predice si un cliente contratará un depósito a plazo.
     
     **Modelo:** Random Forest
     """
-    if not CLASIFICACION_OK:
-        raise HTTPException(503, "Modelo de clasificación no disponible")
+    clf = await _requerir_modelos("clasificacion", "Modelo de clasificación no disponible")
     
     try:
-        # Preprocesar
-        df = encode_categorical(
-            cliente.model_dump(),
-            clf["encoders"],
-            clf["features"]
-        )
-        
-        # Escalar y predecir
-        X_scaled = clf["scaler"].transform(df)
-        prediccion = clf["modelo"].predict(X_scaled)[0]
-        probabilidad = clf["modelo"].predict_proba(X_scaled)[0][1]
+        with etapa("codificacion"):
+            X = clf["encoder"].transform_one(cliente.model_dump())
         
-        return PrediccionClasificacion(
-            contratara=bool(prediccion),
-            probabilidad=round(float(probabilidad), 4),
-            etiqueta="Sí contratará" if prediccion else "No contratará"
-        )
+        # Mismo vector codificado y misma versión del modelo → misma respuesta
+        with etapa("cache"):
+            key = clf_cache.key(X)
+            respuesta = clf_cache.get(key, clf["version"])
+        if respuesta is None:
+            with etapa("modelo"):
+                resultado = await clf["batcher"].submit(X)
+            with etapa("respuesta"):
+                respuesta = dumps(_respuesta_clasificacion(resultado))
+            # Si hubo una recarga mientras tanto, no mezclar versiones en el cache
+            if _modelos.get("clasificacion") is clf:
+                clf_cache.put(key, clf["version"], respuesta)
+        return RespuestaJSON(respuesta)
+    
+    except Exception as e:
+        raise HTTPException(500, f"Error: {str(e)}")
+
+
+@router.post("/clasificacion/batch", response_model=List[PrediccionClasificacion])
+@medir_endpoint
+async def predecir_clasificacion_batch(clientes: List[ClienteClasificacion]):
+    """
+    🎯 Predice para una lista de clientes en una sola pasada del modelo.
+    
+    Las predicciones se devuelven en el mismo orden que los clientes.
+    """
+    clf = await _requerir_modelos("clasificacion", "Modelo de clasificación no disponible")
+    
+    if not clientes:
+        return RespuestaJSON(b"[]")
+    
+    try:
+        with etapa("codificacion"):
+            X = clf["encoder"].transform([cliente.model_dump() for cliente in clientes])
+        with etapa("modelo"):
+            resultados = await clf["batcher"].run(X)
+        with etapa("respuesta"):
+            return RespuestaJSON(dumps([_respuesta_clasificacion(fila) for fila in resultados.tolist()]))
     
     except Exception as e:
         raise HTTPException(500, f"Error: {str(e)}")
 
 
 @router.post("/segmento", response_model=PrediccionSegmento)
+@medir_endpoint
 async def predecir_segmento(cliente: ClienteSegmentacion):
     """
     📊 Asigna un cliente a un segmento de mercado.
@@ -84,36 +366,102 @@ async def predecir_segmento(cliente: ClienteSegmentacion):
     - Jóvenes Profesionales
     - Premium Seniors
     """
-    if not SEGMENTACION_OK:
-        raise HTTPException(503, "Modelo de segmentación no disponible")
+    seg = await _requerir_modelos("segmentacion", "Modelo de segmentación no disponible")
     
     try:
-        # Preprocesar
-        df = encode_categorical(
-            cliente.model_dump(),
-            seg["encoders"],
-            seg["features"]
-        )
-        
-        # Escalar → PCA → K-Means
-        X_scaled = seg["scaler"].transform(df)
-        X_pca = seg["pca"].transform(X_scaled)
-        cluster = seg["kmeans"].predict(X_pca)[0]
+        with etapa("codificacion"):
+            X = seg["encoder"].transform_one(cliente.model_dump())
         
-        return PrediccionSegmento(
-            cluster=int(cluster),
-            segmento=seg["names"][cluster],
-            descripcion=SEGMENT_DESCRIPTIONS[cluster]
-        )
+        with etapa("cache"):
+            key = seg_cache.key(X)
+            respuesta = seg_cache.get(key, seg["version"])
+        if respuesta is None:
+            with etapa("modelo"):
+                resultado = await seg["batcher"].submit(X)
+            with etapa("respuesta"):
+                respuesta = seg["respuestas"][int(resultado)]
+            if _modelos.get("segmentacion") is seg:
+                seg_cache.put(key, seg["version"], respuesta)
+        return RespuestaJSON(respuesta)
+    
+    except Exception as e:
+        raise HTTPException(500, f"Error: {str(e)}")
+
+
+@router.post("/segmento/batch", response_model=List[PrediccionSegmento])
+@medir_endpoint
+async def predecir_segmento_batch(clientes: List[ClienteSegmentacion]):
+    """
+    📊 Asigna segmento a una lista de clientes en una sola pasada del modelo.
+    
+    Las predicciones se devuelven en el mismo orden que los clientes.
+    """
+    seg = await _requerir_modelos("segmentacion", "Modelo de segmentación no disponible")
+    
+    if not clientes:
+        return RespuestaJSON(b"[]")
+    
+    try:
+        with etapa("codificacion"):
+            X = seg["encoder"].transform([cliente.model_dump() for cliente in clientes])
+        with etapa("modelo"):
+            resultados = await seg["batcher"].run(X)
+        with etapa("respuesta"):
+            return RespuestaJSON(lista(seg["respuestas"][cluster] for cluster in resultados.tolist()))
     
     except Exception as e:
         raise HTTPException(500, f"Error: {str(e)}")
 
 
 # Exportar estado para health check
+def is_warming() -> bool:
+    """True mientras corre el calentamiento inicial."""
+    return _calentando
+
+
 def get_models_status() -> dict:
+    """Por pipeline: True (cargado), False (error al cargar) o None (aún no se usa)."""
+    return {
+        pipeline: True if pipeline in _modelos else (False if pipeline in _errores else None)
+        for pipeline in PIPELINES
+    }
+
+
+def get_models_info() -> dict:
+    """Versión activa, recargas, último error e historial de versiones por pipeline."""
+    return registry.describe()
+
+
+def get_models_versions() -> dict:
+    """Versión (hash del contenido) de cada pipeline cargado."""
+    return {pipeline: modelos["version"] for pipeline, modelos in _modelos.items()}
+
+
+def get_cache_stats() -> dict:
+    """Contadores del cache de predicciones por pipeline."""
     return {
-        "clasificacion": CLASIFICACION_OK,
-        "segmentacion": SEGMENTACION_OK
+        "clasificacion": clf_cache.stats(),
+        "segmentacion": seg_cache.stats(),
     }
 
+
+def get_metrics_counters() -> dict:
+    """Contadores que viven fuera del registro de métricas (cache y encoders), para /metrics."""
+    desconocidas = {
+        (("pipeline", pipeline), ("column", col)): n
+        for pipeline, modelos in _modelos.items()
+        for col, n in modelos["encoder"].unknown.items()
+    }
+    desconocidas.update({
+        (("pipeline", "encode_categorical"), ("column", col)): n
+        for col, n in UNKNOWN_CATEGORIES.items()
+    })
+    
+    contadores = {
+        "unknown_categories_total": desconocidas,
+        "model_reloads_total": {(("pipeline", p),): n for p, n in registry.reloads.items()},
+    }
+    for pipeline, stats in get_cache_stats().items():
+        for key in ("hits", "misses", "evictions", "expirations", "invalidations"):
+            contadores.setdefault(f"cache_{key}_total", {})[(("pipeline", pipeline),)] = stats[key]
+    return contadores
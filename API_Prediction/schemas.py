@@ -119,13 +119,26 @@ class PrediccionSegmento(BaseModel):
     descripcion: str = Field(..., description="Descripción del perfil")
 
 
+# =============================================================================
+# ESQUEMA PARA PERFIL (clasificación + segmentación del mismo cliente)
+# =============================================================================
+
+class PerfilCliente(BaseModel):
+    """Respuesta de /predict/perfil: las dos predicciones del mismo cliente."""
+    clasificacion: PrediccionClasificacion
+    segmento: PrediccionSegmento
+
+
 # =============================================================================
 # ESQUEMA PARA HEALTH CHECK
 # =============================================================================
 
 class HealthResponse(BaseModel):
     """Respuesta del endpoint de salud."""
-    status: str
+    status: str = Field(..., description="ok, degraded o warming (cargando modelos)")
     modelos_cargados: dict
     version: str
+    versiones_modelos: dict = Field(default_factory=dict, description="Versión (hash) de cada modelo cargado")
+    cache: dict = Field(default_factory=dict, description="Contadores del cache de predicciones")
+    admision: dict = Field(default_factory=dict, description="En curso, en cola y rechazadas por endpoint")
 
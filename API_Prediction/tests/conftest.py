@@ -0,0 +1,9 @@
+"""
+Configuración de pytest para la API.
+Las pruebas importan los módulos como lo hace `main.py` (desde la carpeta API_Prediction).
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,219 @@
+"""
+Pruebas del control de admisión (`Limitador`) bajo asyncio: cola llena,
+deadline, vencimiento en la cola, prioridad de carriles y que ningún
+camino (cancelación, vencimiento) deje lugares ocupados.
+"""
+
+import asyncio
+import random
+import time
+
+import pytest
+
+from inference.admision import INTERACTIVO, MASIVO, Limitador, Rechazo
+
+
+def _limitador(en_curso: int = 1, cola: int = 4) -> Limitador:
+    return Limitador(en_curso, {INTERACTIVO: cola, MASIVO: cola})
+
+
+async def _ciclo() -> None:
+    """Deja correr a las tareas que ya pueden avanzar."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_entra_directo_mientras_hay_lugar():
+    async def escenario():
+        limitador = _limitador(en_curso=2)
+        await limitador.entrar(INTERACTIVO, None)
+        await limitador.entrar(INTERACTIVO, None)
+        assert limitador.en_curso == 2
+        limitador.salir(0.01)
+        limitador.salir(0.01)
+        assert limitador.en_curso == 0
+        assert limitador.atendidas == 2
+    
+    asyncio.run(escenario())
+
+
+def test_cola_llena_responde_429():
+    async def escenario():
+        limitador = _limitador(en_curso=1, cola=1)
+        await limitador.entrar(INTERACTIVO, None)
+        esperando = asyncio.ensure_future(limitador.entrar(INTERACTIVO, None))
+        await _ciclo()
+        
+        with pytest.raises(Rechazo) as rechazo:
+            await limitador.entrar(INTERACTIVO, None)
+        assert rechazo.value.status == 429 and rechazo.value.motivo == "cola_llena"
+        assert rechazo.value.respuesta().headers["Retry-After"] == str(rechazo.value.retry_after)
+        assert limitador.rechazadas["cola_llena"] == 1
+        
+        # La cola masiva es aparte: todavía tiene lugar
+        masiva = asyncio.ensure_future(limitador.entrar(MASIVO, None))
+        await _ciclo()
+        assert len(limitador.colas[MASIVO]) == 1
+        
+        limitador.salir(None)
+        await esperando
+        limitador.salir(None)
+        await masiva
+        limitador.salir(None)
+        assert limitador.en_curso == 0
+    
+    asyncio.run(escenario())
+
+
+def test_deadline_corto_responde_503_sin_hacer_fila():
+    async def escenario():
+        limitador = _limitador()
+        limitador.servicio = 1.0  # cada petición tarda 1 s
+        await limitador.entrar(INTERACTIVO, None)
+        
+        with pytest.raises(Rechazo) as rechazo:
+            await limitador.entrar(INTERACTIVO, time.monotonic() + 0.5)
+        assert rechazo.value.status == 503 and rechazo.value.motivo == "deadline"
+        assert not limitador.colas[INTERACTIVO]
+        assert 1 <= rechazo.value.retry_after
+        
+        limitador.salir(None)
+        assert limitador.en_curso == 0
+    
+    asyncio.run(escenario())
+
+
+def test_deadline_que_vence_en_la_cola_responde_503():
+    async def escenario():
+        limitador = _limitador()
+        limitador.servicio = 0.001
+        await limitador.entrar(INTERACTIVO, None)
+        
+        with pytest.raises(Rechazo) as rechazo:
+            await limitador.entrar(INTERACTIVO, time.monotonic() + 0.05)
+        assert rechazo.value.status == 503 and rechazo.value.motivo == "vencida"
+        assert not limitador.colas[INTERACTIVO]
+        assert limitador.en_curso == 1
+        
+        limitador.salir(None)
+        assert limitador.en_curso == 0
+    
+    asyncio.run(escenario())
+
+
+def test_lugar_liberado_pasa_a_la_siguiente_en_cola():
+    async def escenario():
+        limitador = _limitador()
+        await limitador.entrar(INTERACTIVO, None)
+        esperando = asyncio.ensure_future(limitador.entrar(INTERACTIVO, None))
+        await _ciclo()
+        assert not esperando.done()
+        
+        limitador.salir(0.02)
+        await _ciclo()
+        assert esperando.done() and esperando.exception() is None
+        # El lugar pasó tal cual: sigue habiendo una petición en curso
+        assert limitador.en_curso == 1
+        
+        limitador.salir(0.02)
+        assert limitador.en_curso == 0
+    
+    asyncio.run(escenario())
+
+
+def test_cancelada_despues_de_recibir_el_lugar_lo_devuelve():
+    async def escenario():
+        limitador = _limitador()
+        await limitador.entrar(INTERACTIVO, None)
+        esperando = asyncio.ensure_future(limitador.entrar(INTERACTIVO, None))
+        await _ciclo()
+        
+        # `salir` le pasa el lugar (set_result) y el cliente se desconecta antes de usarlo
+        limitador.salir(None)
+        assert not limitador.colas[INTERACTIVO] and limitador.en_curso == 1
+        esperando.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await esperando
+        
+        assert limitador.en_curso == 0
+    
+    asyncio.run(escenario())
+
+
+def test_cancelada_en_la_cola_no_ocupa_lugar():
+    async def escenario():
+        limitador = _limitador()
+        await limitador.entrar(INTERACTIVO, None)
+        esperando = asyncio.ensure_future(limitador.entrar(INTERACTIVO, None))
+        await _ciclo()
+        
+        esperando.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await esperando
+        assert not limitador.colas[INTERACTIVO]
+        
+        limitador.salir(None)
+        assert limitador.en_curso == 0
+    
+    asyncio.run(escenario())
+
+
+def test_interactiva_pasa_antes_que_masiva():
+    async def escenario():
+        limitador = _limitador()
+        await limitador.entrar(INTERACTIVO, None)
+        orden = []
+        
+        async def pedir(carril):
+            await limitador.entrar(carril, None)
+            orden.append(carril)
+        
+        masiva = asyncio.ensure_future(pedir(MASIVO))
+        await _ciclo()
+        interactiva = asyncio.ensure_future(pedir(INTERACTIVO))
+        await _ciclo()
+        
+        limitador.salir(None)
+        await _ciclo()
+        assert orden == [INTERACTIVO]
+        assert not masiva.done()
+        
+        limitador.salir(None)
+        await asyncio.gather(masiva, interactiva)
+        assert orden == [INTERACTIVO, MASIVO]
+        limitador.salir(None)
+        assert limitador.en_curso == 0
+    
+    asyncio.run(escenario())
+
+
+def test_sin_fugas_de_lugares_con_rechazos_y_cancelaciones():
+    """Muchas peticiones con deadlines y cancelaciones al azar: al final no queda nada ocupado."""
+    async def escenario():
+        rng = random.Random(0)
+        limitador = Limitador(3, {INTERACTIVO: 10, MASIVO: 5})
+        
+        async def peticion():
+            deadline = time.monotonic() + rng.uniform(0.001, 0.05) if rng.random() < 0.5 else None
+            try:
+                await limitador.entrar(rng.choice((INTERACTIVO, MASIVO)), deadline)
+            except Rechazo:
+                return
+            try:
+                await asyncio.sleep(rng.uniform(0, 0.005))
+            finally:
+                limitador.salir(0.003)
+        
+        tareas = []
+        for _ in range(300):
+            tareas.append(asyncio.ensure_future(peticion()))
+            if rng.random() < 0.2:
+                rng.choice(tareas).cancel()
+            await asyncio.sleep(0 if rng.random() < 0.7 else 0.001)
+        await asyncio.gather(*tareas, return_exceptions=True)
+        
+        assert limitador.en_curso == 0
+        assert not any(limitador.colas.values())
+        assert sum(limitador.rechazadas.values()) > 0
+    
+    asyncio.run(escenario())
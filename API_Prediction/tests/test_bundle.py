@@ -0,0 +1,71 @@
+"""
+Carga de `models/<pipeline>.bundle` y detección de .pkl que cambiaron después de exportarlo.
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import utils
+from inference.bundle import file_digest
+from inference.segmentacion import FusedSegmenter
+
+
+def _en_mmap(array: np.ndarray) -> bool:
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+def test_bundle_incluido_se_usa(capsys):
+    """El bundle del repo guarda tamaño y sha1 (sin mtime): recién clonado debe usarse igual."""
+    models = utils.load_pipeline("segmentacion")
+    
+    assert "⚠️" not in capsys.readouterr().out
+    assert "kmeans" not in models and "scaler" not in models
+    assert isinstance(models["engine"], FusedSegmenter)
+    assert _en_mmap(models["engine"].projection)
+    assert set(models["sources"]) == set(utils.PICKLES["segmentacion"].values())
+
+
+@pytest.fixture
+def pkl(tmp_path, monkeypatch):
+    """Copia de un .pkl en una carpeta de modelos temporal, con su huella de exportación."""
+    monkeypatch.setattr(utils, "MODELS_PATH", tmp_path)
+    path = tmp_path / "cluster_pca_banco.pkl"
+    shutil.copyfile(utils.Path(__file__).parent.parent / "models" / path.name, path)
+    return path, {path.name: file_digest(path)}
+
+
+def test_sin_cambios_no_es_anterior(pkl):
+    path, sources = pkl
+    assert utils.stale_sources(sources) == []
+
+
+def test_solo_cambia_la_fecha(pkl):
+    """Como tras un `git clone`: otra fecha, mismo contenido."""
+    path, sources = pkl
+    os.utime(path, ns=(0, 0))
+    assert utils.stale_sources(sources) == []
+    
+    del sources[path.name]["mtime_ns"]
+    assert utils.stale_sources(sources) == []
+
+
+def test_mismo_tamano_otro_contenido(pkl):
+    path, sources = pkl
+    data = bytearray(path.read_bytes())
+    data[-2] ^= 0xFF
+    path.write_bytes(bytes(data))
+    assert utils.stale_sources(sources) == [path.name]
+
+
+def test_otro_tamano(pkl):
+    path, sources = pkl
+    with open(path, "ab") as f:
+        f.write(b"\0")
+    assert utils.stale_sources(sources) == [path.name]
@@ -0,0 +1,99 @@
+"""
+Pruebas del cache de predicciones: LRU, TTL y versión del modelo.
+"""
+
+import numpy as np
+import pytest
+
+from inference import cache as cache_module
+from inference.cache import PredictionCache
+
+
+class _Reloj:
+    """`time.monotonic` controlado por la prueba."""
+    
+    def __init__(self):
+        self.ahora = 1000.0
+    
+    def __call__(self) -> float:
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = _Reloj()
+    monkeypatch.setattr(cache_module.time, "monotonic", reloj)
+    return reloj
+
+
+def _llave(*valores) -> bytes:
+    return PredictionCache.key(np.array([valores], dtype=np.float64))
+
+
+def test_llave_depende_solo_de_la_fila_codificada():
+    assert _llave(1, 2, 3) == _llave(1.0, 2.0, 3.0)
+    assert _llave(1, 2, 3) != _llave(3, 2, 1)
+
+
+def test_lru_saca_la_entrada_menos_usada(reloj):
+    cache = PredictionCache(max_size=2, ttl_seconds=60)
+    cache.put(_llave(1), "v1", "uno")
+    cache.put(_llave(2), "v1", "dos")
+    
+    # Consultar la 1 la vuelve la más reciente: al llenarse sale la 2
+    assert cache.get(_llave(1), "v1") == "uno"
+    cache.put(_llave(3), "v1", "tres")
+    
+    assert cache.get(_llave(2), "v1") is None
+    assert cache.get(_llave(1), "v1") == "uno"
+    assert cache.get(_llave(3), "v1") == "tres"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_ttl_vence_las_entradas(reloj):
+    cache = PredictionCache(max_size=10, ttl_seconds=5)
+    cache.put(_llave(1), "v1", "uno")
+    
+    reloj.ahora += 4.9
+    assert cache.get(_llave(1), "v1") == "uno"
+    # Un hit no renueva el TTL
+    reloj.ahora += 0.2
+    assert cache.get(_llave(1), "v1") is None
+    
+    stats = cache.stats()
+    assert stats["expirations"] == 1 and stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["size"] == 0
+
+
+def test_otra_version_del_modelo_no_regresa_respuestas_viejas(reloj):
+    cache = PredictionCache(max_size=10, ttl_seconds=60)
+    cache.put(_llave(1), "v1", "respuesta del modelo v1")
+    
+    # Tras una recarga en caliente la misma fila no debe salir del cache
+    assert cache.get(_llave(1), "v2") is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["version"] == "v2"
+    
+    # Y al volver a la versión anterior tampoco: el cache se vació
+    assert cache.get(_llave(1), "v1") is None
+    cache.put(_llave(1), "v1", "nueva")
+    assert cache.get(_llave(1), "v1") == "nueva"
+
+
+def test_put_de_otra_version_vacia_el_cache(reloj):
+    cache = PredictionCache(max_size=10, ttl_seconds=60)
+    cache.put(_llave(1), "v1", "uno")
+    cache.put(_llave(2), "v2", "dos")
+    
+    assert cache.get(_llave(1), "v2") is None
+    assert cache.get(_llave(2), "v2") == "dos"
+
+
+def test_max_size_cero_desactiva_el_cache(reloj):
+    cache = PredictionCache(max_size=0, ttl_seconds=60)
+    cache.put(_llave(1), "v1", "uno")
+    
+    assert not cache.enabled
+    assert cache.get(_llave(1), "v1") is None
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,100 @@
+"""
+Paridad del bosque compilado contra sklearn (RandomForestClassifier, con y sin MinMaxScaler).
+"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import MinMaxScaler
+
+from inference.forest import CompiledForest
+
+
+def _datos(n: int = 600, features: int = 5, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, features)) * [1, 10, 100, 0.01, 1000][:features]
+    y = (X[:, 0] + X[:, 1] / 10 + rng.normal(scale=0.5, size=n) > 0).astype(int)
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def entrenado():
+    X, y = _datos()
+    scaler = MinMaxScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0)
+    model.fit(scaler.transform(X), y)
+    return X, scaler, model
+
+
+def _comparar(forest: CompiledForest, model, X: np.ndarray, X_model: np.ndarray) -> None:
+    predicciones, probas = forest.predict_with_proba(X)
+    np.testing.assert_allclose(probas, model.predict_proba(X_model), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(predicciones, model.predict(X_model))
+    np.testing.assert_allclose(forest.predict_proba(X), probas, rtol=0, atol=0)
+
+
+def _filas_en_umbrales(model, base: np.ndarray) -> np.ndarray:
+    """
+    Una fila por umbral y variante: el umbral float64 de sklearn, su redondeo
+    a float32 y el float32 inmediato de cada lado. sklearn compara
+    `float32(x) <= umbral`, así que ahí es donde una traducción a float32 falla.
+    """
+    filas = []
+    for i, estimator in enumerate(model.estimators_):
+        tree = estimator.tree_
+        for node in np.flatnonzero(tree.children_left != -1):
+            t = tree.threshold[node]
+            t32 = np.float32(t)
+            for valor in (t, t32, np.nextafter(t32, np.float32(-np.inf)), np.nextafter(t32, np.float32(np.inf))):
+                fila = base[(i + node) % len(base)].copy()
+                fila[tree.feature[node]] = valor
+                filas.append(fila)
+    return np.array(filas, dtype=np.float64)
+
+
+def test_paridad_con_scaler(entrenado):
+    X, scaler, model = entrenado
+    forest = CompiledForest.from_sklearn(model, scaler=scaler)
+    _comparar(forest, model, X, scaler.transform(X))
+
+
+def test_umbrales_exactos(entrenado):
+    X, scaler, model = entrenado
+    forest = CompiledForest.from_sklearn(model)
+    filas = _filas_en_umbrales(model, scaler.transform(X[:50]))
+    
+    # Al menos un umbral no es representable en float32: es el caso que importa
+    thresholds = np.concatenate([e.tree_.threshold[e.tree_.children_left != -1] for e in model.estimators_])
+    assert np.any(thresholds.astype(np.float32).astype(np.float64) != thresholds)
+    _comparar(forest, model, filas, filas)
+
+
+def test_valores_fuera_del_rango_del_scaler(entrenado):
+    X, scaler, model = entrenado
+    forest = CompiledForest.from_sklearn(model, scaler=scaler)
+    rng = np.random.default_rng(1)
+    
+    # Hasta 3 veces el rango de entrenamiento hacia cada lado: escalados quedan fuera de [0, 1]
+    X_fuera = scaler.data_min_ + (rng.random((2000, X.shape[1])) * 7 - 3) * scaler.data_range_
+    escalado = scaler.transform(X_fuera)
+    assert escalado.min() < 0 and escalado.max() > 1
+    _comparar(forest, model, X_fuera, escalado)
+    
+    # Los umbrales mismos, llevados al espacio original, también van por el scaler exportado
+    filas = scaler.inverse_transform(_filas_en_umbrales(model, scaler.transform(X[:50])))
+    _comparar(forest, model, filas, scaler.transform(filas))
+
+
+def test_scaler_con_clip(entrenado):
+    X, _, model = entrenado
+    scaler = MinMaxScaler(clip=True).fit(X)
+    forest = CompiledForest.from_sklearn(model, scaler=scaler)
+    X_fuera = X * 5
+    _comparar(forest, model, X_fuera, scaler.transform(X_fuera))
+
+
+def test_roundtrip_por_arreglos(entrenado):
+    X, scaler, model = entrenado
+    forest = CompiledForest.from_sklearn(model, scaler=scaler)
+    copia = CompiledForest.from_arrays(*forest.to_arrays())
+    np.testing.assert_array_equal(copia.score(X), forest.score(X))
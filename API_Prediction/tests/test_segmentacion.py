@@ -0,0 +1,111 @@
+"""
+Paridad del motor de segmentación fusionado contra el pipeline de sklearn
+(StandardScaler → PCA → K-Means) de los .pkl incluidos en `models/`.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils
+from inference.segmentacion import FusedSegmenter
+
+
+@pytest.fixture(scope="module")
+def modelos():
+    return {
+        "kmeans": utils.load_pickle("cluster_kmeans_pca_banco.pkl"),
+        "pca": utils.load_pickle("cluster_pca_banco.pkl"),
+        "scaler": utils.load_pickle("cluster_scaler_segmentacion.pkl"),
+        "encoders": utils.load_pickle("cluster_encoders_segmentacion.pkl"),
+        "features": utils.load_pickle("cluster_features_segmentacion.pkl"),
+    }
+
+
+@pytest.fixture(scope="module")
+def motor(modelos):
+    return FusedSegmenter.from_sklearn(modelos["scaler"], modelos["pca"], modelos["kmeans"])
+
+
+def _escalar(modelos, X: np.ndarray) -> np.ndarray:
+    """El scaler se entrenó con un DataFrame: se le pasa uno con las mismas columnas."""
+    scaler = modelos["scaler"]
+    return scaler.transform(pd.DataFrame(X, columns=scaler.feature_names_in_))
+
+
+def _sklearn(modelos, X: np.ndarray) -> np.ndarray:
+    return modelos["kmeans"].predict(modelos["pca"].transform(_escalar(modelos, X)))
+
+
+def _distancias(modelos, X: np.ndarray) -> np.ndarray:
+    """Distancia (en el espacio PCA de sklearn) de cada fila a cada centroide."""
+    Y = modelos["pca"].transform(_escalar(modelos, X))
+    return np.linalg.norm(Y[:, None, :] - modelos["kmeans"].cluster_centers_[None, :, :], axis=2)
+
+
+def _clientes(encoder, n: int, seed: int = 0) -> list:
+    """Clientes aleatorios; ~10% de los valores categóricos no existen en el entrenamiento."""
+    rng = np.random.default_rng(seed)
+    clientes = []
+    for _ in range(n):
+        cliente = {}
+        for name in encoder.features:
+            if name in encoder.categories:
+                opciones = encoder.categories[name]
+                cliente[name] = "desconocido" if rng.random() < 0.1 else opciones[rng.integers(len(opciones))]
+            else:
+                cliente[name] = int(rng.integers(-5000, 100000) if name == "balance" else rng.integers(0, 1000))
+        clientes.append(cliente)
+    return clientes
+
+
+def test_paridad_filas_de_entrenamiento(modelos, motor):
+    X = motor.sample_training_like(modelos["scaler"], n=20000, seed=1)
+    np.testing.assert_array_equal(motor.predict(X), _sklearn(modelos, X))
+
+
+def test_paridad_clientes_con_categorias_desconocidas(modelos, motor):
+    encoder = utils.FeatureEncoder.from_label_encoders(modelos["encoders"], modelos["features"])
+    clientes = _clientes(encoder, 5000)
+    X = encoder.transform(clientes)
+    
+    assert any(cliente[name] == "desconocido" for cliente in clientes for name in encoder.categories)
+    # Mismo resultado que la codificación con pandas de los notebooks
+    np.testing.assert_array_equal(
+        X, utils.encode_categorical(clientes, modelos["encoders"], modelos["features"]).to_numpy(dtype=np.float64)
+    )
+    np.testing.assert_array_equal(motor.predict(X), _sklearn(modelos, X))
+
+
+def test_filas_equidistantes_a_dos_centroides(modelos, motor):
+    """
+    En el punto medio entre dos centroides el empate se decide por redondeo,
+    distinto en cada implementación: ambas deben elegir uno de los dos
+    centroides empatados, y fuera del empate deben coincidir.
+    """
+    centroides = modelos["kmeans"].cluster_centers_
+    pares = [(a, b) for a in range(len(centroides)) for b in range(a + 1, len(centroides))]
+    
+    # Filas cuya proyección PCA es el punto medio de cada par (mínimos cuadrados sobre la proyección afín)
+    medios = np.array([(centroides[a] + centroides[b]) / 2 for a, b in pares])
+    X = np.linalg.lstsq(motor.projection.T, (medios - motor.offset).T, rcond=None)[0].T
+    np.testing.assert_allclose(motor.transform(X), medios, atol=1e-6)
+    
+    distancias = _distancias(modelos, X)
+    empates = 0
+    for fila, (a, b) in enumerate(pares):
+        # El punto medio puede quedar más cerca de un tercer centroide
+        if np.isclose(distancias[fila, a], distancias[fila].min(), rtol=1e-9):
+            empates += 1
+            assert motor.predict(X[fila:fila + 1])[0] in (a, b)
+            assert _sklearn(modelos, X[fila:fila + 1])[0] in (a, b)
+    assert empates > 0
+    
+    # Un paso pequeño hacia cada centroide rompe el empate: ambos deben coincidir
+    for paso in (1e-3, -1e-3):
+        objetivo = np.array([
+            medios[i] + paso * (centroides[b] - centroides[a]) for i, (a, b) in enumerate(pares)
+        ])
+        X_cerca = np.linalg.lstsq(motor.projection.T, (objetivo - motor.offset).T, rcond=None)[0].T
+        np.testing.assert_array_equal(motor.predict(X_cerca), _sklearn(modelos, X_cerca))
+
@@ -3,18 +3,58 @@ Utilidades para la API de Predicción.
 Carga de modelos y funciones de preprocesamiento.
 """
 
+import os
 import pickle
 import warnings
 from pathlib import Path
-from typing import Any, Dict
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, List, Union
 
-import pandas as pd
+import numpy as np
+
+from inference.bundle import BUNDLE_SUFFIX, build_manifest, file_digest, file_stat, load_bundle
+from inference.encoder import FeatureEncoder
+from inference.forest import CompiledForest
+from inference.segmentacion import FusedSegmenter
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Suprimir warnings de versión de sklearn
 warnings.filterwarnings("ignore", category=UserWarning)
 
-# Ruta a los modelos
-MODELS_PATH = Path(__file__).parent / "models"
+# Ruta a los modelos (MODELS_PATH permite apuntar a otra carpeta, p. ej. los benchmarks)
+MODELS_PATH = Path(os.getenv("MODELS_PATH", Path(__file__).parent / "models"))
+
+# Pipelines que sirve la API
+PIPELINES = ("clasificacion", "segmentacion")
+
+# Archivos .pkl de cada pipeline (los que generan los notebooks)
+PICKLES = {
+    "clasificacion": {
+        "modelo": "clasificacion_modelo_banco.pkl",
+        "scaler": "clasificacion_scaler_banco.pkl",
+        "encoders": "clasificacion_encoders_banco.pkl",
+        "features": "clasificacion_features_banco.pkl",
+    },
+    "segmentacion": {
+        "kmeans": "cluster_kmeans_pca_banco.pkl",
+        "pca": "cluster_pca_banco.pkl",
+        "scaler": "cluster_scaler_segmentacion.pkl",
+        "encoders": "cluster_encoders_segmentacion.pkl",
+        "features": "cluster_features_segmentacion.pkl",
+        "names": "cluster_names.pkl",
+    },
+}
+
+# Fracción mínima de coincidencias entre el motor fusionado y sklearn
+MIN_PARITY = 0.999
+
+# Diferencia máxima de probabilidad entre el bosque compilado y sklearn
+MAX_PROBA_DIFF = 1e-9
+
+# Valores desconocidos que `encode_categorical` codificó como 0, por columna
+UNKNOWN_CATEGORIES: Counter = Counter()
 
 # Descripciones de los segmentos
 SEGMENT_DESCRIPTIONS = {
@@ -40,53 +80,174 @@ def load_pickle(filename: str) -> Any:
 
 def load_clasificacion_models() -> Dict[str, Any]:
     """Carga todos los modelos necesarios para clasificación."""
-    return {
-        "modelo": load_pickle("clasificacion_modelo_banco.pkl"),
-        "scaler": load_pickle("clasificacion_scaler_banco.pkl"),
-        "encoders": load_pickle("clasificacion_encoders_banco.pkl"),
-        "features": load_pickle("clasificacion_features_banco.pkl"),
+    models = {
+        key: load_pickle(filename)
+        for key, filename in PICKLES["clasificacion"].items()
     }
+    models["encoder"] = FeatureEncoder.from_label_encoders(
+        models["encoders"], models["features"]
+    )
+    
+    # Scaler + Random Forest compilados; se valida contra sklearn antes de usarlo
+    engine = CompiledForest.from_sklearn(models["modelo"], scaler=models["scaler"])
+    X_check = engine.sample_training_like(models["scaler"])
+    diff = engine.parity(models["modelo"], X_check, scaler=models["scaler"])
+    if diff > MAX_PROBA_DIFF:
+        raise ValueError(f"El bosque compilado no coincide con sklearn (diferencia {diff:.2e})")
+    models["engine"] = engine
+    return models
 
 
 def load_segmentacion_models() -> Dict[str, Any]:
     """Carga todos los modelos necesarios para segmentación."""
-    return {
-        "kmeans": load_pickle("cluster_kmeans_pca_banco.pkl"),
-        "pca": load_pickle("cluster_pca_banco.pkl"),
-        "scaler": load_pickle("cluster_scaler_segmentacion.pkl"),
-        "encoders": load_pickle("cluster_encoders_segmentacion.pkl"),
-        "features": load_pickle("cluster_features_segmentacion.pkl"),
-        "names": load_pickle("cluster_names.pkl"),
+    models = {
+        key: load_pickle(filename)
+        for key, filename in PICKLES["segmentacion"].items()
     }
+    models["encoder"] = FeatureEncoder.from_label_encoders(
+        models["encoders"], models["features"]
+    )
+    
+    # Scaler → PCA → K-Means fusionados; se valida contra sklearn antes de usarlo
+    engine = FusedSegmenter.from_sklearn(models["scaler"], models["pca"], models["kmeans"])
+    parity = engine.parity(models["scaler"], models["pca"], models["kmeans"])
+    if parity < MIN_PARITY:
+        raise ValueError(f"El motor de segmentación no coincide con sklearn (paridad {parity:.4f})")
+    models["engine"] = engine
+    return models
+
+
+def load_pipeline_from_pickles(pipeline: str) -> Dict[str, Any]:
+    """Carga un pipeline desde sus .pkl y calcula su versión (hash de los arreglos del motor)."""
+    loaders = {
+        "clasificacion": load_clasificacion_models,
+        "segmentacion": load_segmentacion_models,
+    }
+    models = loaders[pipeline]()
+    _, manifest = build_manifest(
+        pipeline, models["encoder"], models["engine"], models.get("names")
+    )
+    models["version"] = manifest["version"]
+    models["sources"] = {
+        filename: file_stat(MODELS_PATH / filename)
+        for filename in PICKLES[pipeline].values()
+    }
+    return models
+
+
+def stale_sources(sources: Dict[str, dict]) -> List[str]:
+    """
+    Archivos .pkl que cambiaron desde que se exportó el bundle.
+    
+    Decide por contenido: otro tamaño basta; con el mismo tamaño se compara
+    el sha1. El mtime solo es un atajo (tamaño y mtime iguales → no se lee
+    el archivo): git no guarda fechas, así que tras un clone o un deploy
+    cada .pkl se hashea al cargar.
+    """
+    stale = []
+    for filename, digest in sources.items():
+        path = MODELS_PATH / filename
+        if not path.exists():
+            continue
+        stat = file_stat(path)
+        if digest.get("size") != stat["size"]:
+            stale.append(filename)
+        elif digest.get("mtime_ns") != stat["mtime_ns"] and digest.get("sha1") != file_digest(path)["sha1"]:
+            stale.append(filename)
+    return stale
+
+
+def pipeline_signature(pipeline: str) -> tuple:
+    """
+    Firma barata de los archivos de un pipeline (nombre, tamaño, mtime).
+    Cambia cuando se reescribe algún .pkl o el bundle; no lee el contenido.
+    """
+    paths = [MODELS_PATH / filename for filename in PICKLES[pipeline].values()]
+    paths.append(MODELS_PATH / f"{pipeline}{BUNDLE_SUFFIX}" / "manifest.json")
+    firma = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            firma.append((path.name, stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            firma.append((path.name, None, None))
+    return tuple(firma)
+
+
+def load_pipeline(pipeline: str) -> Dict[str, Any]:
+    """
+    Carga un pipeline para servir predicciones.
+    
+    Usa `models/<pipeline>.bundle` si existe (NumPy/JSON, con mmap, sin pickle
+    ni sklearn). Si no existe, o si los .pkl cambiaron después de exportarlo,
+    carga los .pkl.
+    """
+    bundle = MODELS_PATH / f"{pipeline}{BUNDLE_SUFFIX}"
+    if (bundle / "manifest.json").exists():
+        models = load_bundle(bundle)
+        stale = stale_sources(models.get("sources", {}))
+        if not stale:
+            return models
+        print(f"⚠️ {bundle.name} es anterior a {', '.join(stale)}; usando los .pkl")
+    return load_pipeline_from_pickles(pipeline)
 
 
 # =============================================================================
 # PREPROCESAMIENTO
 # =============================================================================
 
-def encode_categorical(data: dict, encoders: dict, features: list) -> pd.DataFrame:
+def encode_categorical(
+    data: Union[dict, List[dict]], encoders: dict, features: list
+) -> "pd.DataFrame":
     """
-    Convierte un diccionario a DataFrame y aplica Label Encoding.
+    Convierte uno o varios clientes a DataFrame y aplica Label Encoding.
+    
+    La codificación es vectorizada por columna: todas las filas de una
+    columna se codifican en una sola operación, así que un lote de N
+    clientes cuesta casi lo mismo que uno solo.
+    
+    Los endpoints usan `FeatureEncoder` (ver `load_*_models`), que produce
+    el mismo resultado sin construir un DataFrame.
     
     Args:
-        data: Diccionario con los datos del cliente
+        data: Diccionario con los datos del cliente, o lista de diccionarios
         encoders: Diccionario de LabelEncoders entrenados
         features: Lista de features en el orden correcto
     
     Returns:
-        DataFrame listo para predecir
+        DataFrame listo para predecir (una fila por cliente)
     """
-    df = pd.DataFrame([data])
+    import pandas as pd  # diferido: los endpoints no lo usan y tarda en importarse
+    
+    records = [data] if isinstance(data, dict) else data
+    df = pd.DataFrame.from_records(records)
     
     for col, encoder in encoders.items():
         if col in df.columns:
-            try:
-                if df[col].iloc[0] in encoder.classes_:
-                    df[col] = encoder.transform(df[col])
-                else:
-                    df[col] = 0  # Valor desconocido
-            except Exception:
-                df[col] = 0
+            # classes_ está ordenado, igual que en LabelEncoder.transform
+            codes = pd.Categorical(df[col], categories=encoder.classes_).codes
+            unknown = codes < 0
+            if unknown.any():
+                UNKNOWN_CATEGORIES[col] += int(unknown.sum())
+            df[col] = np.where(unknown, 0, codes).astype(np.int64)  # Desconocido → 0
     
     return df[features]
 
+
+def encode_frame(df: "pd.DataFrame", encoder: FeatureEncoder) -> np.ndarray:
+    """
+    Codifica un DataFrame (p. ej. un bloque de `bank.csv`) con un `FeatureEncoder`.
+    
+    Cada columna de texto se factoriza una vez y se traduce por categoría, no
+    por fila; las desconocidas y los nulos quedan en 0 como en los endpoints.
+    """
+    import pandas as pd
+    
+    columns, categories = {}, {}
+    for name in encoder.features:
+        if name in encoder.categories:
+            columns[name], uniques = pd.factorize(df[name])
+            categories[name] = [str(c) for c in uniques]
+        else:
+            columns[name] = df[name].to_numpy()
+    return encoder.transform_columns(columns, categories)
@@ -3,14 +3,59 @@ Frontend con Gradio para la API de Predicción Bancaria.
 Conecta con el backend de FastAPI para hacer predicciones.
 """
 
+import asyncio
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
 import gradio as gr
-import requests
+import httpx
+import pandas as pd
+
+# =============================================================================
+# CLIENTE HTTP (compartido por todas las sesiones)
+# =============================================================================
+
+# Tiempo máximo por petición y tamaño del pool de conexiones al backend
+API_TIMEOUT_S = float(os.getenv("API_TIMEOUT_S", "30"))
+API_MAX_CONNECTIONS = int(os.getenv("API_MAX_CONNECTIONS", "32"))
+
+# Calificar archivo: clientes por petición y peticiones simultáneas
+SCORE_BATCH_SIZE = int(os.getenv("SCORE_BATCH_SIZE", "500"))
+SCORE_CONCURRENCY = int(os.getenv("SCORE_CONCURRENCY", "4"))
+# Reintentos de un lote rechazado por saturación (429/503), esperando su Retry-After
+SCORE_RETRIES = int(os.getenv("SCORE_RETRIES", "3"))
+
+_cliente: Optional[httpx.AsyncClient] = None
+
+
+def cliente() -> httpx.AsyncClient:
+    """
+    Cliente async con keep-alive. Se crea al primer uso, dentro del event loop
+    de Gradio, y lo comparten todas las sesiones: las conexiones al backend se
+    reutilizan en lugar de abrir una nueva en cada clic.
+    """
+    global _cliente
+    if _cliente is None:
+        _cliente = httpx.AsyncClient(
+            timeout=API_TIMEOUT_S,
+            # Con la API saturada, responde 503 de inmediato en lugar de dejarnos esperar
+            headers={"X-Deadline-Ms": str(int(API_TIMEOUT_S * 1000))},
+            limits=httpx.Limits(
+                max_connections=API_MAX_CONNECTIONS,
+                max_keepalive_connections=API_MAX_CONNECTIONS,
+                keepalive_expiry=60,
+            ),
+        )
+    return _cliente
+
 
 # =============================================================================
 # FUNCIONES DE PREDICCIÓN
 # =============================================================================
 
-def predecir_clasificacion(
+async def predecir_clasificacion(
     api_url, age, job, marital, education, default, balance,
     housing, loan, day, month, duration, campaign, pdays, previous
 ):
@@ -33,7 +78,7 @@ def predecir_clasificacion(
             "pdays": int(pdays),
             "previous": int(previous)
         }
-        response = requests.post(url, json=payload, timeout=10)
+        response = await cliente().post(url, json=payload)
         
         if response.status_code == 200:
             data = response.json()
@@ -49,7 +94,7 @@ def predecir_clasificacion(
         return f"❌ Error de conexión: {str(e)}"
 
 
-def predecir_segmento(
+async def predecir_segmento(
     api_url, age, job, marital, education, default, balance,
     housing, loan, duration, campaign, pdays, previous
 ):
@@ -70,7 +115,7 @@ def predecir_segmento(
             "pdays": int(pdays),
             "previous": int(previous)
         }
-        response = requests.post(url, json=payload, timeout=10)
+        response = await cliente().post(url, json=payload)
         
         if response.status_code == 200:
             data = response.json()
@@ -89,6 +134,142 @@ def predecir_segmento(
         return f"❌ Error de conexión: {str(e)}"
 
 
+# =============================================================================
+# CALIFICAR ARCHIVO
+# =============================================================================
+
+# Columnas que usa cada endpoint (las demás del archivo se conservan en la salida)
+CAMPOS = {
+    "clasificacion": ["age", "job", "marital", "education", "default", "balance", "housing",
+                      "loan", "day", "month", "duration", "campaign", "pdays", "previous"],
+    "segmento": ["age", "job", "marital", "education", "default", "balance", "housing",
+                 "loan", "duration", "campaign", "pdays", "previous"],
+}
+
+
+def leer_archivo(ruta: str) -> pd.DataFrame:
+    """Lee un CSV separado por `;` (como bank.csv) o por `,`."""
+    with open(ruta, encoding="utf-8") as f:
+        encabezado = f.readline()
+    sep = ";" if encabezado.count(";") >= encabezado.count(",") else ","
+    return pd.read_csv(ruta, sep=sep)
+
+
+def _errores_por_fila(response: httpx.Response) -> Dict[int, str]:
+    """
+    Filas inválidas de un 422 de FastAPI (`loc` = ["body", fila, campo]).
+    
+    Un `json_invalid` no es de una fila: su `loc` trae la posición del
+    carácter en el cuerpo, así que se trata como error de todo el lote.
+    """
+    errores = {}
+    for detalle in response.json().get("detail", []):
+        if detalle.get("type") == "json_invalid":
+            return {}
+        loc = detalle.get("loc", [])
+        if len(loc) >= 2 and loc[0] == "body" and isinstance(loc[1], int):
+            campo = f"{loc[2]}: " if len(loc) > 2 else ""
+            errores.setdefault(loc[1], f"{campo}{detalle.get('msg', '')}")
+    return errores
+
+
+async def _calificar_lote(url: str, lote: List[dict], semaforo: asyncio.Semaphore) -> List[dict]:
+    for intento in range(SCORE_RETRIES + 1):
+        async with semaforo:
+            response = await cliente().post(url, json=lote)
+        if response.status_code not in (429, 503) or intento == SCORE_RETRIES:
+            break
+        try:
+            espera = float(response.headers.get("Retry-After", "1"))
+        except ValueError:
+            espera = 1.0
+        await asyncio.sleep(min(espera, 10.0))
+    if response.status_code == 200:
+        return response.json()
+    
+    # Un cliente inválido rechaza todo el lote: se marcan esas filas y se reintenta el resto
+    errores = _errores_por_fila(response) if response.status_code == 422 else {}
+    if errores and len(errores) < len(lote):
+        validos = [i for i in range(len(lote)) if i not in errores]
+        predicciones = iter(await _calificar_lote(url, [lote[i] for i in validos], semaforo))
+        return [{"error": errores[i]} if i in errores else next(predicciones) for i in range(len(lote))]
+    
+    error = f"Error {response.status_code}: {response.text[:200]}"
+    return [{"error": error}] * len(lote)
+
+
+async def calificar_archivo(api_url, archivo, pipeline, lote, concurrencia, progress=gr.Progress()):
+    """
+    Califica un CSV completo con `/predict/<pipeline>/batch`: lo parte en
+    lotes y manda hasta `concurrencia` a la vez por el pool de conexiones.
+    Regresa el CSV con las predicciones agregadas y un resumen.
+    """
+    if archivo is None:
+        return None, "❌ Sube un archivo CSV"
+    try:
+        df = leer_archivo(archivo if isinstance(archivo, str) else archivo.name)
+    except Exception as e:
+        return None, f"❌ No se pudo leer el archivo: {str(e)}"
+    
+    faltantes = [c for c in CAMPOS[pipeline] if c not in df.columns]
+    if faltantes:
+        return None, f"❌ Faltan columnas: {', '.join(faltantes)}"
+    
+    url = f"{api_url.rstrip('/')}/predict/{pipeline}/batch"
+    # NaN no es JSON válido: las filas con campos vacíos se marcan aquí y no se envían
+    vacias = df[CAMPOS[pipeline]].isna().to_numpy()
+    incompletas = {
+        int(fila): "Faltan valores: " + ", ".join(c for c, vacia in zip(CAMPOS[pipeline], vacias[fila]) if vacia)
+        for fila in vacias.any(axis=1).nonzero()[0]
+    }
+    registros = df[CAMPOS[pipeline]].iloc[(~vacias.any(axis=1)).nonzero()[0]].to_dict("records")
+    lote, concurrencia = max(int(lote), 1), max(int(concurrencia), 1)
+    lotes = [registros[i:i + lote] for i in range(0, len(registros), lote)]
+    
+    semaforo = asyncio.Semaphore(concurrencia)
+    inicio = time.perf_counter()
+    
+    async def calificar(i: int, datos: List[dict]):
+        try:
+            return i, await _calificar_lote(url, datos, semaforo)
+        except httpx.HTTPError as e:
+            return i, [{"error": f"Error de conexión: {str(e)}"}] * len(datos)
+    
+    resultados: List[Optional[List[dict]]] = [None] * len(lotes)
+    tareas = [asyncio.ensure_future(calificar(i, datos)) for i, datos in enumerate(lotes)]
+    try:
+        progress(0, desc="Calificando...")
+        for terminados, tarea in enumerate(asyncio.as_completed(tareas), start=1):
+            i, salida = await tarea
+            resultados[i] = salida
+            progress(terminados / len(lotes), desc=f"Lote {terminados} de {len(lotes)}")
+    finally:
+        for tarea in tareas:
+            tarea.cancel()
+    segundos = time.perf_counter() - inicio
+    
+    calificadas = iter([fila for salida in resultados for fila in salida])
+    predicciones = pd.DataFrame(
+        [{"error": incompletas[fila]} if fila in incompletas else next(calificadas) for fila in range(len(df))],
+        index=df.index,
+    )
+    if "error" in predicciones:
+        predicciones = predicciones[[c for c in predicciones.columns if c != "error"] + ["error"]]
+    salida = pd.concat([df, predicciones], axis=1)
+    ruta = os.path.join(tempfile.mkdtemp(), f"predicciones_{pipeline}.csv")
+    salida.to_csv(ruta, sep=";", index=False)
+    
+    errores = int(predicciones["error"].notna().sum()) if "error" in predicciones else 0
+    resumen = f"""
+✅ **{len(df):,} clientes** calificados en {segundos:.1f} s ({len(df) / max(segundos, 1e-9):,.0f} clientes/s)
+
+📦 {len(lotes)} lotes de hasta {lote} · {concurrencia} a la vez
+"""
+    if errores:
+        resumen += f"\n⚠️ **Filas con error: {errores:,}** (columna `error` del archivo)"
+    return ruta, resumen
+
+
 # =============================================================================
 # OPCIONES DE DROPDOWNS
 # =============================================================================
@@ -206,6 +387,36 @@ with gr.Blocks(title="🏦 Predicción Bancaria", theme=gr.themes.Soft()) as app
                         seg_duration, seg_campaign, seg_pdays, seg_previous],
                 outputs=seg_output
             )
+        
+        # =================================================================
+        # TAB 3: CALIFICAR ARCHIVO
+        # =================================================================
+        with gr.Tab("📁 Calificar archivo"):
+            gr.Markdown("### Califica un CSV completo (p. ej. `bank.csv`)")
+            
+            with gr.Row():
+                with gr.Column():
+                    file_input = gr.File(label="Archivo CSV (`;` o `,`)", file_types=[".csv"])
+                    file_pipeline = gr.Radio(
+                        label="Modelo",
+                        choices=[("🎯 Clasificación", "clasificacion"), ("📊 Segmentación", "segmento")],
+                        value="clasificacion",
+                    )
+                    file_batch = gr.Number(label="Clientes por petición", value=SCORE_BATCH_SIZE, minimum=1)
+                    file_concurrency = gr.Slider(
+                        label="Peticiones simultáneas", minimum=1, maximum=16, step=1, value=SCORE_CONCURRENCY
+                    )
+                    file_btn = gr.Button("🚀 Calificar", variant="primary")
+                
+                with gr.Column():
+                    file_summary = gr.Markdown()
+                    file_output = gr.File(label="Predicciones")
+            
+            file_btn.click(
+                calificar_archivo,
+                inputs=[api_url, file_input, file_pipeline, file_batch, file_concurrency],
+                outputs=[file_output, file_summary]
+            )
     
     gr.Markdown("""
     ---
@@ -222,5 +433,6 @@ with gr.Blocks(title="🏦 Predicción Bancaria", theme=gr.themes.Soft()) as app
 # =============================================================================
 
 if __name__ == "__main__":
-    app.launch()
+    # Varias sesiones a la vez: los handlers son async y comparten el cliente
+    app.queue(default_concurrency_limit=API_MAX_CONNECTIONS).launch()
 
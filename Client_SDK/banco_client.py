@@ -0,0 +1,337 @@
+"""
+Cliente de Python para la API de Predicción Bancaria.
+
+    from banco_client import BancoClient
+
+    with BancoClient("http://localhost:8000") as api:
+        api.clasificar(cliente)                 # un cliente → dict
+        api.clasificar_lote(clientes)           # miles de clientes → lista de dicts
+        api.perfil(cliente)                     # clasificación + segmento en una llamada
+
+    async with AsyncBancoClient("http://localhost:8000") as api:
+        await api.segmentar_lote(clientes)
+
+- Una sesión HTTP persistente con pool de conexiones (keep-alive).
+- Las listas grandes se parten en lotes para `/predict/*/batch` y se mandan
+  varios a la vez (`concurrencia`); el resultado conserva el orden.
+- Las respuestas 503 (modelo no disponible o cargando) y 429 se reintentan
+  con backoff exponencial, respetando `Retry-After` si viene.
+- Cada petición lleva el timeout como `X-Deadline-Ms`: si la API está
+  saturada y no alcanzaría a responder a tiempo, rechaza de inmediato.
+
+Modo benchmark contra un servidor local:
+
+    python banco_client.py benchmark --url http://localhost:8000 --clientes 5000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+
+# Códigos que se reintentan: 503 = modelo no disponible / cargando, 429 = saturado
+RETRY_STATUS = (429, 503)
+
+ENDPOINTS = {
+    "clasificacion": "/predict/clasificacion",
+    "segmentacion": "/predict/segmento",
+    "perfil": "/predict/perfil",
+}
+
+
+class APIError(Exception):
+    """Respuesta de error de la API (después de los reintentos)."""
+    
+    def __init__(self, status_code: int, detail: Any):
+        self.status_code = status_code
+        self.detail = detail
+        super().__init__(f"Error {status_code}: {detail}")
+
+
+class _BaseClient:
+    """Configuración y lógica compartida por las versiones sync y async."""
+    
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        timeout: float = 30.0,
+        max_connections: int = 16,
+        batch_size: int = 500,
+        concurrencia: int = 4,
+        reintentos: int = 5,
+        backoff: float = 0.25,
+        max_backoff: float = 10.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60,
+        )
+        self.batch_size = batch_size
+        self.concurrencia = concurrencia
+        self.reintentos = reintentos
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # El servidor rechaza (503) lo que no alcanzaría a responder antes de este deadline
+        self.headers = {"X-Deadline-Ms": str(int(timeout * 1000))}
+    
+    def _lotes(self, clientes: Iterable[dict]) -> List[List[dict]]:
+        clientes = list(clientes)
+        return [clientes[i:i + self.batch_size] for i in range(0, len(clientes), self.batch_size)]
+    
+    def _espera(self, intento: int, response: Optional[httpx.Response]) -> float:
+        """Segundos antes del siguiente intento: `Retry-After` o backoff exponencial con jitter."""
+        if response is not None and "Retry-After" in response.headers:
+            try:
+                return min(float(response.headers["Retry-After"]), self.max_backoff)
+            except ValueError:
+                pass
+        return min(self.max_backoff, self.backoff * 2 ** intento) * random.uniform(0.5, 1.0)
+    
+    def _reintentar(self, intento: int, response: Optional[httpx.Response]) -> bool:
+        if intento >= self.reintentos:
+            return False
+        return response is None or response.status_code in RETRY_STATUS
+    
+    @staticmethod
+    def _resultado(response: httpx.Response) -> Any:
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("detail", response.text)
+            except ValueError:
+                detail = response.text
+            raise APIError(response.status_code, detail)
+        return response.json()
+
+
+# =============================================================================
+# CLIENTE SÍNCRONO
+# =============================================================================
+
+class BancoClient(_BaseClient):
+    """
+    Cliente síncrono. `httpx.Client` es thread-safe, así que los lotes se
+    mandan en paralelo desde un pool de `concurrencia` hilos sobre la misma sesión.
+    """
+    
+    def __init__(self, base_url: str = "http://localhost:8000", **kwargs):
+        super().__init__(base_url, **kwargs)
+        self._http = httpx.Client(
+            base_url=self.base_url, timeout=self.timeout, limits=self.limits, headers=self.headers
+        )
+    
+    def __enter__(self) -> "BancoClient":
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        self._http.close()
+    
+    def _post(self, path: str, payload: Any) -> Any:
+        intento = 0
+        while True:
+            try:
+                response = self._http.post(path, json=payload)
+            except httpx.TransportError:
+                if not self._reintentar(intento, None):
+                    raise
+                response = None
+            else:
+                if not self._reintentar(intento, response):
+                    return self._resultado(response)
+            time.sleep(self._espera(intento, response))
+            intento += 1
+    
+    def health(self) -> dict:
+        return self._resultado(self._http.get("/health"))
+    
+    def clasificar(self, cliente: dict) -> dict:
+        return self._post(ENDPOINTS["clasificacion"], cliente)
+    
+    def segmentar(self, cliente: dict) -> dict:
+        return self._post(ENDPOINTS["segmentacion"], cliente)
+    
+    def perfil(self, cliente: dict) -> dict:
+        """`{"clasificacion": {...}, "segmento": {...}}` del mismo cliente en una sola petición."""
+        return self._post(ENDPOINTS["perfil"], cliente)
+    
+    def _lote(self, pipeline: str, clientes: Iterable[dict]) -> List[dict]:
+        path = ENDPOINTS[pipeline] + "/batch"
+        lotes = self._lotes(clientes)
+        if len(lotes) <= 1 or self.concurrencia <= 1:
+            return [fila for lote in lotes for fila in self._post(path, lote)]
+        with ThreadPoolExecutor(min(self.concurrencia, len(lotes))) as pool:
+            return [fila for salida in pool.map(lambda lote: self._post(path, lote), lotes) for fila in salida]
+    
+    def clasificar_lote(self, clientes: Iterable[dict]) -> List[dict]:
+        """Clasifica cualquier número de clientes; regresa una predicción por cliente, en orden."""
+        return self._lote("clasificacion", clientes)
+    
+    def segmentar_lote(self, clientes: Iterable[dict]) -> List[dict]:
+        """Segmenta cualquier número de clientes; regresa un segmento por cliente, en orden."""
+        return self._lote("segmentacion", clientes)
+    
+    def perfil_lote(self, clientes: Iterable[dict]) -> List[dict]:
+        """Clasificación y segmento de cualquier número de clientes, en orden."""
+        return self._lote("perfil", clientes)
+
+
+# =============================================================================
+# CLIENTE ASYNC
+# =============================================================================
+
+class AsyncBancoClient(_BaseClient):
+    """Cliente asyncio; los lotes se mandan con a lo más `concurrencia` peticiones en vuelo."""
+    
+    def __init__(self, base_url: str = "http://localhost:8000", **kwargs):
+        super().__init__(base_url, **kwargs)
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url, timeout=self.timeout, limits=self.limits, headers=self.headers
+        )
+    
+    async def __aenter__(self) -> "AsyncBancoClient":
+        return self
+    
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+    
+    async def close(self) -> None:
+        await self._http.aclose()
+    
+    async def _post(self, path: str, payload: Any) -> Any:
+        intento = 0
+        while True:
+            try:
+                response = await self._http.post(path, json=payload)
+            except httpx.TransportError:
+                if not self._reintentar(intento, None):
+                    raise
+                response = None
+            else:
+                if not self._reintentar(intento, response):
+                    return self._resultado(response)
+            await asyncio.sleep(self._espera(intento, response))
+            intento += 1
+    
+    async def health(self) -> dict:
+        return self._resultado(await self._http.get("/health"))
+    
+    async def clasificar(self, cliente: dict) -> dict:
+        return await self._post(ENDPOINTS["clasificacion"], cliente)
+    
+    async def segmentar(self, cliente: dict) -> dict:
+        return await self._post(ENDPOINTS["segmentacion"], cliente)
+    
+    async def perfil(self, cliente: dict) -> dict:
+        return await self._post(ENDPOINTS["perfil"], cliente)
+    
+    async def _lote(self, pipeline: str, clientes: Iterable[dict]) -> List[dict]:
+        path = ENDPOINTS[pipeline] + "/batch"
+        semaforo = asyncio.Semaphore(self.concurrencia)
+        
+        async def enviar(lote: List[dict]) -> List[dict]:
+            async with semaforo:
+                return await self._post(path, lote)
+        
+        salidas = await asyncio.gather(*(enviar(lote) for lote in self._lotes(clientes)))
+        return [fila for salida in salidas for fila in salida]
+    
+    async def clasificar_lote(self, clientes: Iterable[dict]) -> List[dict]:
+        return await self._lote("clasificacion", clientes)
+    
+    async def segmentar_lote(self, clientes: Iterable[dict]) -> List[dict]:
+        return await self._lote("segmentacion", clientes)
+    
+    async def perfil_lote(self, clientes: Iterable[dict]) -> List[dict]:
+        return await self._lote("perfil", clientes)
+
+
+# =============================================================================
+# MODO BENCHMARK
+# =============================================================================
+
+def clientes_sinteticos(n: int, seed: int = 42) -> List[dict]:
+    """Clientes aleatorios válidos para los dos endpoints (segmentación ignora day/month)."""
+    rng = random.Random(seed)
+    return [
+        {
+            "age": rng.randint(18, 95),
+            "job": rng.choice(["admin.", "technician", "services", "management", "retired", "blue-collar", "student"]),
+            "marital": rng.choice(["married", "single", "divorced"]),
+            "education": rng.choice(["primary", "secondary", "tertiary", "unknown"]),
+            "default": rng.choice(["yes", "no"]),
+            "balance": rng.randint(-2000, 50000),
+            "housing": rng.choice(["yes", "no"]),
+            "loan": rng.choice(["yes", "no"]),
+            "day": rng.randint(1, 31),
+            "month": rng.choice(["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]),
+            "duration": rng.randint(0, 3000),
+            "campaign": rng.randint(1, 40),
+            "pdays": rng.choice([-1, rng.randint(1, 800)]),
+            "previous": rng.randint(0, 20),
+        }
+        for _ in range(n)
+    ]
+
+
+def benchmark(url: str, n: int, pipeline: str, batch_size: int, concurrencia: int, individuales: int) -> List[dict]:
+    """
+    Compara las formas de mandar `n` clientes:
+    un POST por cliente sin sesión (el loop típico), un POST por cliente con
+    la sesión del SDK, y los lotes sync y async del SDK.
+    """
+    clientes = clientes_sinteticos(n)
+    path = ENDPOINTS[pipeline]
+    resultados = []
+    
+    def medir(nombre: str, filas: int, fn) -> None:
+        inicio = time.perf_counter()
+        fn()
+        segundos = time.perf_counter() - inicio
+        resultados.append({"modo": nombre, "filas": filas, "segundos": segundos, "filas_s": filas / segundos})
+    
+    config = dict(batch_size=batch_size, concurrencia=concurrencia)
+    with BancoClient(url, **config) as api:
+        api._lote(pipeline, clientes[:batch_size])  # calienta la API y las conexiones
+        muestra = clientes[:individuales]
+        medir("loop sin sesión (httpx.post)", len(muestra),
+              lambda: [httpx.post(url.rstrip("/") + path, json=c).raise_for_status() for c in muestra])
+        medir("individual con sesión", len(muestra), lambda: [api._post(path, c) for c in muestra])
+        medir(f"lotes sync ({batch_size} × {concurrencia})", n, lambda: api._lote(pipeline, clientes))
+    
+    async def lotes_async() -> None:
+        async with AsyncBancoClient(url, **config) as api:
+            await api._lote(pipeline, clientes)
+    
+    medir(f"lotes async ({batch_size} × {concurrencia})", n, lambda: asyncio.run(lotes_async()))
+    return resultados
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cliente de la API de Predicción Bancaria")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    bench = sub.add_parser("benchmark", help="Mide filas/s contra un servidor (p. ej. local)")
+    bench.add_argument("--url", default="http://localhost:8000")
+    bench.add_argument("--clientes", type=int, default=5000, help="Clientes para los modos por lotes")
+    bench.add_argument("--individuales", type=int, default=300, help="Clientes para los modos de un POST por cliente")
+    bench.add_argument("--pipeline", choices=list(ENDPOINTS), default="clasificacion")
+    bench.add_argument("--lote", type=int, default=500)
+    bench.add_argument("--concurrencia", type=int, default=4)
+    args = parser.parse_args()
+    
+    resultados = benchmark(args.url, args.clientes, args.pipeline, args.lote, args.concurrencia, args.individuales)
+    print(f"\n{'modo':<34} {'filas':>7} {'segundos':>9} {'filas/s':>10}")
+    for r in resultados:
+        print(f"{r['modo']:<34} {r['filas']:>7} {r['segundos']:>9.2f} {r['filas_s']:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
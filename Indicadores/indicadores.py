@@ -0,0 +1,536 @@
+"""
+Indicadores económicos (INEGI, Banxico, yfinance) como features, con cache en disco.
+
+Versión en módulo de `1_Consumir_APIs.ipynb`. Allí se hace un `requests.get`
+por indicador, uno tras otro, y cada corrida vuelve a bajar y a parsear todo.
+Aquí:
+
+- Las series se piden a la vez por un solo cliente async con pool de
+  conexiones (`--concurrency`), con un máximo de peticiones por segundo por
+  fuente (`--rate`) y reintentos con backoff en 429/5xx.
+- Cada serie queda en disco ya parseada y por columnas (`fechas.npy` +
+  `valores.npy`), así que recargarla no vuelve a leer JSON ni fechas en texto.
+- Mientras no vence su TTL no se pide. Al vencer, se revalida con
+  ETag / Last-Modified; un 304 reutiliza la copia sin descargar ni parsear.
+- Si una descarga falla y hay copia en disco, se usa la copia (con aviso).
+
+    from indicadores import Descargador, tabla_features
+
+    series = Descargador().obtener({"inegi": ["496150", "735879"], "banxico": ["SF43718"]})
+    tabla = tabla_features(series, frecuencia="MS")
+
+CLI:
+
+    python indicadores.py --inegi 496150 735879 --banxico SF43718 --yahoo ^MXX --output features.csv
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+import numpy as np
+import pandas as pd
+
+# Tokens (privados: se leen del entorno y nunca se guardan ni se imprimen)
+INEGI_TOKEN = os.getenv("INEGI_TOKEN", "")
+BANXICO_TOKEN = os.getenv("BANXICO_TOKEN", "")
+
+# URLs base (se pueden apuntar a un proxy o a un servidor local de pruebas)
+INEGI_API_URL = os.getenv(
+    "INEGI_API_URL", "https://www.inegi.org.mx/app/api/indicadores/desarrolladores/jsonxml"
+)
+BANXICO_API_URL = os.getenv("BANXICO_API_URL", "https://www.banxico.org.mx/SieAPIRest/service/v1")
+
+# Banco de información de INEGI (BISE como en el notebook, o BIE)
+INEGI_BANCO = os.getenv("INEGI_BANCO", "BISE")
+
+# Series parseadas en disco y cuánto tiempo se usan sin volver a preguntar
+CACHE_PATH = Path(os.getenv("INDICADORES_CACHE_PATH", Path(__file__).resolve().parent / ".cache"))
+TTL_S = float(os.getenv("INDICADORES_TTL_S", "43200"))
+
+# Códigos que se reintentan (429 = límite de la fuente, 5xx = falla temporal)
+RETRY_STATUS = (429, 500, 502, 503, 504)
+MAX_BACKOFF_S = 30.0
+
+ORIGENES = ("cache", "revalidada", "descargada", "copia")
+
+
+class Serie:
+    """Una serie ya parseada: fechas (`datetime64[D]`) y valores (`float64`), ordenadas."""
+    
+    __slots__ = ("fuente", "id", "nombre", "fechas", "valores", "etag", "last_modified", "descargada", "origen")
+    
+    def __init__(
+        self,
+        fuente: str,
+        id: str,
+        nombre: str,
+        fechas: np.ndarray,
+        valores: np.ndarray,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        descargada: float = 0.0,
+        origen: str = "descargada",
+    ):
+        self.fuente = fuente
+        self.id = id
+        self.nombre = nombre
+        self.fechas = fechas
+        self.valores = valores
+        self.etag = etag
+        self.last_modified = last_modified
+        self.descargada = descargada
+        self.origen = origen
+    
+    @property
+    def columna(self) -> str:
+        return f"{self.fuente}_{self.id}"
+    
+    def to_series(self) -> pd.Series:
+        return pd.Series(self.valores, index=pd.DatetimeIndex(self.fechas, name="Fecha"), name=self.columna)
+    
+    def meta(self) -> dict:
+        return {
+            "fuente": self.fuente,
+            "id": self.id,
+            "nombre": self.nombre,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "descargada": self.descargada,
+            "filas": int(len(self.fechas)),
+        }
+
+
+# =============================================================================
+# PARSEO (una vez por descarga; la copia en disco ya queda parseada)
+# =============================================================================
+
+# Formatos de fecha de las fuentes, por la forma del primer valor
+FORMATOS_FECHA = (
+    (re.compile(r"^\d{2}/\d{2}/\d{4}$"), "%d/%m/%Y"),  # Banxico
+    (re.compile(r"^\d{4}/\d{2}/\d{2}$"), "%Y/%m/%d"),  # INEGI diaria
+    (re.compile(r"^\d{4}/\d{2}$"), "%Y/%m"),           # INEGI mensual (como en el notebook)
+    (re.compile(r"^\d{4}$"), "%Y"),                    # INEGI anual
+)
+
+
+def _columnas(fechas: List[str], valores: list) -> Tuple[np.ndarray, np.ndarray]:
+    """Fechas y valores en texto → arreglos ordenados por fecha, sin fechas repetidas."""
+    if not fechas:
+        return np.empty(0, dtype="datetime64[D]"), np.empty(0, dtype=np.float64)
+    formato = next((f for patron, f in FORMATOS_FECHA if patron.match(fechas[0])), None)
+    if formato is None:
+        raise ValueError(f"Formato de fecha desconocido: {fechas[0]!r}")
+    fechas = pd.to_datetime(pd.Series(fechas), format=formato).to_numpy().astype("datetime64[D]")
+    # Banxico separa miles con coma y marca sin dato con "N/E"; INEGI usa "" o null
+    valores = pd.to_numeric(
+        pd.Series(valores, dtype=object).astype(str).str.replace(",", "", regex=False), errors="coerce"
+    ).to_numpy(dtype=np.float64)
+    
+    orden = np.argsort(fechas, kind="stable")
+    fechas, valores = fechas[orden], valores[orden]
+    unicas = np.ones(len(fechas), dtype=bool)
+    unicas[:-1] = fechas[1:] != fechas[:-1]  # si se repite una fecha, queda la última
+    return fechas[unicas], valores[unicas]
+
+
+def parsear_inegi(payload: dict) -> Tuple[str, np.ndarray, np.ndarray]:
+    serie = payload["Series"][0]
+    observaciones = serie.get("OBSERVATIONS") or []
+    nombre = ""
+    metadata = serie.get("METADATA")
+    if isinstance(metadata, list) and metadata and isinstance(metadata[0], dict):
+        nombre = str(metadata[0].get("VALUE", ""))
+    fechas, valores = _columnas(
+        [o["TIME_PERIOD"] for o in observaciones], [o.get("OBS_VALUE") for o in observaciones]
+    )
+    return nombre, fechas, valores
+
+
+def parsear_banxico(payload: dict) -> Tuple[str, np.ndarray, np.ndarray]:
+    serie = payload["bmx"]["series"][0]
+    datos = serie.get("datos") or []
+    fechas, valores = _columnas([d["fecha"] for d in datos], [d.get("dato") for d in datos])
+    return str(serie.get("titulo", "")), fechas, valores
+
+
+# =============================================================================
+# FUENTES
+# =============================================================================
+
+class Fuente:
+    """Cómo pedir y parsear una serie de una API. `token` se lee al usarla."""
+    
+    nombre = ""
+    
+    def token(self) -> str:
+        return ""
+    
+    def url(self, id: str) -> str:
+        raise NotImplementedError
+    
+    def headers(self) -> Dict[str, str]:
+        return {}
+    
+    def parsear(self, payload: dict) -> Tuple[str, np.ndarray, np.ndarray]:
+        raise NotImplementedError
+    
+    def requerir_token(self) -> None:
+        if not self.token():
+            raise ValueError(f"Falta el token de {self.nombre} (variable de entorno {self.nombre.upper()}_TOKEN)")
+
+
+class FuenteINEGI(Fuente):
+    nombre = "inegi"
+    
+    def token(self) -> str:
+        return INEGI_TOKEN
+    
+    def url(self, id: str) -> str:
+        return f"{INEGI_API_URL}/INDICATOR/{id}/es/00/false/{INEGI_BANCO}/2.0/{self.token()}?type=json"
+    
+    def parsear(self, payload: dict) -> Tuple[str, np.ndarray, np.ndarray]:
+        return parsear_inegi(payload)
+
+
+class FuenteBanxico(Fuente):
+    nombre = "banxico"
+    
+    def token(self) -> str:
+        return BANXICO_TOKEN
+    
+    def url(self, id: str) -> str:
+        return f"{BANXICO_API_URL}/series/{id}/datos"
+    
+    def headers(self) -> Dict[str, str]:
+        return {"Bmx-Token": self.token()}
+    
+    def parsear(self, payload: dict) -> Tuple[str, np.ndarray, np.ndarray]:
+        return parsear_banxico(payload)
+
+
+FUENTES: Dict[str, Fuente] = {f.nombre: f for f in (FuenteINEGI(), FuenteBanxico())}
+
+# yfinance no es una API HTTP que controlemos: se llama en un hilo y solo aplica el TTL
+YAHOO = "yahoo"
+
+
+def descargar_yahoo(ticker: str, periodo: str) -> Tuple[str, np.ndarray, np.ndarray]:
+    try:
+        import yfinance as yf
+    except ImportError:
+        raise ValueError("yfinance no está instalado (pip install yfinance)") from None
+    historia = yf.Ticker(ticker).history(period=periodo)
+    if historia.empty:
+        raise ValueError(f"yfinance no regresó datos para {ticker}")
+    fechas = historia.index.tz_localize(None).to_numpy().astype("datetime64[D]")
+    return ticker, fechas, historia["Close"].to_numpy(dtype=np.float64)
+
+
+# =============================================================================
+# CACHE EN DISCO
+# =============================================================================
+
+class CacheSeries:
+    """
+    Una carpeta por serie en `directorio/<fuente>-<id>/`: `fechas.npy` y
+    `valores.npy` (se abren con mmap) y `meta.json` (nombre, ETag,
+    Last-Modified, fecha de descarga). Con `directorio=None` no guarda nada.
+    """
+    
+    def __init__(self, directorio: Optional[Path] = CACHE_PATH):
+        self.directorio = Path(directorio) if directorio is not None else None
+    
+    def _ruta(self, fuente: str, id: str) -> Optional[Path]:
+        if self.directorio is None:
+            return None
+        return self.directorio / f"{fuente}-{re.sub(r'[^0-9A-Za-z_.=-]', '_', id)}"
+    
+    def cargar(self, fuente: str, id: str) -> Optional[Serie]:
+        ruta = self._ruta(fuente, id)
+        if ruta is None or not (ruta / "meta.json").exists():
+            return None
+        try:
+            meta = json.loads((ruta / "meta.json").read_text())
+            fechas = np.load(ruta / "fechas.npy", mmap_mode="r")
+            valores = np.load(ruta / "valores.npy", mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Cache ilegible en {ruta.name}, se descarga de nuevo: {e}")
+            return None
+        return Serie(
+            fuente, id, meta.get("nombre", ""), fechas, valores,
+            meta.get("etag"), meta.get("last_modified"), meta.get("descargada", 0.0), "cache",
+        )
+    
+    def guardar(self, serie: Serie) -> None:
+        ruta = self._ruta(serie.fuente, serie.id)
+        if ruta is None:
+            return
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        # Se escribe aparte y se mueve al final: nunca queda una entrada a medias
+        temporal = Path(tempfile.mkdtemp(prefix=f".{ruta.name}-", dir=ruta.parent))
+        try:
+            np.save(temporal / "fechas.npy", np.ascontiguousarray(serie.fechas))
+            np.save(temporal / "valores.npy", np.ascontiguousarray(serie.valores))
+            (temporal / "meta.json").write_text(json.dumps(serie.meta(), ensure_ascii=False))
+            if ruta.exists():
+                shutil.rmtree(ruta)
+            os.replace(temporal, ruta)
+        finally:
+            shutil.rmtree(temporal, ignore_errors=True)
+    
+    def tocar(self, serie: Serie) -> None:
+        """Después de un 304: solo se reescribe `meta.json` (nueva fecha de descarga)."""
+        ruta = self._ruta(serie.fuente, serie.id)
+        if ruta is None or not ruta.exists():
+            return
+        temporal = ruta / ".meta.json.tmp"
+        temporal.write_text(json.dumps(serie.meta(), ensure_ascii=False))
+        os.replace(temporal, ruta / "meta.json")
+
+
+# =============================================================================
+# DESCARGA CONCURRENTE
+# =============================================================================
+
+class Ritmo:
+    """Cubeta de fichas: a lo más `por_segundo` peticiones por segundo (0 = sin límite)."""
+    
+    def __init__(self, por_segundo: float):
+        self.por_segundo = por_segundo
+        self.fichas = 1.0
+        self.ultima = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def esperar(self) -> None:
+        if self.por_segundo <= 0:
+            return
+        async with self._lock:
+            ahora = time.monotonic()
+            self.fichas = min(1.0, self.fichas + (ahora - self.ultima) * self.por_segundo)
+            self.ultima = ahora
+            if self.fichas < 1.0:
+                await asyncio.sleep((1.0 - self.fichas) / self.por_segundo)
+                self.ultima = time.monotonic()
+                self.fichas = 1.0
+            self.fichas -= 1.0
+
+
+class ErrorDescarga(Exception):
+    """Falla de una serie. El mensaje nunca incluye la URL (la de INEGI lleva el token)."""
+
+
+class Descargador:
+    """
+    Pide muchas series a la vez por un solo `httpx.AsyncClient` y las guarda
+    en `CacheSeries`. Las que fallan quedan en `errores` (`"fuente:id"` → mensaje).
+    """
+    
+    def __init__(
+        self,
+        cache: Optional[Path] = CACHE_PATH,
+        ttl_s: float = TTL_S,
+        concurrencia: int = 8,
+        por_segundo: float = 5.0,
+        reintentos: int = 3,
+        timeout: float = 30.0,
+        periodo_yahoo: str = "5y",
+    ):
+        self.cache = CacheSeries(cache)
+        self.ttl_s = ttl_s
+        self.concurrencia = max(1, concurrencia)
+        self.por_segundo = por_segundo
+        self.reintentos = reintentos
+        self.timeout = timeout
+        self.periodo_yahoo = periodo_yahoo
+        self.errores: Dict[str, str] = {}
+    
+    def obtener(self, pedidos: Dict[str, Iterable[str]], forzar: bool = False) -> Dict[str, Serie]:
+        """Versión síncrona de `obtener_async` (scripts y notebooks)."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.obtener_async(pedidos, forzar))
+        # Jupyter/Colab ya tienen un event loop corriendo: se usa otro en un hilo
+        with ThreadPoolExecutor(1) as hilo:
+            return hilo.submit(asyncio.run, self.obtener_async(pedidos, forzar)).result()
+    
+    async def obtener_async(self, pedidos: Dict[str, Iterable[str]], forzar: bool = False) -> Dict[str, Serie]:
+        """
+        `pedidos`: fuente → ids, p. ej. `{"inegi": ["496150"], "yahoo": ["^MXX"]}`.
+        Regresa `"fuente:id"` → `Serie` en el mismo orden. `forzar` revalida aunque no haya vencido el TTL.
+        """
+        lista = [(fuente, str(id)) for fuente, ids in pedidos.items() for id in dict.fromkeys(ids)]
+        for fuente, _ in lista:
+            if fuente not in FUENTES and fuente != YAHOO:
+                raise ValueError(f"Fuente desconocida: {fuente}")
+        
+        self.errores = {}
+        semaforo = asyncio.Semaphore(self.concurrencia)
+        ritmos = {fuente: Ritmo(self.por_segundo) for fuente, _ in lista}
+        limites = httpx.Limits(max_connections=self.concurrencia, max_keepalive_connections=self.concurrencia)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limites) as cliente:
+            resultados = await asyncio.gather(*(
+                self._una(cliente, semaforo, ritmos[fuente], fuente, id, forzar) for fuente, id in lista
+            ))
+        return {f"{fuente}:{id}": serie for (fuente, id), serie in zip(lista, resultados) if serie is not None}
+    
+    async def _una(self, cliente, semaforo, ritmo: Ritmo, fuente: str, id: str, forzar: bool) -> Optional[Serie]:
+        llave = f"{fuente}:{id}"
+        previa = self.cache.cargar(fuente, id)
+        if previa is not None and not forzar and time.time() - previa.descargada < self.ttl_s:
+            return previa
+        try:
+            async with semaforo:
+                await ritmo.esperar()
+                if fuente == YAHOO:
+                    nombre, fechas, valores = await asyncio.to_thread(descargar_yahoo, id, self.periodo_yahoo)
+                    serie = Serie(fuente, id, nombre, fechas, valores, descargada=time.time())
+                else:
+                    serie = await self._http(cliente, ritmo, FUENTES[fuente], id, previa)
+        except Exception as e:
+            mensaje = str(e) if isinstance(e, (ErrorDescarga, ValueError)) else type(e).__name__
+            if previa is None:
+                self.errores[llave] = mensaje
+                return None
+            print(f"⚠️ {llave}: {mensaje}; se usa la copia en disco")
+            previa.origen = "copia"
+            return previa
+        
+        if serie.origen == "revalidada":
+            self.cache.tocar(serie)
+        else:
+            self.cache.guardar(serie)
+        return serie
+    
+    async def _http(self, cliente, ritmo: Ritmo, fuente: Fuente, id: str, previa: Optional[Serie]) -> Serie:
+        fuente.requerir_token()
+        headers = fuente.headers()
+        if previa is not None and previa.etag:
+            headers["If-None-Match"] = previa.etag
+        if previa is not None and previa.last_modified:
+            headers["If-Modified-Since"] = previa.last_modified
+        
+        intento = 0
+        while True:
+            try:
+                response = await cliente.get(fuente.url(id), headers=headers)
+            except httpx.TransportError as e:
+                if intento >= self.reintentos:
+                    raise ErrorDescarga(f"Error de conexión ({type(e).__name__})") from None
+                response = None
+            if response is not None and response.status_code not in RETRY_STATUS:
+                break
+            if response is not None and intento >= self.reintentos:
+                raise ErrorDescarga(f"Error {response.status_code} después de {intento + 1} intentos")
+            await asyncio.sleep(self._espera(intento, response))
+            await ritmo.esperar()
+            intento += 1
+        
+        if response.status_code == 304 and previa is not None:
+            previa.descargada = time.time()
+            previa.origen = "revalidada"
+            return previa
+        if response.status_code != 200:
+            raise ErrorDescarga(f"Error {response.status_code}")
+        try:
+            nombre, fechas, valores = fuente.parsear(response.json())
+        except (KeyError, IndexError, TypeError) as e:
+            raise ErrorDescarga(f"Respuesta inesperada ({type(e).__name__}: {e})") from None
+        return Serie(
+            fuente.nombre, id, nombre, fechas, valores,
+            response.headers.get("ETag"), response.headers.get("Last-Modified"), time.time(),
+        )
+    
+    @staticmethod
+    def _espera(intento: int, response: Optional[httpx.Response]) -> float:
+        """Segundos antes del siguiente intento: `Retry-After` o backoff exponencial con jitter."""
+        if response is not None and "Retry-After" in response.headers:
+            try:
+                return min(float(response.headers["Retry-After"]), MAX_BACKOFF_S)
+            except ValueError:
+                pass
+        return min(MAX_BACKOFF_S, 0.5 * 2 ** intento) * random.uniform(0.5, 1.0)
+
+
+def tabla_features(series: Dict[str, Serie], frecuencia: Optional[str] = None) -> pd.DataFrame:
+    """
+    Una columna por serie (`<fuente>_<id>`), indexada por fecha. Con
+    `frecuencia` (alias de pandas: `MS`, `D`, ...) cada serie se lleva a esa
+    frecuencia con el último valor del periodo y se rellena hacia adelante,
+    para mezclar series diarias y mensuales como features.
+    """
+    if not series:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="Fecha"))
+    columnas = [serie.to_series() for serie in series.values()]
+    if frecuencia is not None:
+        columnas = [c.resample(frecuencia).last() for c in columnas]
+    tabla = pd.concat(columnas, axis=1, join="outer").sort_index()
+    return tabla.ffill() if frecuencia is not None else tabla
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Descarga indicadores de INEGI, Banxico y yfinance con cache en disco.")
+    parser.add_argument("--inegi", nargs="+", default=[], metavar="ID", help="Indicadores de INEGI (p. ej. 496150)")
+    parser.add_argument("--banxico", nargs="+", default=[], metavar="ID", help="Series de Banxico (p. ej. SF43718)")
+    parser.add_argument("--yahoo", nargs="+", default=[], metavar="TICKER", help="Tickers de yfinance (p. ej. ^MXX)")
+    parser.add_argument("--output", type=Path, default=None, help="Guardar la tabla de features (.csv o .parquet)")
+    parser.add_argument("--freq", default=None, help="Llevar todo a una frecuencia (alias de pandas: MS, D, ...)")
+    parser.add_argument("--ttl", type=float, default=TTL_S, help="Segundos que se usa la copia sin volver a preguntar")
+    parser.add_argument("--refresh", action="store_true", help="Revalidar todo aunque no haya vencido el TTL")
+    parser.add_argument("--concurrency", type=int, default=8, help="Peticiones simultáneas")
+    parser.add_argument("--rate", type=float, default=5.0, help="Máximo de peticiones por segundo a cada fuente (0 = sin límite)")
+    parser.add_argument("--retries", type=int, default=3, help="Reintentos en 429/5xx y errores de conexión")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--period", default="5y", help="Periodo de yfinance")
+    parser.add_argument("--cache", type=Path, default=CACHE_PATH, help="Carpeta del cache de series")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args(argv)
+    
+    pedidos = {fuente: ids for fuente, ids in (("inegi", args.inegi), ("banxico", args.banxico), (YAHOO, args.yahoo)) if ids}
+    if not pedidos:
+        parser.error("Indica al menos un indicador con --inegi, --banxico o --yahoo")
+    
+    descargador = Descargador(
+        None if args.no_cache else args.cache, args.ttl, args.concurrency, args.rate,
+        args.retries, args.timeout, args.period,
+    )
+    inicio = time.perf_counter()
+    series = descargador.obtener(pedidos, forzar=args.refresh)
+    segundos = time.perf_counter() - inicio
+    
+    for llave, serie in series.items():
+        ultima = f"{serie.fechas[-1]} = {serie.valores[-1]:,.4g}" if len(serie.fechas) else "sin datos"
+        print(f"  {llave:<22} {serie.origen:<11} {len(serie.fechas):>6,} obs.  {ultima}  {serie.nombre[:50]}")
+    for llave, mensaje in descargador.errores.items():
+        print(f"❌ {llave}: {mensaje}")
+    conteo = {origen: sum(s.origen == origen for s in series.values()) for origen in ORIGENES}
+    print(f"\n▶ {len(series)} series en {segundos:.2f} s  ({', '.join(f'{n} {o}' for o, n in conteo.items() if n)})")
+    
+    if args.output is not None and series:
+        tabla = tabla_features(series, args.freq)
+        if args.output.suffix.lower() in (".parquet", ".pq"):
+            tabla.to_parquet(args.output)
+        else:
+            tabla.to_csv(args.output)
+        print(f"✅ {tabla.shape[0]:,} fechas × {tabla.shape[1]} series en {args.output}")
+    return 1 if descargador.errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
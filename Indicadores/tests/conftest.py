@@ -0,0 +1,9 @@
+"""
+Configuración de pytest para Indicadores.
+Las pruebas importan `indicadores` como el CLI (desde la carpeta Indicadores).
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,285 @@
+"""
+Pruebas de `Descargador` contra un servidor HTTP local que imita INEGI y Banxico.
+
+El servidor responde en `/INDICATOR/<id>/...` (INEGI) y `/series/<id>/datos`
+(Banxico), con ETag y 304. Los ids `falla<N>-...` responden 503 las primeras
+N veces y `caido-...` siempre; cada petición queda registrada para revisar
+concurrencia, reintentos y revalidaciones.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import numpy as np
+import pytest
+
+import indicadores
+from indicadores import CacheSeries, Descargador, tabla_features
+
+
+class _Stub:
+    """Estado del servidor: latencia, peticiones por id y máximo de peticiones simultáneas."""
+    
+    def __init__(self):
+        self.latencia = 0.0
+        self.retry_after = "0"
+        self.lock = threading.Lock()
+        self.en_curso = 0
+        self.max_en_curso = 0
+        self.peticiones = []  # (id, instante, If-None-Match)
+        self.no_modificadas = 0
+    
+    def cuenta(self, id: str) -> int:
+        with self.lock:
+            return sum(1 for p in self.peticiones if p[0] == id)
+
+
+def _inegi(id: str) -> dict:
+    observaciones = [
+        {"TIME_PERIOD": f"{anio}/{mes:02d}", "OBS_VALUE": "" if (anio, mes) == (2020, 5) else f"{anio + mes / 100:.2f}"}
+        for anio in range(2023, 2019, -1) for mes in range(12, 0, -1)
+    ]
+    return {"Series": [{"INDICADOR": id, "METADATA": [{"VALUE": f"Indicador {id}"}], "OBSERVATIONS": observaciones}]}
+
+
+def _banxico(id: str) -> dict:
+    datos = [{"fecha": f"{dia:02d}/01/2024", "dato": "N/E" if dia == 3 else f"1,{dia:03d}.5"} for dia in range(1, 11)]
+    return {"bmx": {"series": [{"idSerie": id, "titulo": f"Serie {id}", "datos": datos}]}}
+
+
+def _handler(stub: _Stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def log_message(self, *args):
+            pass
+        
+        def _responder(self, status: int, body: bytes = b"", headers: dict = None):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def do_GET(self):
+            partes = self.path.split("?")[0].split("/")
+            if "INDICATOR" in partes:
+                id = partes[partes.index("INDICATOR") + 1]
+                payload = _inegi(id)
+            elif "series" in partes:
+                id = partes[partes.index("series") + 1]
+                payload = _banxico(id)
+            else:
+                self._responder(404)
+                return
+            
+            with stub.lock:
+                stub.peticiones.append((id, time.monotonic(), self.headers.get("If-None-Match")))
+                intento = sum(1 for p in stub.peticiones if p[0] == id)
+                stub.en_curso += 1
+                stub.max_en_curso = max(stub.max_en_curso, stub.en_curso)
+            try:
+                time.sleep(stub.latencia)
+            finally:
+                with stub.lock:
+                    stub.en_curso -= 1
+            
+            if id.startswith("caido") or (id.startswith("falla") and intento <= int(id[5:].split("-")[0])):
+                self._responder(503, headers={"Retry-After": stub.retry_after})
+                return
+            body = json.dumps(payload).encode()
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                with stub.lock:
+                    stub.no_modificadas += 1
+                self._responder(304, headers={"ETag": etag})
+                return
+            self._responder(200, body, {"ETag": etag, "Content-Type": "application/json"})
+    
+    return Handler
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    estado = _Stub()
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _handler(estado))
+    servidor.daemon_threads = True
+    hilo = threading.Thread(target=servidor.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    hilo.start()
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    monkeypatch.setattr(indicadores, "INEGI_API_URL", f"{base}/inegi")
+    monkeypatch.setattr(indicadores, "BANXICO_API_URL", f"{base}/banxico")
+    monkeypatch.setattr(indicadores, "INEGI_TOKEN", "token-de-prueba")
+    monkeypatch.setattr(indicadores, "BANXICO_TOKEN", "token-de-prueba")
+    yield estado
+    servidor.shutdown()
+    servidor.server_close()
+
+
+# =============================================================================
+# CONCURRENCIA Y RITMO
+# =============================================================================
+
+def test_concurrencia_limitada_por_el_semaforo(stub, tmp_path):
+    stub.latencia = 0.1
+    descargador = Descargador(cache=tmp_path, concurrencia=3, por_segundo=0)
+    
+    inicio = time.monotonic()
+    series = descargador.obtener({"inegi": [str(i) for i in range(12)]})
+    segundos = time.monotonic() - inicio
+    
+    assert len(series) == 12 and not descargador.errores
+    assert stub.max_en_curso == 3
+    assert segundos >= 0.4  # 12 peticiones de 0.1 s, de 3 en 3
+    assert segundos < 12 * 0.1  # y no una tras otra
+
+
+def test_ritmo_limita_peticiones_por_segundo_y_fuente(stub, tmp_path):
+    descargador = Descargador(cache=tmp_path, concurrencia=8, por_segundo=20)
+    descargador.obtener({"inegi": [str(i) for i in range(6)], "banxico": ["SF1", "SF2"]})
+    
+    llegadas = sorted(t for id, t, _ in stub.peticiones if not id.startswith("SF"))
+    assert len(llegadas) == 6
+    # La cubeta empieza con una ficha: las otras 5 salen cada 1/20 s
+    assert llegadas[-1] - llegadas[0] >= 5 / 20 * 0.9
+    # Banxico tiene su propio ritmo: no espera a que terminen las de INEGI
+    banxico = sorted(t for id, t, _ in stub.peticiones if id.startswith("SF"))
+    assert banxico[0] - llegadas[0] < 5 / 20 * 0.9
+
+
+# =============================================================================
+# TTL Y REVALIDACIÓN
+# =============================================================================
+
+def test_cache_vigente_no_hace_peticiones(stub, tmp_path):
+    Descargador(cache=tmp_path, ttl_s=3600, por_segundo=0).obtener({"inegi": ["100"]})
+    
+    series = Descargador(cache=tmp_path, ttl_s=3600, por_segundo=0).obtener({"inegi": ["100"]})
+    
+    assert stub.cuenta("100") == 1
+    assert series["inegi:100"].origen == "cache"
+
+
+def test_ttl_vencido_revalida_con_if_none_match(stub, tmp_path):
+    primera = Descargador(cache=tmp_path, por_segundo=0).obtener({"inegi": ["200"], "banxico": ["SF9"]})
+    assert primera["inegi:200"].origen == "descargada"
+    etag = primera["inegi:200"].etag
+    
+    # Se envejece la copia en disco: con el TTL vencido se revalida
+    meta = tmp_path / "inegi-200" / "meta.json"
+    datos = json.loads(meta.read_text())
+    datos["descargada"] -= 7200
+    meta.write_text(json.dumps(datos))
+    
+    segunda = Descargador(cache=tmp_path, ttl_s=3600, por_segundo=0).obtener({"inegi": ["200"], "banxico": ["SF9"]})
+    
+    assert stub.cuenta("200") == 2 and stub.cuenta("SF9") == 1
+    assert stub.peticiones[-1][2] == etag
+    assert stub.no_modificadas == 1
+    serie = segunda["inegi:200"]
+    assert serie.origen == "revalidada"
+    np.testing.assert_array_equal(serie.valores, primera["inegi:200"].valores)
+    # El 304 renueva la fecha de descarga en disco
+    assert json.loads(meta.read_text())["descargada"] > datos["descargada"] + 3600
+
+
+def test_ttl_cero_y_forzar_siempre_revalidan(stub, tmp_path):
+    Descargador(cache=tmp_path, por_segundo=0).obtener({"banxico": ["SF1"]})
+    Descargador(cache=tmp_path, ttl_s=0, por_segundo=0).obtener({"banxico": ["SF1"]})
+    Descargador(cache=tmp_path, ttl_s=3600, por_segundo=0).obtener({"banxico": ["SF1"]}, forzar=True)
+    
+    assert stub.cuenta("SF1") == 3
+    assert stub.no_modificadas == 2
+
+
+# =============================================================================
+# REINTENTOS Y BACKOFF
+# =============================================================================
+
+def test_espera_respeta_retry_after_con_tope():
+    def respuesta(valor):
+        return httpx.Response(503, headers={"Retry-After": valor})
+    
+    assert Descargador._espera(0, respuesta("2")) == 2.0
+    assert Descargador._espera(0, respuesta("3600")) == indicadores.MAX_BACKOFF_S
+    # Retry-After como fecha HTTP no se interpreta: se usa el backoff
+    assert 0.25 <= Descargador._espera(0, respuesta("Wed, 21 Oct 2015 07:28:00 GMT")) <= 0.5
+
+
+def test_espera_backoff_exponencial_con_jitter():
+    for intento in range(8):
+        base = min(indicadores.MAX_BACKOFF_S, 0.5 * 2 ** intento)
+        esperas = [Descargador._espera(intento, None) for _ in range(50)]
+        assert all(base * 0.5 <= espera <= base for espera in esperas)
+        assert len(set(esperas)) > 1
+    assert Descargador._espera(20, None) <= indicadores.MAX_BACKOFF_S
+
+
+def test_reintenta_503_hasta_obtener_la_serie(stub, tmp_path):
+    series = Descargador(cache=tmp_path, reintentos=3, por_segundo=0).obtener({"inegi": ["falla2-a"]})
+    
+    assert stub.cuenta("falla2-a") == 3
+    assert series["inegi:falla2-a"].origen == "descargada"
+
+
+def test_agota_los_reintentos_y_usa_la_copia(stub, tmp_path, monkeypatch):
+    esperas = []
+    monkeypatch.setattr(Descargador, "_espera", staticmethod(lambda intento, response: esperas.append(intento) or 0.0))
+    descargador = Descargador(cache=tmp_path, reintentos=2, por_segundo=0)
+    
+    assert descargador.obtener({"inegi": ["caido-a"]}) == {}
+    assert stub.cuenta("caido-a") == 3
+    assert esperas == [0, 1]
+    assert "503" in descargador.errores["inegi:caido-a"]
+    assert "token-de-prueba" not in descargador.errores["inegi:caido-a"]
+    
+    # Con copia en disco, una falla regresa la copia
+    copia = descargador.obtener({"inegi": ["300"]})["inegi:300"]
+    CacheSeries(tmp_path).guardar(indicadores.Serie("inegi", "caido-b", copia.nombre, copia.fechas, copia.valores))
+    series = descargador.obtener({"inegi": ["caido-b"]})
+    assert series["inegi:caido-b"].origen == "copia"
+    assert not descargador.errores
+
+
+# =============================================================================
+# CACHE POR COLUMNAS
+# =============================================================================
+
+def test_recarga_la_cache_por_columnas(stub, tmp_path):
+    descargadas = Descargador(cache=tmp_path, por_segundo=0).obtener({"inegi": ["400"], "banxico": ["SF7"]})
+    
+    cache = CacheSeries(tmp_path)
+    for llave, original in descargadas.items():
+        fuente, id = llave.split(":")
+        serie = cache.cargar(fuente, id)
+        assert isinstance(serie.fechas, np.memmap) and isinstance(serie.valores, np.memmap)
+        assert serie.fechas.dtype == np.dtype("datetime64[D]") and serie.valores.dtype == np.float64
+        np.testing.assert_array_equal(serie.fechas, original.fechas)
+        np.testing.assert_array_equal(serie.valores, original.valores)
+        assert serie.nombre == original.nombre and serie.etag == original.etag
+        assert np.all(np.diff(serie.fechas.astype(np.int64)) > 0)
+    
+    inegi = cache.cargar("inegi", "400")
+    assert len(inegi.fechas) == 48
+    assert np.isnan(inegi.valores[inegi.fechas == np.datetime64("2020-05-01")]).all()
+    banxico = cache.cargar("banxico", "SF7")
+    assert banxico.valores[0] == 1001.5 and np.isnan(banxico.valores[2])
+    
+    tabla = tabla_features({"inegi:400": inegi, "banxico:SF7": banxico}, frecuencia="MS")
+    assert list(tabla.columns) == ["inegi_400", "banxico_SF7"]
+
+
+def test_cache_ilegible_se_descarga_de_nuevo(stub, tmp_path):
+    Descargador(cache=tmp_path, por_segundo=0).obtener({"inegi": ["500"]})
+    (tmp_path / "inegi-500" / "valores.npy").write_bytes(b"no es npy")
+    
+    series = Descargador(cache=tmp_path, ttl_s=3600, por_segundo=0).obtener({"inegi": ["500"]})
+    
+    assert stub.cuenta("500") == 2
+    assert series["inegi:500"].origen == "descargada"
+    assert CacheSeries(tmp_path).cargar("inegi", "500") is not None
@@ -0,0 +1,395 @@
+"""
+Entrenamiento del modelo de clasificación: LabelEncoder → MinMaxScaler → Random Forest.
+Versión en script de `2_Training_clasificacion.ipynb`, pensada para reentrenar cada noche.
+
+    python clasificacion.py --data bank.csv                          # entrenamiento completo
+    python clasificacion.py --data campaña_nov.csv --warm-start      # agrega árboles con la campaña nueva
+
+- El dataset limpio y codificado se guarda en cache por columnas (`.npy`)
+  con la huella del archivo: volver a correr no vuelve a leer el CSV.
+- Los modelos candidatos (regresión logística, Random Forest, árbol de
+  decisión) se entrenan a la vez; el Random Forest reparte sus árboles en
+  `--n-jobs` hilos.
+- `--warm-start` parte del modelo que ya está en `--output`: conserva sus
+  encoders y su scaler, y agrega árboles entrenados solo con los datos nuevos.
+- Escribe los mismos .pkl que `utils.PICKLES["clasificacion"]` en la carpeta
+  de modelos de la API.
+"""
+
+import argparse
+import json
+import pickle
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from datos import (
+    API_MODELS_PATH,
+    CACHE_PATH,
+    COLUMNAS_DESCARTADAS,
+    CacheDisco,
+    clave,
+    exportar_pickles,
+    hash_archivos,
+    label_encode,
+    leer_dataset,
+    sin_unknown,
+)
+
+# Los mismos nombres de archivo que carga la API (utils.PICKLES["clasificacion"])
+ARCHIVOS = {
+    "modelo": "clasificacion_modelo_banco.pkl",
+    "scaler": "clasificacion_scaler_banco.pkl",
+    "encoders": "clasificacion_encoders_banco.pkl",
+    "features": "clasificacion_features_banco.pkl",
+}
+
+# Variable objetivo ('yes' / 'no' en bank.csv)
+OBJETIVO = "y"
+
+# Columnas donde se quitan las filas con 'unknown' (como el notebook)
+COLUMNAS_SIN_UNKNOWN = ["education", "job"]
+
+# La API compila el modelo a arreglos de NumPy: solo sirve modelos de árboles
+EXPORTABLES = ("rf", "tree")
+
+# Cambia si cambia la limpieza/codificación: invalida el cache de preprocesamiento
+VERSION_PREPROCESO = 1
+
+
+# =============================================================================
+# PREPROCESAMIENTO (con cache)
+# =============================================================================
+
+def _codificar_con(df: pd.DataFrame, encoders: dict) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Codifica con encoders ya entrenados. Regresa también la máscara de filas sin categorías nuevas."""
+    codificado = df.copy()
+    validas = np.ones(len(df), dtype=bool)
+    for col, encoder in encoders.items():
+        codigos = pd.Categorical(df[col], categories=encoder.classes_).codes
+        nuevas = codigos < 0
+        if nuevas.any():
+            print(f"⚠️ {col}: {int(nuevas.sum()):,} filas con categorías que el modelo no conoce "
+                  f"({', '.join(sorted(set(df[col][nuevas].astype(str)))[:5])}); se descartan")
+        validas &= ~nuevas
+        codificado[col] = codigos.astype(np.int64)
+    return codificado[validas], validas
+
+
+def preparar(ruta: Path, cache: CacheDisco, anterior: Optional[dict] = None) -> Tuple[pd.DataFrame, np.ndarray, dict]:
+    """
+    Limpia y codifica el dataset como el notebook. Regresa las features
+    codificadas (en el orden de `features`), el objetivo (0/1) y los objetos
+    para exportar (features, encoders).
+    
+    Con `anterior` (warm start) se usan los encoders y el orden de features
+    del modelo anterior en lugar de entrenar encoders nuevos.
+    """
+    huella_anterior = None
+    if anterior is not None:
+        huella_anterior = clave(anterior["features"], {c: e.classes_.tolist() for c, e in anterior["encoders"].items()})
+    llave = clave(hash_archivos([ruta]), VERSION_PREPROCESO, huella_anterior)
+    guardado = cache.cargar("clasificacion-datos", llave)
+    if guardado is not None:
+        arreglos, objetos = guardado
+        print(f"♻️  Dataset codificado desde el cache ({llave})")
+        X = pd.DataFrame({col: arreglos[col] for col in objetos["features"]})
+        return X, arreglos[OBJETIVO], objetos
+    
+    inicio = time.perf_counter()
+    df = leer_dataset(ruta)
+    if OBJETIVO not in df:
+        raise SystemExit(f"❌ {ruta} no tiene la columna objetivo `{OBJETIVO}`")
+    df = df.drop(columns=COLUMNAS_DESCARTADAS, errors="ignore")
+    df = sin_unknown(df, COLUMNAS_SIN_UNKNOWN)
+    y = (df.pop(OBJETIVO) == "yes").to_numpy(np.uint8)
+    
+    if anterior is None:
+        codificado, encoders = label_encode(df)
+        objetos = {"features": codificado.columns.tolist(), "encoders": encoders}
+    else:
+        objetos = {"features": list(anterior["features"]), "encoders": anterior["encoders"]}
+        codificado, validas = _codificar_con(df[objetos["features"]], objetos["encoders"])
+        y = y[validas]
+    X = codificado[objetos["features"]].reset_index(drop=True)
+    
+    arreglos = {col: X[col].to_numpy() for col in objetos["features"]}
+    arreglos[OBJETIVO] = y
+    cache.guardar("clasificacion-datos", llave, arreglos, objetos)
+    print(f"✅ Dataset codificado: {len(X):,} filas × {X.shape[1]} columnas "
+          f"({y.mean() * 100:.1f}% contrata) en {time.perf_counter() - inicio:.1f} s")
+    return X, y, objetos
+
+
+def sobremuestrear(X: pd.DataFrame, y: np.ndarray, semilla: int) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Equivalente a `RandomOverSampler` de imblearn: repite filas al azar de las
+    clases minoritarias hasta igualar a la mayoritaria.
+    """
+    rng = np.random.default_rng(semilla)
+    clases, conteos = np.unique(y, return_counts=True)
+    indices = [np.arange(len(y))]
+    for clase, conteo in zip(clases, conteos):
+        faltan = conteos.max() - conteo
+        if faltan:
+            indices.append(rng.choice(np.flatnonzero(y == clase), size=faltan, replace=True))
+    filas = np.concatenate(indices)
+    return X.iloc[filas].reset_index(drop=True), y[filas]
+
+
+def dividir(X: np.ndarray, y: np.ndarray, semilla: int) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """70% entrenamiento, 15% validación y 15% prueba, estratificado (como el notebook)."""
+    from sklearn.model_selection import train_test_split
+    
+    X_resto, X_test, y_resto, y_test = train_test_split(X, y, test_size=0.15, random_state=semilla, stratify=y)
+    X_train, X_valid, y_train, y_valid = train_test_split(
+        X_resto, y_resto, test_size=0.1765, random_state=semilla, stratify=y_resto
+    )
+    return {"train": (X_train, y_train), "valid": (X_valid, y_valid), "test": (X_test, y_test)}
+
+
+# =============================================================================
+# MODELOS
+# =============================================================================
+
+def crear_modelo(nombre: str, semilla: int, n_jobs: int, arboles: int = 100, max_samples: Optional[float] = None):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.tree import DecisionTreeClassifier
+    
+    if nombre == "logreg":
+        return LogisticRegression(max_iter=1000, random_state=semilla)
+    if nombre == "rf":
+        return RandomForestClassifier(
+            n_estimators=arboles, random_state=semilla, n_jobs=n_jobs, max_samples=max_samples
+        )
+    if nombre == "tree":
+        return DecisionTreeClassifier(random_state=semilla)
+    raise ValueError(f"Modelo desconocido: {nombre}")
+
+
+def metricas(modelo, X: np.ndarray, y: np.ndarray, average: str = "binary") -> dict:
+    from sklearn.metrics import accuracy_score, f1_score, recall_score
+    
+    pred = modelo.predict(X)
+    return {
+        "accuracy": round(float(accuracy_score(y, pred)), 4),
+        "recall": round(float(recall_score(y, pred, average=average)), 4),
+        "f1": round(float(f1_score(y, pred, average=average)), 4),
+    }
+
+
+def _entrenar_candidato(nombre: str, modelo, datos: dict) -> dict:
+    inicio = time.perf_counter()
+    modelo.fit(*datos["train"])
+    return {
+        "modelo": nombre,
+        **metricas(modelo, *datos["valid"], average="macro"),
+        "segundos": round(time.perf_counter() - inicio, 2),
+        "_estimador": modelo,
+    }
+
+
+def comparar(candidatos: List[str], datos: dict, semilla: int, n_jobs: int, arboles: int,
+             max_samples: Optional[float]) -> List[dict]:
+    """
+    Entrena los candidatos a la vez (un hilo por candidato; sklearn libera el
+    GIL al construir árboles y en BLAS) y los evalúa con validación. El Random
+    Forest usa además `n_jobs` hilos para sus árboles.
+    """
+    from joblib import Parallel, delayed
+    
+    modelos = {nombre: crear_modelo(nombre, semilla, n_jobs, arboles, max_samples) for nombre in candidatos}
+    # El más lento primero, para que no quede solo al final
+    orden = sorted(candidatos, key=lambda n: n != "rf")
+    return Parallel(n_jobs=len(orden), prefer="threads")(
+        delayed(_entrenar_candidato)(nombre, modelos[nombre], datos) for nombre in orden
+    )
+
+
+# =============================================================================
+# ENTRENAMIENTO COMPLETO
+# =============================================================================
+
+def entrenar_completo(args, cache: CacheDisco) -> Tuple[dict, dict]:
+    """Como el notebook: compara candidatos y reentrena el elegido con train + validación."""
+    from sklearn.preprocessing import MinMaxScaler
+    
+    X, y, objetos = preparar(args.data, cache)
+    X, y = sobremuestrear(X, y, args.seed)
+    # Se ajusta sobre el DataFrame para que el scaler guarde los nombres de las features
+    scaler = MinMaxScaler()
+    X_escalado = scaler.fit_transform(X)
+    datos = dividir(X_escalado, y, args.seed)
+    print(f"  Balanceado: {len(y):,} filas → train {len(datos['train'][1]):,} / "
+          f"valid {len(datos['valid'][1]):,} / test {len(datos['test'][1]):,}")
+    
+    t = time.perf_counter()
+    resultados = comparar(args.models, datos, args.seed, args.n_jobs, args.trees, args.max_samples)
+    print(f"\n▶ Candidatos ({time.perf_counter() - t:.1f} s en paralelo), métricas en validación (macro)")
+    print(f"  {'modelo':<8} {'accuracy':>9} {'recall':>8} {'f1':>8} {'segundos':>9}")
+    for r in resultados:
+        print(f"  {r['modelo']:<8} {r['accuracy']:>9.4f} {r['recall']:>8.4f} {r['f1']:>8.4f} {r['segundos']:>9.2f}")
+    
+    exportables = [r for r in resultados if r["modelo"] in EXPORTABLES]
+    if args.export == "best":
+        if not exportables:
+            raise SystemExit(f"❌ Ningún candidato exportable ({', '.join(EXPORTABLES)}) en --models")
+        elegido = max(exportables, key=lambda r: r["f1"])["modelo"]
+    else:
+        elegido = args.export
+    mejor = max(resultados, key=lambda r: r["f1"])["modelo"]
+    if mejor not in EXPORTABLES:
+        print(f"⚠️ {mejor} tiene el mejor F1, pero la API solo sirve modelos de árboles; se exporta {elegido}")
+    
+    # Reentrenar el elegido con train + validación y evaluar en prueba
+    t = time.perf_counter()
+    entrenados = {r["modelo"]: r["_estimador"] for r in resultados}
+    if args.no_refit and elegido in entrenados:
+        modelo = entrenados[elegido]
+    else:
+        modelo = crear_modelo(elegido, args.seed, args.n_jobs, args.trees, args.max_samples)
+        modelo.fit(np.vstack([datos["train"][0], datos["valid"][0]]),
+                   np.concatenate([datos["train"][1], datos["valid"][1]]))
+    prueba = metricas(modelo, *datos["test"])
+    print(f"\n▶ {elegido} final en {time.perf_counter() - t:.1f} s — prueba: accuracy {prueba['accuracy']:.4f}, "
+          f"recall {prueba['recall']:.4f}, F1 {prueba['f1']:.4f}")
+    
+    reporte = {
+        "modo": "completo",
+        "filas_balanceadas": int(len(y)),
+        "candidatos": [{k: v for k, v in r.items() if not k.startswith("_")} for r in resultados],
+        "exportado": elegido,
+        "prueba": prueba,
+    }
+    return {**objetos, "scaler": scaler, "modelo": modelo}, reporte
+
+
+# =============================================================================
+# WARM START (datos de una campaña nueva)
+# =============================================================================
+
+def cargar_anterior(carpeta: Path) -> dict:
+    anterior = {}
+    for llave, nombre in ARCHIVOS.items():
+        try:
+            with open(carpeta / nombre, "rb") as f:
+                anterior[llave] = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            raise SystemExit(f"❌ --warm-start necesita el modelo anterior en {carpeta}: {nombre} ({e})")
+    return anterior
+
+
+def entrenar_incremental(args, cache: CacheDisco) -> Tuple[dict, dict]:
+    """
+    Agrega `--trees` árboles al Random Forest anterior, entrenados solo con
+    los datos nuevos. Los encoders y el scaler no cambian (los umbrales de los
+    árboles viejos están en la escala del scaler anterior). Con `--max-trees`
+    se descartan los árboles más viejos.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    
+    anterior = cargar_anterior(args.output)
+    modelo = anterior["modelo"]
+    if not isinstance(modelo, RandomForestClassifier):
+        raise SystemExit(f"❌ --warm-start solo aplica a RandomForestClassifier (el modelo es {type(modelo).__name__})")
+    
+    X, y, objetos = preparar(args.data, cache, anterior)
+    if len(np.unique(y)) < 2:
+        raise SystemExit("❌ Los datos nuevos necesitan ejemplos de las dos clases")
+    # Prueba con datos de la campaña nueva, sin balancear
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.15, random_state=args.seed, stratify=y)
+    X_train, y_train = sobremuestrear(X_train, y_train, args.seed)
+    scaler = anterior["scaler"]
+    X_train, X_test = scaler.transform(X_train), scaler.transform(X_test)
+    
+    antes = metricas(modelo, X_test, y_test)
+    n_antes = len(modelo.estimators_)
+    t = time.perf_counter()
+    modelo.set_params(warm_start=True, n_estimators=n_antes + args.trees, n_jobs=args.n_jobs)
+    modelo.fit(X_train, y_train)
+    if args.max_trees and len(modelo.estimators_) > args.max_trees:
+        modelo.estimators_ = modelo.estimators_[-args.max_trees:]
+        modelo.n_estimators = args.max_trees
+    modelo.set_params(warm_start=False)
+    despues = metricas(modelo, X_test, y_test)
+    
+    print(f"\n▶ Warm start: {n_antes} → {len(modelo.estimators_)} árboles "
+          f"(+{args.trees} con {len(y_train):,} filas balanceadas) en {time.perf_counter() - t:.1f} s")
+    print(f"  {'':<8} {'accuracy':>9} {'recall':>8} {'f1':>8}   (prueba: 15% de los datos nuevos)")
+    for nombre, m in (("antes", antes), ("después", despues)):
+        print(f"  {nombre:<8} {m['accuracy']:>9.4f} {m['recall']:>8.4f} {m['f1']:>8.4f}")
+    
+    reporte = {
+        "modo": "warm_start",
+        "arboles": {"antes": n_antes, "despues": len(modelo.estimators_)},
+        "prueba": {"antes": antes, "despues": despues},
+    }
+    return {**objetos, "scaler": scaler, "modelo": modelo}, reporte
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def _modelos(texto: str) -> List[str]:
+    nombres = [n.strip() for n in texto.split(",") if n.strip()]
+    desconocidos = set(nombres) - {"logreg", "rf", "tree"}
+    if desconocidos:
+        raise argparse.ArgumentTypeError(f"modelos desconocidos: {', '.join(sorted(desconocidos))}")
+    return nombres
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Entrena el modelo de clasificación (Scaler → Random Forest).")
+    parser.add_argument("--data", type=Path, required=True, help="CSV (`;` o `,`) o Parquet con el dataset")
+    parser.add_argument("--output", type=Path, default=API_MODELS_PATH, help="Carpeta donde escribir los .pkl")
+    parser.add_argument("--models", type=_modelos, default=["logreg", "rf", "tree"],
+                        help="Candidatos a comparar: logreg,rf,tree")
+    parser.add_argument("--export", choices=["best", *EXPORTABLES], default="rf",
+                        help="Modelo a exportar (best = mejor F1 en validación entre rf y tree)")
+    parser.add_argument("--trees", type=int, default=100,
+                        help="Árboles del Random Forest (con --warm-start: árboles a agregar)")
+    parser.add_argument("--max-samples", type=float, default=None,
+                        help="Fracción de filas por árbol (bootstrap); acelera con datasets grandes")
+    parser.add_argument("--no-refit", action="store_true",
+                        help="No reentrenar el modelo elegido con train + validación")
+    parser.add_argument("--warm-start", action="store_true",
+                        help="Agregar árboles al modelo que está en --output usando solo --data")
+    parser.add_argument("--max-trees", type=int, default=None,
+                        help="Con --warm-start: máximo de árboles (se descartan los más viejos)")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Hilos del Random Forest (-1 = todos los cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache", type=Path, default=CACHE_PATH, help="Carpeta del cache de intermedios")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--report", type=Path, default=None, help="Guardar el reporte en JSON")
+    parser.add_argument("--no-export", action="store_true", help="Entrenar sin escribir los .pkl")
+    args = parser.parse_args(argv)
+    
+    cache = CacheDisco(None if args.no_cache else args.cache)
+    inicio = time.perf_counter()
+    if args.warm_start:
+        objetos, reporte = entrenar_incremental(args, cache)
+    else:
+        objetos, reporte = entrenar_completo(args, cache)
+    reporte = {"dataset": str(args.data), **reporte, "segundos": round(time.perf_counter() - inicio, 2)}
+    print(f"\n⏱️  Total: {reporte['segundos']:.1f} s")
+    
+    if not args.no_export:
+        # Con warm start solo cambia el modelo: encoders, scaler y features son los mismos
+        archivos = {"modelo": ARCHIVOS["modelo"]} if args.warm_start else ARCHIVOS
+        escritos = exportar_pickles(objetos, archivos, args.output)
+        print(f"✅ {len(escritos)} archivos en {args.output}")
+    if args.report is not None:
+        args.report.write_text(json.dumps(reporte, indent=2, ensure_ascii=False))
+        print(f"✓ Reporte en {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Utilidades compartidas por los pipelines de entrenamiento.
+Lectura del dataset, huella (hash) del archivo, cache en disco y exportación de los .pkl.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Carpeta que lee la API (los .pkl se escriben ahí por defecto)
+API_MODELS_PATH = Path(__file__).resolve().parent.parent / "API_Prediction" / "models"
+
+# Cache de intermedios (dataset codificado, matrices escaladas, barridos)
+CACHE_PATH = Path(os.getenv("TRAINING_CACHE_PATH", Path(__file__).resolve().parent / ".cache"))
+
+# Columnas con demasiados 'unknown' que ninguno de los dos modelos usa
+COLUMNAS_DESCARTADAS = ["contact", "poutcome"]
+
+
+# =============================================================================
+# LECTURA
+# =============================================================================
+
+def leer_dataset(ruta: Path, columnas: Optional[List[str]] = None) -> pd.DataFrame:
+    """CSV (separado por `;` como bank.csv, o por `,`) o Parquet."""
+    ruta = Path(ruta)
+    if ruta.suffix.lower() in (".parquet", ".pq"):
+        return pd.read_parquet(ruta, columns=columnas)
+    with open(ruta, encoding="utf-8") as f:
+        encabezado = f.readline()
+    sep = ";" if encabezado.count(";") >= encabezado.count(",") else ","
+    return pd.read_csv(ruta, sep=sep, usecols=columnas)
+
+
+def hash_archivos(rutas: Iterable[Path], bloque: int = 1 << 20) -> str:
+    """Huella SHA-256 del contenido (no del nombre ni la fecha) de uno o varios archivos."""
+    h = hashlib.sha256()
+    for ruta in rutas:
+        with open(ruta, "rb") as f:
+            while True:
+                datos = f.read(bloque)
+                if not datos:
+                    break
+                h.update(datos)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def clave(*partes: Any) -> str:
+    """Llave corta y estable para el cache a partir de valores serializables a JSON."""
+    texto = json.dumps(partes, sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode()).hexdigest()[:16]
+
+
+def sin_unknown(df: pd.DataFrame, columnas: Iterable[str]) -> pd.DataFrame:
+    """Quita las filas con 'unknown' en alguna de las columnas (como los notebooks)."""
+    mascara = np.ones(len(df), dtype=bool)
+    for col in columnas:
+        mascara &= (df[col] != "unknown").to_numpy()
+    return df[mascara]
+
+
+def label_encode(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    LabelEncoder por cada columna de texto, igual que los notebooks: la API
+    carga estos encoders y usa sus `classes_`.
+    """
+    from sklearn.preprocessing import LabelEncoder
+    
+    codificado = df.copy()
+    encoders = {}
+    for col in df.select_dtypes(include="object").columns:
+        encoder = LabelEncoder()
+        codificado[col] = encoder.fit_transform(df[col])
+        encoders[col] = encoder
+    return codificado, encoders
+
+
+# =============================================================================
+# CACHE EN DISCO
+# =============================================================================
+
+class CacheDisco:
+    """
+    Intermedios guardados por llave en `directorio/<nombre>-<llave>/`:
+    arreglos como `.npy` (se abren con mmap, por columnas) y objetos
+    pequeños (encoders, scalers, resultados) en un pickle. Con
+    `directorio=None` no guarda nada.
+    """
+    
+    def __init__(self, directorio: Optional[Path] = CACHE_PATH):
+        self.directorio = Path(directorio) if directorio is not None else None
+    
+    def _ruta(self, nombre: str, llave: str) -> Optional[Path]:
+        return self.directorio / f"{nombre}-{llave}" if self.directorio is not None else None
+    
+    def cargar(self, nombre: str, llave: str) -> Optional[Tuple[Dict[str, np.ndarray], Any]]:
+        """`(arreglos, objetos)` o None si no está en el cache."""
+        ruta = self._ruta(nombre, llave)
+        if ruta is None or not (ruta / "objetos.pkl").exists():
+            return None
+        arreglos = {p.stem: np.load(p, mmap_mode="r") for p in sorted(ruta.glob("*.npy"))}
+        with open(ruta / "objetos.pkl", "rb") as f:
+            return arreglos, pickle.load(f)
+    
+    def guardar(self, nombre: str, llave: str, arreglos: Dict[str, np.ndarray], objetos: Any = None) -> None:
+        ruta = self._ruta(nombre, llave)
+        if ruta is None:
+            return
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        # Se escribe aparte y se mueve al final: nunca queda una entrada a medias
+        temporal = Path(tempfile.mkdtemp(prefix=f".{ruta.name}-", dir=ruta.parent))
+        try:
+            for col, arreglo in arreglos.items():
+                np.save(temporal / f"{col}.npy", np.ascontiguousarray(arreglo))
+            with open(temporal / "objetos.pkl", "wb") as f:
+                pickle.dump(objetos, f)
+            if ruta.exists():
+                shutil.rmtree(ruta)
+            os.replace(temporal, ruta)
+        finally:
+            shutil.rmtree(temporal, ignore_errors=True)
+
+
+# =============================================================================
+# EXPORTACIÓN
+# =============================================================================
+
+def exportar_pickles(objetos: Dict[str, Any], archivos: Dict[str, str], destino: Path) -> List[Path]:
+    """
+    Escribe cada objeto en su `.pkl` (los mismos nombres de `utils.PICKLES`).
+    Cada archivo se escribe en un temporal y se renombra, así que la API
+    (que vigila la carpeta para recargar en caliente) nunca lee uno a medias.
+    """
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+    escritos = []
+    for llave, nombre in archivos.items():
+        final = destino / nombre
+        temporal = destino / f".{nombre}.tmp"
+        with open(temporal, "wb") as f:
+            pickle.dump(objetos[llave], f)
+        os.replace(temporal, final)
+        escritos.append(final)
+    return escritos
@@ -0,0 +1,330 @@
+"""
+Entrenamiento del modelo de segmentación: StandardScaler → PCA → K-Means.
+Versión en script de `3_Training_PCA.ipynb`, pensada para la base completa de clientes.
+
+    python segmentacion.py --data bank.csv
+    python segmentacion.py --data clientes.parquet --algorithm minibatch --n-jobs -1
+
+- El dataset codificado y escalado se guarda en cache con la huella del
+  archivo: volver a correr (otro K, otro número de componentes) no lo recalcula.
+- El barrido de K (método del codo) corre en paralelo, un K por proceso.
+- Con muchos datos se usa MiniBatchKMeans (`--algorithm auto`).
+- Escribe los mismos .pkl que `utils.PICKLES["segmentacion"]` en la carpeta
+  de modelos de la API. Los clusters se alinean con los del modelo anterior
+  para que cada número de cluster conserve su nombre y descripción.
+"""
+
+import argparse
+import json
+import pickle
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from datos import (
+    API_MODELS_PATH,
+    CACHE_PATH,
+    COLUMNAS_DESCARTADAS,
+    CacheDisco,
+    clave,
+    exportar_pickles,
+    hash_archivos,
+    label_encode,
+    leer_dataset,
+    sin_unknown,
+)
+
+# Los mismos nombres de archivo que carga la API (utils.PICKLES["segmentacion"])
+ARCHIVOS = {
+    "kmeans": "cluster_kmeans_pca_banco.pkl",
+    "pca": "cluster_pca_banco.pkl",
+    "scaler": "cluster_scaler_segmentacion.pkl",
+    "encoders": "cluster_encoders_segmentacion.pkl",
+    "features": "cluster_features_segmentacion.pkl",
+    "names": "cluster_names.pkl",
+}
+
+# Variables que no se usan para segmentar (además de las de COLUMNAS_DESCARTADAS)
+COLUMNAS_EXCLUIDAS = ["y", "day", "month"]
+
+# Nombres del notebook (K=4); se usan si no hay un modelo anterior con el cual alinear
+NOMBRES = {
+    0: "Recurrentes",
+    1: "Nuevos Estándar",
+    2: "Jóvenes Profesionales",
+    3: "Premium Seniors",
+}
+
+# Cambia si cambia la limpieza/codificación: invalida el cache de preprocesamiento
+VERSION_PREPROCESO = 1
+
+# Filas a partir de las cuales `--algorithm auto` usa MiniBatchKMeans
+MINIBATCH_DESDE = 100_000
+
+
+# =============================================================================
+# PREPROCESAMIENTO (con cache)
+# =============================================================================
+
+def preparar(ruta: Path, cache: CacheDisco) -> Tuple[np.ndarray, dict, str]:
+    """
+    Limpia, codifica y escala el dataset como el notebook. Regresa la matriz
+    escalada, los objetos para exportar (features, encoders, scaler) y la
+    llave del dataset.
+    """
+    from sklearn.preprocessing import StandardScaler
+    
+    llave = clave(hash_archivos([ruta]), VERSION_PREPROCESO)
+    guardado = cache.cargar("segmentacion-datos", llave)
+    if guardado is not None:
+        arreglos, objetos = guardado
+        print(f"♻️  Dataset preprocesado desde el cache ({llave})")
+        return arreglos["X"], objetos, llave
+    
+    inicio = time.perf_counter()
+    df = leer_dataset(ruta)
+    df = df.drop(columns=COLUMNAS_EXCLUIDAS + COLUMNAS_DESCARTADAS, errors="ignore")
+    df = sin_unknown(df, df.select_dtypes(include="object").columns)
+    codificado, encoders = label_encode(df)
+    
+    scaler = StandardScaler()
+    X = scaler.fit_transform(codificado)
+    objetos = {"features": codificado.columns.tolist(), "encoders": encoders, "scaler": scaler}
+    cache.guardar("segmentacion-datos", llave, {"X": X}, objetos)
+    print(f"✅ Dataset preprocesado: {X.shape[0]:,} filas × {X.shape[1]} columnas "
+          f"en {time.perf_counter() - inicio:.1f} s")
+    return X, objetos, llave
+
+
+# =============================================================================
+# BARRIDO DE K
+# =============================================================================
+
+def crear_kmeans(algoritmo: str, k: int, semilla: int, n_init: int, batch_size: int = 4096):
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    
+    if algoritmo == "minibatch":
+        return MiniBatchKMeans(n_clusters=k, random_state=semilla, n_init=n_init, batch_size=batch_size)
+    return KMeans(n_clusters=k, init="k-means++", random_state=semilla, n_init=n_init)
+
+
+def _ajustar_k(X: np.ndarray, k: int, algoritmo: str, semilla: int, n_init: int, hilos: Optional[int]) -> dict:
+    """Un K del barrido (corre en un proceso de joblib)."""
+    from threadpoolctl import threadpool_limits
+    
+    inicio = time.perf_counter()
+    # Con varios procesos, cada uno usa un hilo para no competir por los cores
+    with threadpool_limits(limits=hilos):
+        modelo = crear_kmeans(algoritmo, k, semilla, n_init).fit(X)
+    return {"k": k, "inercia": float(modelo.inertia_), "segundos": round(time.perf_counter() - inicio, 3)}
+
+
+def barrido_k(
+    X: np.ndarray,
+    ks: List[int],
+    algoritmo: str,
+    semilla: int,
+    n_init: int,
+    n_jobs: int,
+    cache: CacheDisco,
+    llave_datos: str,
+) -> List[dict]:
+    """Inercia para cada K, en paralelo. Los K grandes (más lentos) se reparten primero."""
+    from joblib import Parallel, delayed
+    
+    llave = clave(llave_datos, ks, algoritmo, semilla, n_init)
+    guardado = cache.cargar("segmentacion-barrido", llave)
+    if guardado is not None:
+        print(f"♻️  Barrido de K desde el cache ({llave})")
+        return guardado[1]
+    
+    hilos = None if n_jobs == 1 else 1
+    resultados = Parallel(n_jobs=n_jobs)(
+        delayed(_ajustar_k)(X, k, algoritmo, semilla, n_init, hilos)
+        for k in sorted(ks, reverse=True)
+    )
+    resultados.sort(key=lambda r: r["k"])
+    cache.guardar("segmentacion-barrido", llave, {}, resultados)
+    return resultados
+
+
+def sugerir_k(resultados: List[dict]) -> Optional[int]:
+    """Codo: el K más lejano a la recta entre el primer y el último punto de la curva."""
+    if len(resultados) < 3:
+        return None
+    ks = np.array([r["k"] for r in resultados], dtype=float)
+    inercias = np.array([r["inercia"] for r in resultados])
+    x = (ks - ks[0]) / (ks[-1] - ks[0])
+    y = (inercias - inercias[-1]) / max(inercias[0] - inercias[-1], 1e-12)
+    return int(ks[np.argmax(1 - x - y)])
+
+
+def dendrograma(X: np.ndarray, muestra: int, semilla: int, cache: CacheDisco, llave_datos: str) -> np.ndarray:
+    """
+    Linkage de Ward para el dendrograma sobre una muestra aleatoria (no las
+    primeras filas, que dependen del orden del archivo). Se guarda en cache.
+    """
+    from scipy.cluster.hierarchy import linkage
+    
+    llave = clave(llave_datos, muestra, semilla)
+    guardado = cache.cargar("segmentacion-dendrograma", llave)
+    if guardado is not None:
+        return guardado[0]["linkage"]
+    filas = np.random.default_rng(semilla).choice(len(X), size=min(muestra, len(X)), replace=False)
+    Z = linkage(X[np.sort(filas)], method="ward")
+    cache.guardar("segmentacion-dendrograma", llave, {"linkage": Z})
+    return Z
+
+
+# =============================================================================
+# MODELO FINAL
+# =============================================================================
+
+def entrenar(X: np.ndarray, k: int, componentes: int, algoritmo: str, semilla: int, n_init: int):
+    """PCA sobre los datos escalados y K-Means sobre los componentes (como el notebook)."""
+    from sklearn.decomposition import PCA
+    
+    pca = PCA(n_components=componentes)
+    scores = pca.fit_transform(X)
+    kmeans = crear_kmeans(algoritmo, k, semilla, n_init).fit(scores)
+    return pca, kmeans
+
+
+def _centroides_originales(kmeans, pca, scaler) -> np.ndarray:
+    """Centroides en el espacio de las variables codificadas (antes de escalar)."""
+    return scaler.inverse_transform(pca.inverse_transform(kmeans.cluster_centers_))
+
+
+def alinear_con_anterior(kmeans, pca, objetos: dict, anterior: Path) -> Optional[Dict[int, str]]:
+    """
+    Reordena los clusters nuevos para que cada uno conserve el número (y el
+    nombre) del cluster más parecido del modelo en `anterior`. Regresa los
+    nombres a usar, o None si no hay un modelo anterior compatible.
+    """
+    from scipy.optimize import linear_sum_assignment
+    
+    try:
+        viejos = {}
+        for llave in ("kmeans", "pca", "scaler", "features", "names"):
+            with open(anterior / ARCHIVOS[llave], "rb") as f:
+                viejos[llave] = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if viejos["features"] != objetos["features"] or viejos["kmeans"].n_clusters != kmeans.n_clusters:
+        return None
+    
+    features = objetos["features"]
+    centroides = _centroides_originales(viejos["kmeans"], viejos["pca"], viejos["scaler"])
+    en_nuevo = pca.transform(objetos["scaler"].transform(pd.DataFrame(centroides, columns=features)))
+    distancias = np.linalg.norm(kmeans.cluster_centers_[:, None, :] - en_nuevo[None, :, :], axis=2)
+    nuevos, viejos_ids = linear_sum_assignment(distancias)
+    
+    # orden[id viejo] = índice del cluster nuevo que lo reemplaza
+    orden = np.empty(kmeans.n_clusters, dtype=int)
+    orden[viejos_ids] = nuevos
+    kmeans.cluster_centers_ = kmeans.cluster_centers_[orden]
+    if getattr(kmeans, "labels_", None) is not None:
+        kmeans.labels_ = np.argsort(orden)[kmeans.labels_].astype(kmeans.labels_.dtype)
+    return dict(viejos["names"])
+
+
+def perfil(X: np.ndarray, kmeans, pca, objetos: dict) -> pd.DataFrame:
+    """Promedios de algunas variables por cluster (como el análisis del notebook)."""
+    datos = pd.DataFrame(objetos["scaler"].inverse_transform(X), columns=objetos["features"])
+    datos["cluster"] = kmeans.predict(pca.transform(X))
+    columnas = [c for c in ("age", "balance", "duration", "campaign", "previous") if c in datos]
+    tabla = datos.groupby("cluster")[columnas].mean().round(1)
+    tabla["clientes"] = datos.groupby("cluster").size()
+    tabla["%"] = (tabla["clientes"] / len(datos) * 100).round(1)
+    return tabla
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def _rango(texto: str) -> List[int]:
+    """`1-10` → [1, ..., 10]; `2,4,6` → [2, 4, 6]."""
+    if "-" in texto:
+        inicio, fin = texto.split("-", 1)
+        return list(range(int(inicio), int(fin) + 1))
+    return [int(k) for k in texto.split(",")]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Entrena el modelo de segmentación (Scaler → PCA → K-Means).")
+    parser.add_argument("--data", type=Path, required=True, help="CSV (`;` o `,`) o Parquet con el dataset")
+    parser.add_argument("--output", type=Path, default=API_MODELS_PATH, help="Carpeta donde escribir los .pkl")
+    parser.add_argument("--k", type=int, default=4, help="Clusters del modelo final")
+    parser.add_argument("--k-range", type=_rango, default=_rango("1-10"), help="K del barrido: `1-10` o `2,4,6`")
+    parser.add_argument("--no-sweep", action="store_true", help="No hacer el barrido de K")
+    parser.add_argument("--components", type=int, default=3, help="Componentes de PCA")
+    parser.add_argument("--algorithm", choices=["auto", "kmeans", "minibatch"], default="auto",
+                        help=f"auto = MiniBatchKMeans a partir de {MINIBATCH_DESDE:,} filas")
+    parser.add_argument("--n-init", type=int, default=10)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Procesos para el barrido (-1 = todos los cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache", type=Path, default=CACHE_PATH, help="Carpeta del cache de intermedios")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--dendrogram", type=int, default=0, metavar="N",
+                        help="Calcular el linkage de Ward sobre una muestra aleatoria de N filas")
+    parser.add_argument("--report", type=Path, default=None, help="Guardar el reporte en JSON")
+    parser.add_argument("--no-export", action="store_true", help="Entrenar sin escribir los .pkl")
+    args = parser.parse_args(argv)
+    
+    cache = CacheDisco(None if args.no_cache else args.cache)
+    inicio = time.perf_counter()
+    X, objetos, llave = preparar(args.data, cache)
+    algoritmo = args.algorithm
+    if algoritmo == "auto":
+        algoritmo = "minibatch" if len(X) >= MINIBATCH_DESDE else "kmeans"
+    n_init = min(args.n_init, 3) if algoritmo == "minibatch" else args.n_init
+    reporte = {"dataset": str(args.data), "llave": llave, "filas": int(len(X)), "algoritmo": algoritmo}
+    
+    if not args.no_sweep:
+        t = time.perf_counter()
+        barrido = barrido_k(X, args.k_range, algoritmo, args.seed, n_init, args.n_jobs, cache, llave)
+        print(f"\n▶ Barrido de K ({algoritmo}, {time.perf_counter() - t:.1f} s)")
+        for r in barrido:
+            print(f"  K={r['k']:<3} inercia {r['inercia']:>16,.1f}   {r['segundos']:>7.2f} s")
+        reporte["barrido"] = barrido
+        reporte["k_sugerido"] = sugerir_k(barrido)
+        if reporte["k_sugerido"] is not None:
+            print(f"  Codo sugerido: K={reporte['k_sugerido']}")
+    
+    if args.dendrogram:
+        Z = dendrograma(X, args.dendrogram, args.seed, cache, llave)
+        print(f"\n▶ Linkage de Ward sobre {len(Z) + 1:,} filas (cache: segmentacion-dendrograma)")
+    
+    t = time.perf_counter()
+    pca, kmeans = entrenar(X, args.k, args.components, algoritmo, args.seed, n_init)
+    nombres = alinear_con_anterior(kmeans, pca, objetos, args.output)
+    if nombres is None:
+        nombres = NOMBRES if args.k == len(NOMBRES) else {i: f"Segmento {i}" for i in range(args.k)}
+        if args.k != len(NOMBRES):
+            print(f"⚠️ K={args.k}: la API solo tiene descripciones para {len(NOMBRES)} segmentos")
+    print(f"\n▶ Modelo final: PCA({args.components}) + {algoritmo} K={args.k} en {time.perf_counter() - t:.1f} s "
+          f"(varianza explicada {pca.explained_variance_ratio_.sum() * 100:.1f}%)")
+    tabla = perfil(X, kmeans, pca, objetos)
+    tabla.insert(0, "segmento", [nombres.get(int(c), "?") for c in tabla.index])
+    print(tabla.to_string())
+    reporte["perfil"] = json.loads(tabla.to_json(orient="index", force_ascii=False))
+    reporte["segundos"] = round(time.perf_counter() - inicio, 2)
+    
+    if not args.no_export:
+        escritos = exportar_pickles(
+            {**objetos, "pca": pca, "kmeans": kmeans, "names": nombres}, ARCHIVOS, args.output
+        )
+        print(f"\n✅ {len(escritos)} archivos en {args.output}")
+    if args.report is not None:
+        args.report.write_text(json.dumps(reporte, indent=2, ensure_ascii=False))
+        print(f"✓ Reporte en {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())